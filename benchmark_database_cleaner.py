@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Benchmark and Verification for database_cleaner.py review checks
+
+Generates a synthetic traffic_cameras.db with crop reviews and positive and
+negative factor links, then times the set-based incomplete-review and
+orphaned-factor checks in DatabaseCleaner against the join-and-group
+implementations they replaced (kept below as legacy_*). The generated data
+includes empty reviews with various whitespace, reviews with many factors of
+both kinds, and links to missing reviews and factors.
+
+With --verify, the issues both implementations report are compared and the
+exit status is 1 if they differ. The same comparison runs on small fixture
+databases in test_database_cleaner.py; --verify repeats it at scale.
+
+Usage:
+    python benchmark_database_cleaner.py                    # 100k reviews
+    python benchmark_database_cleaner.py --reviews 1000000
+    python benchmark_database_cleaner.py --verify --reviews 20000 --seed 7
+"""
+
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from collections import defaultdict
+
+from database_cleaner import DatabaseCleaner
+
+# The tables the review checks read, as created by database.js
+BENCHMARK_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS saved_crops (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        original_camera TEXT NOT NULL,
+        original_filename TEXT NOT NULL,
+        original_path TEXT,
+        crop_filename TEXT NOT NULL,
+        crop_folder TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS crop_reviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        crop_id INTEGER NOT NULL,
+        notes TEXT,
+        is_jonathan TEXT,
+        activities TEXT,
+        top_clothing TEXT,
+        reviewed_by_ip TEXT,
+        reviewed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(crop_id)
+    );
+    CREATE TABLE IF NOT EXISTS factors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        type TEXT NOT NULL,
+        description TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS crop_review_positive_factors (
+        crop_review_id INTEGER NOT NULL,
+        factor_id INTEGER NOT NULL,
+        PRIMARY KEY (crop_review_id, factor_id)
+    );
+    CREATE TABLE IF NOT EXISTS crop_review_negative_factors (
+        crop_review_id INTEGER NOT NULL,
+        factor_id INTEGER NOT NULL,
+        PRIMARY KEY (crop_review_id, factor_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_crop_reviews_crop_id ON crop_reviews(crop_id);
+"""
+
+# Values an "empty" text field can take; all of them are blank to str.strip()
+BLANK_VALUES = [None, '', ' ', '\t\n', '\xa0', '\u3000 ']
+FACTOR_COUNT = 40
+
+def generate_database(db_path: Path, reviews: int, empty_ratio: float, orphan_ratio: float, seed: int):
+    """Creates the synthetic database: one crop per review, factors, and links"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BENCHMARK_SCHEMA)
+    conn.executemany("INSERT INTO factors (id, name, type) VALUES (?, ?, ?)",
+                     [(i, f"factor_{i}", 'positive' if i % 2 else 'negative') for i in range(1, FACTOR_COUNT + 1)])
+    conn.executemany("INSERT INTO saved_crops (id, original_camera, original_filename, crop_filename, crop_folder) VALUES (?, ?, ?, ?, ?)",
+                     ((i, 'Camera', f"frame_{i}.jpg", f"crop_{i}.jpg", 'saved_images/Camera') for i in range(1, reviews + 1)))
+
+    review_rows, positive_links, negative_links = [], [], []
+    for review_id in range(1, reviews + 1):
+        if rng.random() < empty_ratio:
+            # Blank text fields, and only sometimes a factor, so some are truly empty
+            fields = [rng.choice(BLANK_VALUES) for _ in range(3)]
+            is_jonathan = None
+            positive = rng.sample(range(1, FACTOR_COUNT + 1), 1) if rng.random() < 0.2 else []
+            negative = rng.sample(range(1, FACTOR_COUNT + 1), 1) if rng.random() < 0.2 else []
+        else:
+            fields = [rng.choice(['note', None]), rng.choice(['walking', None, ' ']), rng.choice(['red', None])]
+            is_jonathan = rng.choice(['yes', 'no', None])
+            positive = rng.sample(range(1, FACTOR_COUNT + 1), rng.randint(0, 6))
+            negative = rng.sample(range(1, FACTOR_COUNT + 1), rng.randint(0, 4))
+        review_rows.append((review_id, review_id, fields[0], is_jonathan, fields[1], fields[2]))
+        positive_links.extend((review_id, factor_id) for factor_id in positive)
+        negative_links.extend((review_id, factor_id) for factor_id in negative)
+
+    # Links to reviews or factors that don't exist
+    for links in (positive_links, negative_links):
+        for _ in range(int(len(links) * orphan_ratio)):
+            if rng.random() < 0.5:
+                links.append((reviews + rng.randint(1, reviews), rng.randint(1, FACTOR_COUNT)))
+            else:
+                links.append((rng.randint(1, reviews), FACTOR_COUNT + rng.randint(1, 100)))
+
+    conn.executemany("INSERT INTO crop_reviews (id, crop_id, notes, is_jonathan, activities, top_clothing) VALUES (?, ?, ?, ?, ?, ?)",
+                     review_rows)
+    conn.executemany("INSERT OR IGNORE INTO crop_review_positive_factors VALUES (?, ?)", positive_links)
+    conn.executemany("INSERT OR IGNORE INTO crop_review_negative_factors VALUES (?, ?)", negative_links)
+    conn.commit()
+    conn.close()
+
+def legacy_incomplete_reviews(cursor: sqlite3.Cursor) -> tuple[list[dict], int]:
+    """The incomplete-review check as it was: one join over both factor tables, grouped in Python"""
+    cursor.execute("""
+        SELECT cr.id, cr.crop_id, cr.notes, cr.is_jonathan, cr.activities, cr.top_clothing,
+               pf.factor_id as has_positive_factors,
+               nf.factor_id as has_negative_factors
+        FROM crop_reviews cr
+        LEFT JOIN crop_review_positive_factors pf ON cr.id = pf.crop_review_id
+        LEFT JOIN crop_review_negative_factors nf ON cr.id = nf.crop_review_id
+    """)
+    reviews = cursor.fetchall()
+    review_groups = {}
+    for review in reviews:
+        review_id = review['id']
+        if review_id not in review_groups:
+            review_groups[review_id] = {
+                'crop_id': review['crop_id'],
+                'notes': review['notes'],
+                'is_jonathan': review['is_jonathan'],
+                'activities': review['activities'],
+                'top_clothing': review['top_clothing'],
+                'has_positive_factors': False,
+                'has_negative_factors': False
+            }
+        if review['has_positive_factors']:
+            review_groups[review_id]['has_positive_factors'] = True
+        if review['has_negative_factors']:
+            review_groups[review_id]['has_negative_factors'] = True
+
+    issues = []
+    for review_id, review_data in review_groups.items():
+        has_notes = review_data['notes'] and review_data['notes'].strip()
+        has_jonathan = review_data['is_jonathan'] is not None
+        has_activities = review_data['activities'] and review_data['activities'].strip()
+        has_clothing = review_data['top_clothing'] and review_data['top_clothing'].strip()
+        has_factors = review_data['has_positive_factors'] or review_data['has_negative_factors']
+        if not (has_notes or has_jonathan or has_activities or has_clothing or has_factors):
+            issues.append({'review_id': review_id, 'crop_id': review_data['crop_id'], 'issue': 'all_fields_empty'})
+    return issues, len(reviews)
+
+def legacy_orphaned_factors(cursor: sqlite3.Cursor, table: str) -> tuple[list[dict], int]:
+    """The orphaned-factor check as it was: every link joined to both parents and tested in Python"""
+    cursor.execute(f"""
+        SELECT link.*, cr.id as review_exists, f.id as factor_exists
+        FROM {table} link
+        LEFT JOIN crop_reviews cr ON link.crop_review_id = cr.id
+        LEFT JOIN factors f ON link.factor_id = f.id
+    """)
+    links = cursor.fetchall()
+    issues = []
+    for link in links:
+        for exists, issue in ((link['review_exists'], 'review_not_found'), (link['factor_exists'], 'factor_not_found')):
+            if not exists:
+                issues.append({
+                    'factor_link_id': f"{link['crop_review_id']}-{link['factor_id']}",
+                    'crop_review_id': link['crop_review_id'],
+                    'factor_id': link['factor_id'],
+                    'issue': issue
+                })
+    return issues, len(links)
+
+class CollectingCleaner(DatabaseCleaner):
+    """Keeps every reported issue in memory so it can be compared with the legacy results"""
+    def reset(self):
+        super().reset()
+        self.collected = defaultdict(list)
+
+    def _report_issue(self, issue_type: str, issue: dict):
+        super()._report_issue(issue_type, issue)
+        self.collected[issue_type].append(issue)
+
+def timed(fn, *args) -> tuple[object, float]:
+    """Runs fn and returns its result and wall time in seconds"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+def run_checks(db_path: Path) -> tuple[dict, dict]:
+    """Times the legacy and the current checks; returns timings and both sets of issues"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    timings = {}
+    legacy = {}
+
+    (legacy['incomplete_reviews'], rows), timings['legacy_incomplete_reviews'] = timed(legacy_incomplete_reviews, cursor)
+    timings['legacy_incomplete_reviews_rows'] = rows
+    factor_rows = 0
+    started = time.perf_counter()
+    for table, issue_type in (('crop_review_positive_factors', 'orphaned_positive_factors'),
+                              ('crop_review_negative_factors', 'orphaned_negative_factors')):
+        legacy[issue_type], rows = legacy_orphaned_factors(cursor, table)
+        factor_rows += rows
+    timings['legacy_factors_relationships'] = time.perf_counter() - started
+    timings['legacy_factors_relationships_rows'] = factor_rows
+
+    cleaner = CollectingCleaner(str(db_path))
+    cleaner.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, timings['incomplete_reviews'] = timed(cleaner._check_incomplete_reviews, cursor)
+        _, timings['factors_relationships'] = timed(cleaner._check_factors_relationships, cursor)
+    conn.close()
+    return timings, {'legacy': legacy, 'current': dict(cleaner.collected)}
+
+def compare_issues(legacy: dict, current: dict) -> bool:
+    """Prints any difference between the two implementations' issues; True if they match"""
+    matched = True
+    key = lambda issue: json.dumps(issue, sort_keys=True)
+    for issue_type in sorted(set(legacy) | set(current)):
+        old = sorted(map(key, legacy.get(issue_type, [])))
+        new = sorted(map(key, current.get(issue_type, [])))
+        if old == new:
+            print(f"  ✅ {issue_type}: {len(new)} issues match")
+            continue
+        matched = False
+        missing, extra = set(old) - set(new), set(new) - set(old)
+        print(f"  ❌ {issue_type}: legacy {len(old)}, current {len(new)} "
+              f"({len(missing)} missing, {len(extra)} extra)")
+        for issue in list(missing)[:3]:
+            print(f"      missing: {issue}")
+        for issue in list(extra)[:3]:
+            print(f"      extra:   {issue}")
+    return matched
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and verify database_cleaner.py's review and factor checks")
+    parser.add_argument('--reviews', type=int, default=100_000, help='Number of crop reviews to generate')
+    parser.add_argument('--empty-ratio', type=float, default=0.1, help='Share of reviews with blank text fields')
+    parser.add_argument('--orphan-ratio', type=float, default=0.01, help='Extra factor links pointing at missing rows, as a share of links')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the generated data')
+    parser.add_argument('--verify', action='store_true', help='Check that the current checks report exactly the legacy issues')
+    parser.add_argument('--work-root', default=tempfile.gettempdir(), help='Where the synthetic database is created')
+    parser.add_argument('--output', help='Also write the timings to this JSON file')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated database for inspection')
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix='bench_database_cleaner_', dir=args.work_root))
+    db_path = work_dir / 'traffic_cameras.db'
+    try:
+        print(f"🏗️ Generating {args.reviews} reviews in {db_path}...")
+        _, generate_seconds = timed(generate_database, db_path, args.reviews, args.empty_ratio, args.orphan_ratio, args.seed)
+        print(f"  Done in {generate_seconds:.1f}s")
+
+        print("⏱️ Running checks...")
+        timings, issues = run_checks(db_path)
+        print(f"\n{'Check':<26}{'legacy':>12}{'set-based':>12}{'speedup':>10}  legacy rows fetched")
+        for check in ('incomplete_reviews', 'factors_relationships'):
+            old, new = timings[f"legacy_{check}"], timings[check]
+            print(f"{check:<26}{old:>11.3f}s{new:>11.3f}s{old / new if new else 0:>9.1f}x  {timings[f'legacy_{check}_rows']}")
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'reviews': args.reviews, 'seed': args.seed, 'timings': timings,
+                           'issue_counts': {t: len(i) for t, i in issues['current'].items()}}, f, indent=2)
+            print(f"\n📄 Timings saved to {args.output}")
+
+        if args.verify:
+            print("\n🔍 Comparing issues with the legacy implementation:")
+            if not compare_issues(issues['legacy'], issues['current']):
+                return 1
+    finally:
+        if args.keep:
+            print(f"\nGenerated database kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
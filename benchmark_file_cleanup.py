@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Benchmark Harness for file_cleanup.py
+
+Generates a synthetic captured_images tree and a matching traffic_cameras.db
+in a temporary directory, then times each cleanup phase against it:
+
+1. find_old_files              - scanning the capture tree
+2. evaluate_cleanup_rules      - all rules in one database pass
+3. move_files_and_update_records - moving the matches to the archive
+4. cleanup_archive_space       - evicting the oldest archived files
+
+The archive lives on a second filesystem (/dev/shm by default, which is
+tmpfs on Linux), so moves take the cross-device copy path. Each tree size
+runs in its own subprocess, and every phase records wall time, CPU time,
+peak RSS so far, and the read/write syscall and byte counters from
+/proc/self/io where available. Results are written as JSON and can be
+compared against an earlier run.
+
+Usage:
+    python benchmark_file_cleanup.py                               # 10k and 100k frames
+    python benchmark_file_cleanup.py --sizes 10000 100000 1000000  # Include 1M frames
+    python benchmark_file_cleanup.py --compare benchmark_results/old.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime, timedelta
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_SIZES = [10_000, 100_000]
+PHASES = ['generate', 'find_old_files', 'evaluate_cleanup_rules', 'move_files_and_update_records',
+          'cleanup_archive_space']
+
+# Rules used for every run, so results stay comparable
+BENCHMARK_RULES = [
+    {"description": "Older than 6h, no views or crops", "priority": 10, "age_hours": 6, "min_views": 0, "max_crops": 0},
+    {"description": "Older than 2 days, viewed, no crops", "priority": 20, "age_hours": 48, "min_views": 1, "max_crops": 0},
+]
+
+# The tables file_cleanup.py reads, as created by database.js
+BENCHMARK_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS image_stats (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        camera_name TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        total_views INTEGER DEFAULT 0,
+        unique_viewers INTEGER DEFAULT 0,
+        first_viewed_at DATETIME,
+        last_viewed_at DATETIME,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(camera_name, filename)
+    );
+    CREATE TABLE IF NOT EXISTS saved_crops (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        original_camera TEXT NOT NULL,
+        original_filename TEXT NOT NULL,
+        original_path TEXT,
+        crop_filename TEXT NOT NULL,
+        crop_folder TEXT NOT NULL,
+        click_x REAL NOT NULL,
+        click_y REAL NOT NULL,
+        crop_left INTEGER NOT NULL,
+        crop_top INTEGER NOT NULL,
+        crop_width INTEGER NOT NULL,
+        crop_height INTEGER NOT NULL,
+        original_width INTEGER NOT NULL,
+        original_height INTEGER NOT NULL,
+        saved_by_ip TEXT,
+        original_timestamp TEXT,
+        saved_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        metadata TEXT,
+        migrated_from_json BOOLEAN DEFAULT FALSE
+    );
+    CREATE INDEX IF NOT EXISTS idx_image_stats_camera_file ON image_stats(camera_name, filename);
+    CREATE INDEX IF NOT EXISTS idx_saved_crops_original ON saved_crops(original_camera, original_filename);
+"""
+
+def read_proc_io() -> dict:
+    """Returns this process's I/O counters from /proc/self/io, or an empty dict where unavailable."""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return {key: int(counters[key]) for key in ('syscr', 'syscw', 'read_bytes', 'write_bytes')}
+    except (OSError, KeyError, ValueError):
+        return {}
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process so far, in KB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # macOS reports bytes
+
+class PhaseTimer:
+    """Context manager that records wall time, CPU time, peak RSS and I/O counters for one phase."""
+
+    def __init__(self, results: dict, name: str):
+        self.results = results
+        self.name = name
+
+    def __enter__(self):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.cpu_start = usage.ru_utime + usage.ru_stime
+        self.io_start = read_proc_io()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        io_end = read_proc_io()
+        phase = {
+            'seconds': round(wall, 4),
+            'cpu_seconds': round(usage.ru_utime + usage.ru_stime - self.cpu_start, 4),
+            'peak_rss_kb': peak_rss_kb()
+        }
+        for key, value in io_end.items():
+            phase[key] = value - self.io_start.get(key, 0)
+        self.results[self.name] = phase
+        print(f"  {self.name:<32} {wall:9.3f}s  cpu {phase['cpu_seconds']:8.3f}s  "
+              f"rss {phase['peak_rss_kb'] / 1024:8.1f} MB  syscr {phase.get('syscr', '-')}  syscw {phase.get('syscw', '-')}",
+              flush=True)
+        return False
+
+def generate_tree(root: Path, frames: int, cameras: int, frame_bytes: int, view_ratio: float, crop_ratio: float,
+                  span_days: float, seed: int) -> tuple[Path, Path]:
+    """
+    Creates captured_images/<camera>/YYYYMMDD_HHMMSS.jpg frames spread evenly
+    over the last span_days, plus a database with image_stats rows for a
+    share of them (viewed) and saved_crops rows for another share.
+
+    Returns:
+        The capture directory and the database path.
+    """
+    rng = random.Random(seed)
+    target_dir = root / "captured_images"
+    db_path = root / "traffic_cameras.db"
+    payload = b'\xff\xd8\xff\xe0' + bytes(max(frame_bytes - 4, 0))
+    now = datetime.now().replace(microsecond=0)
+
+    views = []
+    crops = []
+    per_camera = -(-frames // cameras)
+    spacing = max(int(span_days * 86400 / per_camera), 1)
+    written = 0
+    for camera_index in range(cameras):
+        camera = f"Benchmark_Cam_{camera_index:03d}"
+        camera_dir = target_dir / camera
+        camera_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(min(per_camera, frames - written)):
+            captured = now - timedelta(seconds=spacing * i)
+            filename = f"{captured.strftime('%Y%m%d_%H%M%S')}.jpg"
+            path = camera_dir / filename
+            with open(path, 'wb') as f:
+                f.write(payload)
+            stamp = captured.timestamp()
+            os.utime(path, (stamp, stamp))
+            roll = rng.random()
+            if roll < crop_ratio:
+                crops.append((camera, filename))
+            elif roll < crop_ratio + view_ratio:
+                views.append((camera, filename, rng.randint(1, 5)))
+            written += 1
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BENCHMARK_SCHEMA)
+    conn.executemany("INSERT INTO image_stats (camera_name, filename, total_views, unique_viewers) VALUES (?, ?, ?, 1)", views)
+    conn.executemany("""
+        INSERT INTO saved_crops (original_camera, original_filename, crop_filename, crop_folder,
+                                 click_x, click_y, crop_left, crop_top, crop_width, crop_height, original_width, original_height)
+        VALUES (?, ?, ?, ?, 0, 0, 0, 0, 100, 100, 1280, 720)
+    """, [(camera, filename, f"crop_{filename}", f"saved_images/{camera}") for camera, filename in crops])
+    conn.commit()
+    conn.close()
+    return target_dir, db_path
+
+def run_size(args: argparse.Namespace) -> dict:
+    """Runs every phase for one tree size in this process and returns its measurements."""
+    sys.path.insert(0, str(SCRIPT_DIR))
+    work_dir = Path(tempfile.mkdtemp(prefix=f"cleanup_bench_{args.run_size}_", dir=args.work_root))
+    archive_root = Path(tempfile.mkdtemp(prefix=f"cleanup_bench_archive_{args.run_size}_", dir=args.archive_root))
+    os.chdir(work_dir)  # file_cleanup.log is written to the working directory
+
+    import file_cleanup
+    file_cleanup.logger.setLevel(logging.DEBUG if args.verbose else logging.ERROR)
+
+    phases = {}
+    result = {'frames': args.run_size, 'work_dir': str(work_dir), 'archive_dir': str(archive_root), 'phases': phases}
+    try:
+        with PhaseTimer(phases, 'generate'):
+            target_dir, db_path = generate_tree(work_dir, args.run_size, args.cameras, args.frame_bytes,
+                                                args.view_ratio, args.crop_ratio, args.span_days, args.seed)
+
+        min_age = min(rule['age_hours'] for rule in BENCHMARK_RULES)
+        with PhaseTimer(phases, 'find_old_files'):
+            candidates = list(file_cleanup.find_old_files(target_dir, min_age))
+        result['candidates'] = len(candidates)
+
+        with PhaseTimer(phases, 'evaluate_cleanup_rules'):
+            matches, _ = file_cleanup.evaluate_cleanup_rules(candidates, db_path, BENCHMARK_RULES)
+        result['matched'] = len(matches)
+
+        # Unthrottled, so the measurement is the mover itself rather than the rate limits
+        profile = {'name': 'benchmark', 'workers': args.workers, 'files_per_sec': 1e9, 'mb_per_sec': 1e9,
+                   'target_latency_ms': 60_000}
+        with PhaseTimer(phases, 'move_files_and_update_records'):
+            moved = file_cleanup.move_files_and_update_records([m.candidate for m in matches], db_path, str(archive_root),
+                                                               dry_run=False, rate_profile=profile)
+        result['moved'] = moved['moved']
+
+        # Ask for exactly enough space that cleanup_files of the oldest archived frames must go
+        free_bytes = shutil.disk_usage(archive_root).free
+        cleanup_bytes = args.cleanup_files * args.frame_bytes
+        with PhaseTimer(phases, 'cleanup_archive_space'):
+            cleaned = file_cleanup.cleanup_archive_space(str(archive_root), target_free_gb=(free_bytes + cleanup_bytes) / 1024**3,
+                                                         max_cleanup_gb=cleanup_bytes / 1024**3, dry_run=False, db_path=db_path)
+        result['archive_deleted'] = cleaned.get('deleted_count', 0)
+    finally:
+        if not args.keep:
+            os.chdir(args.work_root)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            shutil.rmtree(archive_root, ignore_errors=True)
+    return result
+
+def compare_results(baseline: dict, current: dict):
+    """Prints per-phase time and peak RSS ratios of the current run against a baseline run."""
+    baseline_by_size = {run['frames']: run for run in baseline['results']}
+    print(f"\nComparison with {baseline['started_at']} (ratio < 1.00 is faster / smaller):")
+    for run in current['results']:
+        base = baseline_by_size.get(run['frames'])
+        if base is None:
+            print(f"  {run['frames']} frames: not in baseline")
+            continue
+        print(f"  {run['frames']} frames:")
+        for phase in PHASES:
+            now_phase, base_phase = run['phases'].get(phase), base['phases'].get(phase)
+            if not now_phase or not base_phase:
+                continue
+            time_ratio = now_phase['seconds'] / base_phase['seconds'] if base_phase['seconds'] else float('inf')
+            rss_ratio = now_phase['peak_rss_kb'] / base_phase['peak_rss_kb'] if base_phase['peak_rss_kb'] else float('inf')
+            print(f"    {phase:<32} {base_phase['seconds']:9.3f}s -> {now_phase['seconds']:9.3f}s  "
+                  f"x{time_ratio:5.2f}   rss x{rss_ratio:5.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark file_cleanup.py against synthetic capture trees")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Frame counts to benchmark')
+    parser.add_argument('--cameras', type=int, default=20, help='Number of camera folders')
+    parser.add_argument('--frame-bytes', type=int, default=2048, help='Size of each synthetic frame')
+    parser.add_argument('--view-ratio', type=float, default=0.05, help='Share of frames with views')
+    parser.add_argument('--crop-ratio', type=float, default=0.01, help='Share of frames with saved crops')
+    parser.add_argument('--span-days', type=float, default=14, help='Days of history the frames are spread over')
+    parser.add_argument('--workers', type=int, default=4, help='Mover worker threads')
+    parser.add_argument('--cleanup-files', type=int, default=200,
+                        help='Archived frames cleanup_archive_space is made to delete (it paces each delete)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for views and crops')
+    parser.add_argument('--work-root', default=tempfile.gettempdir(), help='Where the synthetic trees are created')
+    parser.add_argument('--archive-root', default='/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                        help='Where the synthetic archive is created (ideally a separate tmpfs mount)')
+    parser.add_argument('--output', help='Results file (default: benchmark_results/file_cleanup_<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated trees for inspection')
+    parser.add_argument('--verbose', action='store_true', help='Show file_cleanup log output')
+    parser.add_argument('--run-size', type=int, help=argparse.SUPPRESS)  # Internal: run one size in this process
+    args = parser.parse_args()
+
+    if args.run_size:
+        print(json.dumps(run_size(args)))  # Last line of stdout; file_cleanup logs go to stderr
+        return
+
+    started_at = datetime.now().isoformat(timespec='seconds')
+    results = {
+        'started_at': started_at,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {key: getattr(args, key) for key in ('cameras', 'frame_bytes', 'view_ratio', 'crop_ratio', 'span_days',
+                                                       'workers', 'cleanup_files', 'seed', 'work_root', 'archive_root')},
+        'rules': BENCHMARK_RULES,
+        'results': []
+    }
+
+    print(f"🧪 Benchmarking file_cleanup.py: sizes {args.sizes}, archive on {args.archive_root}")
+    for size in args.sizes:
+        print(f"\n📁 {size} frames")
+        # Each size gets a fresh process so peak RSS and I/O counters aren't shared between sizes
+        command = [sys.executable, str(Path(__file__).resolve()), '--run-size', str(size)]
+        for key in ('cameras', 'frame_bytes', 'view_ratio', 'crop_ratio', 'span_days', 'workers', 'cleanup_files', 'seed',
+                    'work_root', 'archive_root'):
+            command += [f"--{key.replace('_', '-')}", str(getattr(args, key))]
+        command += [flag for flag, enabled in (('--keep', args.keep), ('--verbose', args.verbose)) if enabled]
+        process = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+        if process.returncode != 0:
+            print(f"❌ Run for {size} frames failed (exit code {process.returncode})")
+            continue
+        lines = process.stdout.rstrip().splitlines()
+        for line in lines[:-1]:
+            print(line)
+        results['results'].append(json.loads(lines[-1]))
+
+    output = Path(args.output) if args.output else SCRIPT_DIR / "benchmark_results" / f"file_cleanup_{started_at.replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare_results(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,18 @@ import hashlib
 import requests
 import shutil
 import csv
+import subprocess
+import sys
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from PIL import Image
+from PIL import Image, features
 import io
 import logging
 
+from image_formats import is_image_file
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,20 +28,217 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Supported transcoding targets: (Pillow format, file extension, Pillow feature to check)
+TRANSCODE_FORMATS = {
+    'jpeg': ('JPEG', '.jpg', None),
+    'webp': ('WEBP', '.webp', 'webp'),
+    'avif': ('AVIF', '.avif', 'avif'),
+}
+
+def transcode_image(filepath, image_format, quality):
+    """Re-encode a saved frame and swap it into place.
+
+    Runs inside the transcoding process pool, so it only works from its
+    arguments and returns a plain dict describing what happened. The new
+    encoding is written to a temporary file next to the original and moved
+    over it with os.replace. If the result is not smaller, the original is kept.
+    """
+    cpu_start = time.process_time()
+    source = Path(filepath)
+    pil_format, extension, _ = TRANSCODE_FORMATS[image_format]
+    destination = source.with_suffix(extension)
+    temp_path = destination.with_name(f".{destination.name}.tmp")
+
+    result = {
+        'source': str(source),
+        'path': str(source),
+        'format': image_format,
+        'original_bytes': 0,
+        'new_bytes': 0,
+        'cpu_seconds': 0.0,
+        'replaced': False,
+        'error': None
+    }
+
+    try:
+        source_stat = source.stat()
+        result['original_bytes'] = source_stat.st_size
+        result['new_bytes'] = source_stat.st_size
+
+        with Image.open(source) as img:
+            img.load()
+            save_kwargs = {'quality': quality}
+            if pil_format == 'JPEG':
+                save_kwargs.update(optimize=True, progressive=True)
+                if img.mode not in ('RGB', 'L'):
+                    img = img.convert('RGB')
+            elif pil_format == 'WEBP':
+                save_kwargs['method'] = 6
+            img.save(temp_path, pil_format, **save_kwargs)
+
+        new_bytes = temp_path.stat().st_size
+        if new_bytes >= source_stat.st_size:
+            # Re-encoding didn't help, keep the city's original bytes
+            temp_path.unlink()
+        else:
+            # Keep the capture time as the mtime so age-based cleanup is unaffected
+            os.utime(temp_path, (source_stat.st_atime, source_stat.st_mtime))
+            os.replace(temp_path, destination)
+            if destination != source:
+                source.unlink()
+            result.update(path=str(destination), new_bytes=new_bytes, replaced=True)
+    except Exception as e:
+        result['error'] = str(e)
+        try:
+            temp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    result['cpu_seconds'] = time.process_time() - cpu_start
+    return result
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over the target so readers never see a partial file."""
+    path = Path(path)
+    temp_path = path.with_name(f".{path.name}.tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(temp_path, path)
+
+def count_frames(camera_dir):
+    """Count the frames in a camera folder and find the oldest one (frame names sort by capture time)."""
+    count = 0
+    oldest = None
+    with os.scandir(camera_dir) as entries:
+        for entry in entries:
+            if not is_image_file(entry.name):
+                continue
+            count += 1
+            if oldest is None or entry.name < oldest:
+                oldest = entry.name
+    return count, oldest
+
+# Disk pressure stages, from least to most severe
+PRESSURE_STAGES = ['normal', 'elevated', 'high', 'critical']
+
+# Defaults for the optional "disk_pressure" section of config.json
+DISK_PRESSURE_DEFAULTS = {
+    'enabled': True,
+    'window_minutes': 60,               # How much free-space history to fit the fill rate over
+    'min_samples': 5,                   # Samples needed before trusting the fill rate
+    'elevated': {'free_gb': 20.0, 'hours_to_full': 24.0},
+    'high': {'free_gb': 10.0, 'hours_to_full': 6.0},
+    'critical': {'free_gb': 5.0, 'hours_to_full': 2.0},
+    'recovery_margin': 1.2,             # Free space/time must beat a threshold by this factor to step down
+    'elevated_similarity_threshold': 0.999,
+    'low_priority_interval_multiplier': 4,
+    'cleanup_command': ['file_cleanup.py', '--once'],
+    'cleanup_cooldown_minutes': 30,
+    'metrics_file': 'capture_metrics.json',
+    'transition_log': 'disk_pressure_log.csv'
+}
+
+def load_pressure_settings(config):
+    """Merge the "disk_pressure" section of config.json over DISK_PRESSURE_DEFAULTS.
+
+    Each stage's thresholds are merged over that stage's defaults, so a
+    partial override like {"critical": {"free_gb": 8}} keeps the default
+    hours_to_full. Unknown keys and values of the wrong type are logged and
+    ignored, so a typo can't break classify_pressure on every cycle.
+    """
+    settings = {key: dict(value) if isinstance(value, dict) else value
+                for key, value in DISK_PRESSURE_DEFAULTS.items()}
+    if not isinstance(config, dict):
+        logger.error(f"Ignoring disk_pressure config: expected an object, got {type(config).__name__}")
+        return settings
+
+    for key, value in config.items():
+        if key not in DISK_PRESSURE_DEFAULTS:
+            logger.warning(f"Ignoring unknown disk_pressure setting '{key}'")
+            continue
+        default = DISK_PRESSURE_DEFAULTS[key]
+        if isinstance(default, dict):
+            if not isinstance(value, dict):
+                logger.warning(f"Ignoring disk_pressure.{key}: expected an object with {', '.join(default)}")
+                continue
+            for limit, number in value.items():
+                if limit not in default:
+                    logger.warning(f"Ignoring unknown disk_pressure.{key} setting '{limit}'")
+                elif isinstance(number, bool) or not isinstance(number, (int, float)):
+                    logger.warning(f"Ignoring disk_pressure.{key}.{limit}: expected a number, got {number!r}")
+                else:
+                    settings[key][limit] = float(number)
+            continue
+
+        if isinstance(default, bool):
+            valid = isinstance(value, bool)
+        elif isinstance(default, (int, float)):
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        else:
+            valid = isinstance(value, type(default))
+        if valid:
+            settings[key] = value
+        else:
+            logger.warning(f"Ignoring disk_pressure.{key}: expected {type(default).__name__}, got {value!r}")
+    return settings
+
+# Defaults for the optional "latest_index" section of config.json
+LATEST_INDEX_DEFAULTS = {
+    'enabled': True,
+    'filename': 'latest_index.json',    # Written inside the output directory
+    'link_dir': None,                   # e.g. "latest_images" to keep a <camera>.jpg hard link per camera
+    'recount_minutes': 30               # Re-seed each camera's frame count from disk this often (cleanup archives frames)
+}
+
 class CameraCapture:
     def __init__(self, config_file='config.json'):
         """Initialize the camera capture system."""
         self.config_file = config_file
+        self.settings = {}
         self.cameras = self.load_config()
         self.output_dir = Path('captured_images')
         self.output_dir.mkdir(exist_ok=True)
         self.last_image_hashes = {}
+
+        # Optional background transcoding of saved frames (off unless configured)
+        self.transcode_settings = self.settings.get('transcoding', {})
+        self.transcode_pool = None
+        self.transcode_pending = []
+        self.transcode_format_support = {}
+
+        # Disk-pressure tracking, driven by the free-space samples taken each cycle
+        self.pressure_settings = load_pressure_settings(self.settings.get('disk_pressure', {}))
+        self.disk_samples = deque()
+        self.pressure_stage = 'normal'
+        self.cycle_count = 0
+        self.cleanup_process = None
+        self.last_cleanup_started = 0
+
+        # Small per-camera index of the newest saved frame, so readers don't have to list directories
+        self.latest_settings = {**LATEST_INDEX_DEFAULTS, **self.settings.get('latest_index', {})}
+        self.latest_index_path = self.output_dir / self.latest_settings['filename']
+        self.latest_index = self.load_latest_index()
+        # Per-camera frame count and oldest frame, counted from disk on the first save after
+        # startup and every recount_minutes after that, and kept up to date in between
+        self.frame_counts = {}
+
+        self.metrics = {
+            'disk_pressure_stage': 'normal',
+            'disk_free_bytes': None,
+            'disk_fill_rate_bytes_per_hour': None,
+            'disk_hours_to_full': None,
+            'disk_pressure_transitions': {},
+            'frames_skipped_similar': 0,
+            'captures_skipped_low_priority': 0,
+            'cleanup_runs_triggered': 0
+        }
         
     def load_config(self):
         """Load camera configuration from config file."""
         try:
             with open(self.config_file, 'r') as f:
                 config = json.load(f)
+            self.settings = config
             return config.get('cameras', [])
         except Exception as e:
             logger.error(f"Failed to load config: {e}")
@@ -124,7 +327,7 @@ class CameraCapture:
             return None
     
     def save_image(self, camera_name, image_data, timestamp):
-        """Save image to appropriate folder."""
+        """Save image to appropriate folder. Returns the saved path, or None on failure."""
         try:
             camera_dir = self.output_dir / camera_name
             camera_dir.mkdir(exist_ok=True)
@@ -136,10 +339,215 @@ class CameraCapture:
                 f.write(image_data)
             
             logger.info(f"Saved image: {filepath}")
-            return True
+            return filepath
         except Exception as e:
             logger.error(f"Failed to save image for {camera_name}: {e}")
-            return False
+            return None
+
+    def load_latest_index(self):
+        """Load the existing latest-frame index so a restart keeps entries for every camera."""
+        if not self.latest_settings['enabled'] or not self.latest_index_path.is_file():
+            return {}
+        try:
+            with open(self.latest_index_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('cameras', {})
+        except Exception as e:
+            logger.warning(f"Could not read latest-frame index, starting a new one: {e}")
+            return {}
+
+    def update_latest_index(self, camera_name, filepath, timestamp, image_data=None):
+        """Record a camera's newest frame and atomically republish the latest-frame index."""
+        if not self.latest_settings['enabled']:
+            return
+
+        try:
+            filepath = Path(filepath)
+            entry = self.latest_index.get(camera_name, {}) if image_data is None else {}
+            if image_data is not None:
+                # Only the header is parsed to get the dimensions
+                with Image.open(io.BytesIO(image_data)) as img:
+                    entry['width'], entry['height'] = img.size
+
+            counts = self.frame_counts.get(camera_name)
+            if counts is None or time.monotonic() - counts['counted_at'] >= self.latest_settings['recount_minutes'] * 60:
+                # Also picks up frames archived by file_cleanup.py since the last count
+                image_count, oldest_filename = count_frames(filepath.parent)
+                counts = self.frame_counts[camera_name] = {
+                    'image_count': image_count, 'oldest_filename': oldest_filename, 'counted_at': time.monotonic()
+                }
+            elif image_data is not None:
+                # A newly saved frame (transcoding replaces a frame, so it leaves the count alone)
+                counts['image_count'] += 1
+                counts['oldest_filename'] = counts['oldest_filename'] or filepath.name
+            entry.update({
+                'filename': filepath.name,
+                'path': f"/images/{camera_name}/{filepath.name}",
+                'timestamp': timestamp.isoformat(timespec='seconds'),
+                'size': filepath.stat().st_size,
+                'image_count': counts['image_count'],
+                'oldest_filename': counts['oldest_filename']
+            })
+            self.latest_index[camera_name] = entry
+
+            write_json_atomic(self.latest_index_path, {
+                'updated_at': datetime.now().isoformat(timespec='seconds'),
+                'cameras': self.latest_index
+            })
+
+            if self.latest_settings['link_dir']:
+                self.update_latest_link(camera_name, filepath)
+        except Exception as e:
+            logger.error(f"Failed to update latest-frame index for {camera_name}: {e}")
+
+    def update_latest_link(self, camera_name, filepath):
+        """Point <link_dir>/<camera><ext> at the newest frame, using a hard link where possible."""
+        link_dir = Path(self.latest_settings['link_dir'])
+        link_dir.mkdir(exist_ok=True)
+        link_path = link_dir / f"{camera_name}{filepath.suffix}"
+        temp_path = link_dir / f".{link_path.name}.tmp"
+
+        try:
+            temp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+        try:
+            os.link(filepath, temp_path)
+        except OSError:
+            # Different volume or no hard link support, fall back to a copy
+            shutil.copy2(filepath, temp_path)
+        os.replace(temp_path, link_path)
+
+        # Drop a link with a different extension left over from before transcoding
+        for stale_link in link_dir.glob(f"{camera_name}.*"):
+            if stale_link != link_path:
+                stale_link.unlink()
+
+    def format_supported(self, image_format):
+        """Check (once) whether the installed Pillow can write the given format."""
+        if image_format not in self.transcode_format_support:
+            if image_format not in TRANSCODE_FORMATS:
+                supported = False
+            else:
+                feature = TRANSCODE_FORMATS[image_format][2]
+                try:
+                    supported = feature is None or bool(features.check(feature))
+                except Exception:
+                    supported = False
+            if not supported:
+                logger.warning(f"Transcoding format '{image_format}' is not supported by this Pillow install")
+            self.transcode_format_support[image_format] = supported
+        return self.transcode_format_support[image_format]
+
+    def get_transcode_policy(self, camera_name):
+        """Return the effective transcoding policy for a camera, or None if disabled.
+
+        The global "transcoding" section of config.json is the default, and
+        entries under its "cameras" key override it per camera.
+        """
+        settings = self.transcode_settings
+        if not settings:
+            return None
+
+        policy = {
+            'enabled': settings.get('enabled', False),
+            'format': settings.get('format', 'jpeg'),
+            'quality': settings.get('quality', 85)
+        }
+        policy.update(settings.get('cameras', {}).get(camera_name, {}))
+
+        if not policy['enabled']:
+            return None
+        if not self.format_supported(policy['format']):
+            return None
+        return policy
+
+    def queue_transcode(self, camera_name, filepath):
+        """Hand a freshly saved frame to the background transcoding pool."""
+        policy = self.get_transcode_policy(camera_name)
+        if policy is None:
+            return
+
+        try:
+            if self.transcode_pool is None:
+                workers = self.transcode_settings.get('workers', 2)
+                self.transcode_pool = ProcessPoolExecutor(max_workers=workers)
+                logger.info(f"Started transcoding pool with {workers} worker(s)")
+
+            future = self.transcode_pool.submit(transcode_image, str(filepath), policy['format'], policy['quality'])
+            self.transcode_pending.append((camera_name, future))
+        except Exception as e:
+            logger.error(f"Failed to queue transcoding for {filepath}: {e}")
+
+    def collect_transcode_results(self):
+        """Gather finished transcoding jobs and append them to the transcoding report."""
+        if not self.transcode_pending:
+            return
+
+        totals = defaultdict(lambda: {'files': 0, 'replaced': 0, 'original_bytes': 0, 'new_bytes': 0, 'cpu_seconds': 0.0})
+        still_pending = []
+
+        for camera_name, future in self.transcode_pending:
+            if not future.done():
+                still_pending.append((camera_name, future))
+                continue
+
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Transcoding worker failed for {camera_name}: {e}")
+                continue
+
+            if result['error']:
+                logger.warning(f"Transcoding failed for {result['source']}: {result['error']}")
+            elif result['replaced']:
+                # Keep the latest-frame index pointing at the re-encoded file
+                latest = self.latest_index.get(camera_name)
+                if latest and latest['filename'] == Path(result['source']).name:
+                    self.update_latest_index(camera_name, result['path'], datetime.fromisoformat(latest['timestamp']))
+
+            camera_totals = totals[(camera_name, result['format'])]
+            camera_totals['files'] += 1
+            camera_totals['replaced'] += 1 if result['replaced'] else 0
+            camera_totals['original_bytes'] += result['original_bytes']
+            camera_totals['new_bytes'] += result['new_bytes']
+            camera_totals['cpu_seconds'] += result['cpu_seconds']
+
+        self.transcode_pending = still_pending
+        if not totals:
+            return
+
+        saved_bytes = sum(t['original_bytes'] - t['new_bytes'] for t in totals.values())
+        cpu_seconds = sum(t['cpu_seconds'] for t in totals.values())
+        files = sum(t['files'] for t in totals.values())
+        logger.info(f"Transcoded {files} images: saved {saved_bytes / 1024:.1f} KB using {cpu_seconds:.2f}s CPU")
+
+        try:
+            report_file = Path(self.transcode_settings.get('report_file', 'transcode_report.csv'))
+            file_exists = report_file.is_file()
+
+            with open(report_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if not file_exists:
+                    writer.writerow(['timestamp', 'camera', 'format', 'files', 'replaced', 'original_bytes',
+                                     'new_bytes', 'bytes_saved', 'cpu_seconds', 'bytes_saved_per_cpu_second'])
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                for (camera_name, image_format), t in sorted(totals.items()):
+                    bytes_saved = t['original_bytes'] - t['new_bytes']
+                    per_cpu = bytes_saved / t['cpu_seconds'] if t['cpu_seconds'] > 0 else 0
+                    writer.writerow([timestamp, camera_name, image_format, t['files'], t['replaced'], t['original_bytes'],
+                                     t['new_bytes'], bytes_saved, f"{t['cpu_seconds']:.4f}", f"{per_cpu:.0f}"])
+        except Exception as e:
+            logger.error(f"Failed to write transcoding report: {e}")
+
+    def shutdown_transcoding(self):
+        """Wait for queued transcoding jobs to finish and stop the pool."""
+        if self.transcode_pool is None:
+            return
+        logger.info(f"Waiting for {len(self.transcode_pending)} transcoding job(s) to finish")
+        self.transcode_pool.shutdown(wait=True)
+        self.collect_transcode_results()
+        self.transcode_pool = None
     
     def capture_camera(self, camera_config):
         """Capture image from a single camera - single attempt only."""
@@ -167,8 +575,10 @@ class CameraCapture:
         
         # Check similarity with last image
         last_pixels = self.last_image_hashes.get(camera_name)
-        if last_pixels and self.images_similar(current_pixels, last_pixels):
-            logger.info(f"Image from {camera_name} is too similar to previous (99.99% threshold), skipping save")
+        threshold = self.similarity_threshold()
+        if last_pixels and self.images_similar(current_pixels, last_pixels, threshold=threshold):
+            logger.info(f"Image from {camera_name} is too similar to previous ({threshold:.2%} threshold), skipping save")
+            self.metrics['frames_skipped_similar'] += 1
             return False
         elif last_pixels:
             logger.info(f"Image from {camera_name} is different enough from previous, will save")
@@ -177,8 +587,11 @@ class CameraCapture:
         
         # Save new image
         timestamp = datetime.now()
-        if self.save_image(camera_name, image_data, timestamp):
+        filepath = self.save_image(camera_name, image_data, timestamp)
+        if filepath:
             self.last_image_hashes[camera_name] = current_pixels
+            self.update_latest_index(camera_name, filepath, timestamp, image_data)
+            self.queue_transcode(camera_name, filepath)
             logger.info(f"Successfully captured and saved new image from {camera_name}")
             return True
         else:
@@ -186,7 +599,10 @@ class CameraCapture:
             return False
 
     def log_disk_space(self):
-        """Gets and logs the current free disk space to console and a CSV file."""
+        """Gets and logs the current free disk space to console and a CSV file.
+
+        Returns the free space in bytes, or None if it could not be measured.
+        """
         try:
             # Determine the drive from the output directory's absolute path.
             # This is more robust than hardcoding 'C:'.
@@ -210,15 +626,160 @@ class CameraCapture:
                     writer.writerow(['timestamp', 'free_space_gb'])  # Write header
                 timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 writer.writerow([timestamp, f"{free_gb:.4f}"])
+            return usage.free
         except Exception as e:
             logger.error(f"Failed to get or log disk space: {e}")
+            return None
+
+    def estimate_fill_rate(self):
+        """Fit a line through recent free-space samples.
+
+        Returns the fill rate in bytes per hour (positive while the disk is
+        filling), or None if there isn't enough history yet.
+        """
+        if len(self.disk_samples) < self.pressure_settings['min_samples']:
+            return None
+
+        t0 = self.disk_samples[0][0]
+        xs = [t - t0 for t, _ in self.disk_samples]
+        ys = [free for _, free in self.disk_samples]
+        mean_x = sum(xs) / len(xs)
+        mean_y = sum(ys) / len(ys)
+        var_x = sum((x - mean_x) ** 2 for x in xs)
+        if var_x == 0:
+            return None
+
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+        return -slope * 3600
+
+    def classify_pressure(self, free_bytes, hours_to_full):
+        """Work out the pressure stage, stepping down only once we're clear of the threshold by a margin."""
+        free_gb = free_bytes / (1024**3)
+        current_index = PRESSURE_STAGES.index(self.pressure_stage)
+        margin = self.pressure_settings['recovery_margin']
+
+        for index in range(len(PRESSURE_STAGES) - 1, 0, -1):
+            limits = self.pressure_settings[PRESSURE_STAGES[index]]
+            # Stages we're already in need some headroom before we leave them
+            factor = margin if index <= current_index else 1.0
+            if free_gb < limits['free_gb'] * factor:
+                return PRESSURE_STAGES[index]
+            if hours_to_full is not None and hours_to_full < limits['hours_to_full'] * factor:
+                return PRESSURE_STAGES[index]
+        return 'normal'
+
+    def update_disk_pressure(self, free_bytes):
+        """Record a free-space sample, project time-to-full and move between pressure stages."""
+        if free_bytes is None or not self.pressure_settings['enabled']:
+            return
+
+        now = time.time()
+        self.disk_samples.append((now, free_bytes))
+        window = self.pressure_settings['window_minutes'] * 60
+        while self.disk_samples and now - self.disk_samples[0][0] > window:
+            self.disk_samples.popleft()
+
+        fill_rate = self.estimate_fill_rate()
+        hours_to_full = free_bytes / fill_rate if fill_rate and fill_rate > 0 else None
+        if hours_to_full is not None:
+            logger.info(f"Disk filling at {fill_rate / (1024**3):.3f} GB/hour, projected full in {hours_to_full:.1f} hours")
+
+        new_stage = self.classify_pressure(free_bytes, hours_to_full)
+        if new_stage != self.pressure_stage:
+            self.record_pressure_transition(self.pressure_stage, new_stage, free_bytes, fill_rate, hours_to_full)
+            self.pressure_stage = new_stage
+
+        if self.pressure_stage == 'critical':
+            self.trigger_cleanup()
+
+        self.metrics.update({
+            'disk_pressure_stage': self.pressure_stage,
+            'disk_free_bytes': free_bytes,
+            'disk_fill_rate_bytes_per_hour': fill_rate,
+            'disk_hours_to_full': hours_to_full
+        })
+        self.write_metrics()
+
+    def record_pressure_transition(self, old_stage, new_stage, free_bytes, fill_rate, hours_to_full):
+        """Log a stage change, count it in the metrics and append it to the transition log."""
+        escalating = PRESSURE_STAGES.index(new_stage) > PRESSURE_STAGES.index(old_stage)
+        log = logger.warning if escalating else logger.info
+        log(f"Disk pressure changed from {old_stage} to {new_stage} ({free_bytes / (1024**3):.2f} GB free)")
+
+        key = f"{old_stage}->{new_stage}"
+        transitions = self.metrics['disk_pressure_transitions']
+        transitions[key] = transitions.get(key, 0) + 1
+
+        try:
+            log_file = Path(self.pressure_settings['transition_log'])
+            file_exists = log_file.is_file()
+
+            with open(log_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if not file_exists:
+                    writer.writerow(['timestamp', 'from_stage', 'to_stage', 'free_space_gb', 'fill_rate_gb_per_hour', 'hours_to_full'])
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                writer.writerow([
+                    timestamp, old_stage, new_stage, f"{free_bytes / (1024**3):.4f}",
+                    f"{fill_rate / (1024**3):.4f}" if fill_rate is not None else '',
+                    f"{hours_to_full:.2f}" if hours_to_full is not None else ''
+                ])
+        except Exception as e:
+            logger.error(f"Failed to log disk pressure transition: {e}")
+
+    def similarity_threshold(self):
+        """Similarity needed to skip a frame; lowered under disk pressure so more near-duplicates are dropped."""
+        if self.pressure_stage == 'normal':
+            return 0.9999
+        return self.pressure_settings['elevated_similarity_threshold']
+
+    def should_skip_camera(self, camera_config):
+        """Under high pressure, only capture low-priority cameras every few cycles."""
+        if PRESSURE_STAGES.index(self.pressure_stage) < PRESSURE_STAGES.index('high'):
+            return False
+        if not isinstance(camera_config, dict) or camera_config.get('priority') != 'low':
+            return False
+        return self.cycle_count % self.pressure_settings['low_priority_interval_multiplier'] != 0
+
+    def trigger_cleanup(self):
+        """Start an on-demand file_cleanup run, unless one is running or ran recently."""
+        if self.cleanup_process is not None and self.cleanup_process.poll() is None:
+            return
+
+        cooldown = self.pressure_settings['cleanup_cooldown_minutes'] * 60
+        if time.time() - self.last_cleanup_started < cooldown:
+            return
+
+        command = list(self.pressure_settings['cleanup_command'])
+        if command and command[0].endswith('.py'):
+            command = [sys.executable, str(Path(__file__).resolve().parent / command[0])] + command[1:]
+
+        try:
+            logger.warning(f"Disk pressure is critical, starting on-demand cleanup: {' '.join(command)}")
+            self.cleanup_process = subprocess.Popen(command, cwd=Path(__file__).resolve().parent)
+            self.last_cleanup_started = time.time()
+            self.metrics['cleanup_runs_triggered'] += 1
+        except Exception as e:
+            logger.error(f"Failed to start on-demand cleanup: {e}")
+
+    def write_metrics(self):
+        """Publish the current capture metrics as a JSON snapshot."""
+        try:
+            snapshot = {**self.metrics, 'updated_at': datetime.now().isoformat(timespec='seconds')}
+            write_json_atomic(self.pressure_settings['metrics_file'], snapshot)
+        except Exception as e:
+            logger.error(f"Failed to write capture metrics: {e}")
     
     def capture_all_cameras(self):
         """Capture images from all cameras."""
         logger.info(f"Starting capture cycle for {len(self.cameras)} cameras")
         successful = 0
+        self.cycle_count += 1
         
         for camera_config in self.cameras:
+            if self.should_skip_camera(camera_config):
+                self.metrics['captures_skipped_low_priority'] += 1
+                continue
             try:
                 if self.capture_camera(camera_config):
                     successful += 1
@@ -238,8 +799,12 @@ class CameraCapture:
                 start_time = time.time()
                 self.capture_all_cameras()
 
-                # Log disk space after each capture cycle
-                self.log_disk_space()
+                # Log disk space after each capture cycle and react to disk pressure
+                free_bytes = self.log_disk_space()
+                self.update_disk_pressure(free_bytes)
+
+                # Report on any background transcoding that finished
+                self.collect_transcode_results()
                 
                 # Calculate sleep time to maintain interval
                 elapsed = time.time() - start_time
@@ -253,6 +818,7 @@ class CameraCapture:
                     
             except KeyboardInterrupt:
                 logger.info("Stopping capture (Ctrl+C pressed)")
+                self.shutdown_transcoding()
                 break
             except Exception as e:
                 logger.error(f"Unexpected error in main loop: {e}")
@@ -11,6 +11,11 @@ const ACTIVITY_OPTIONS = [
 ];
 const CLOTHING_OPTIONS = ['long sleeves', 'short sleeves', 'can\'t tell'];
 
+// Extensions a frame can have once camera_capture.py transcodes it.
+// Keep in step with IMAGE_EXTENSIONS in image_formats.py.
+const IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif'];
+const IMAGE_FILE_PATTERN = new RegExp(`(${IMAGE_EXTENSIONS.map(ext => ext.replace('.', '\\.')).join('|')})$`, 'i');
+
 // Database constraint strings (properly escaped for SQL)
 const DB_CONSTRAINTS = {
     JONATHAN: JONATHAN_OPTIONS.map(opt => `'${opt.replace(/'/g, "''")}'`).join(', '),
@@ -21,5 +26,7 @@ module.exports = {
     JONATHAN_OPTIONS,
     ACTIVITY_OPTIONS,
     CLOTHING_OPTIONS,
+    IMAGE_EXTENSIONS,
+    IMAGE_FILE_PATTERN,
     DB_CONSTRAINTS
 };
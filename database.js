@@ -158,6 +158,15 @@ class TrafficCameraDB {
                 ORDER BY total_views ASC, last_viewed_at DESC
             `),
 
+            // Frame names sort by capture time, so filename >= oldest covers the frames still on disk
+            getCameraViewTotals: this.db.prepare(`
+                SELECT COUNT(*) as viewed_images,
+                       COALESCE(SUM(total_views), 0) as total_views,
+                       COALESCE(MAX(unique_viewers), 0) as unique_viewers
+                FROM image_stats
+                WHERE camera_name = ? AND filename >= ? AND total_views > 0
+            `),
+
             // Saved crops
             insertSavedCrop: this.db.prepare(`
                 INSERT INTO saved_crops (
@@ -410,6 +419,10 @@ class TrafficCameraDB {
         return this.statements.getAllImageStats.all();
     }
 
+    getCameraViewTotals(cameraName, oldestFilename) {
+        return this.statements.getCameraViewTotals.get(cameraName, oldestFilename);
+    }
+
     saveCropRecord(cropData) {
         const {
             originalCamera, originalFilename, originalPath, cropFilename, cropFolder,
@@ -607,7 +620,8 @@ class TrafficCameraDB {
     getStats() {
         const totalViews = this.db.prepare('SELECT COUNT(*) as count FROM image_views').get().count;
         const uniqueViewers = this.db.prepare('SELECT COUNT(DISTINCT viewer_ip) as count FROM image_views').get().count;
-        const totalImages = this.db.prepare('SELECT COUNT(*) as count FROM image_stats').get().count;
+        // file_cleanup.py adds a row for every archived frame, viewed or not; only count viewed images
+        const totalImages = this.db.prepare('SELECT COUNT(*) as count FROM image_stats WHERE total_views > 0').get().count;
         const totalCrops = this.db.prepare('SELECT COUNT(*) as count FROM saved_crops').get().count;
         
         return {
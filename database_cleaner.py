@@ -10,7 +10,10 @@ This tool checks for:
 
 Usage:
     python database_cleaner.py --scan                    # Scan only (no changes)
+    python database_cleaner.py --scan --report r.jsonl.gz   # Stream issues to a report
     python database_cleaner.py --clean --confirm         # Clean orphaned records
+    python database_cleaner.py --clean --confirm --from-report r.jsonl.gz  # Clean without rescanning
+    python database_cleaner.py --scan --incremental       # Only check what changed since the last run
     python database_cleaner.py --help                    # Show help
 """
 
@@ -19,10 +22,208 @@ import os
 import sys
 import argparse
 import json
+import gzip
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import List, Dict, Set, Tuple
+from typing import Callable, List, Dict, Set, Tuple, Iterator, NamedTuple, TextIO
 from collections import defaultdict
 
+import db_access
+from image_formats import is_image_file
+
+# Raw image_views rows older than this many days are rolled up by --compact-views
+DEFAULT_VIEW_RETENTION_DAYS = 30
+INCREMENTAL_VACUUM_PAGES = 2000  # Pages returned to the filesystem per transaction
+
+# Characters str.strip() removes, so TRIM() in SQL agrees with the Python checks
+WHITESPACE = ''.join(ch for ch in map(chr, range(0x3001)) if ch.isspace())
+
+SCAN_BATCH_SIZE = 1000      # Rows fetched per cursor batch during scans
+CLEAN_CHUNK_SIZE = 5000     # Issue keys loaded into the cleanup temp tables per executemany
+FILE_WORKERS = 8            # Threads removing/quarantining files during cleanup
+PROGRESS_EVERY = 5000       # Print cleanup progress every this many files
+REPORT_SAMPLE_SIZE = 5      # Example issues per type kept in memory for print_report
+REPORT_FORMAT_VERSION = 1
+CHECK_WORKERS = 6           # Integrity checks run at the same time, each on its own connection
+
+# Incremental scans (--incremental) remember what the last scan saw in a state file
+DEFAULT_SCAN_STATE = 'integrity_scan_state.json'
+DEFAULT_FULL_SCAN_DAYS = 7  # Fall back to a full scan once the last one is this old
+SCAN_STATE_VERSION = 2
+RACY_MTIME_SECONDS = 2      # Directories modified this recently are relisted next time (mtime granularity)
+# Tables whose rowid high-water mark and row count are recorded; a count that
+# doesn't add up means rows were deleted, and dependent checks run in full
+INCREMENTAL_TABLES = ('saved_crops', 'crop_reviews', 'factors', 'crop_review_positive_factors',
+                      'crop_review_negative_factors', 'image_views')
+# The link tables have no AUTOINCREMENT, so deleting the last row and inserting
+# another reuses its rowid and the count still adds up. Their marks also carry
+# a sum of this per-row hash of the rowid and contents, to catch that.
+LINK_ROW_HASH = "(((rowid % 2147483647) * 40503 + crop_review_id) % 2147483647 * 40503 + factor_id) % 2147483647"
+ROW_CHECKSUMS = {
+    'crop_review_positive_factors': LINK_ROW_HASH,
+    'crop_review_negative_factors': LINK_ROW_HASH,
+}
+
+# Summary line printed by clean_database for each issue type it handled
+CLEAN_MESSAGES = {
+    'orphaned_crop_reviews': "🗑️ Removed {} orphaned crop reviews",
+    'incomplete_reviews': "🗑️ Removed {} incomplete/empty review records",
+    'orphaned_positive_factors': "🗑️ Removed {} orphaned positive factors",
+    'orphaned_negative_factors': "🗑️ Removed {} orphaned negative factors",
+    'orphaned_image_views': "🗑️ Removed views of {} missing images",
+    'incomplete_crop_records': "🗑️ Removed {} incomplete crop records",
+    'missing_crop_files': "🗑️ Removed {} database records for missing crop files",
+    'orphaned_crop_files': "🗑️ Removed {} orphaned crop files",
+    'orphaned_captured_images': "📦 Quarantined {} orphaned captured images",
+}
+
+# Keys of the rows to delete, loaded from the report before one set-based delete transaction
+CLEAN_TEMP_SCHEMA = """
+    CREATE TEMP TABLE IF NOT EXISTS clean_reviews (id INTEGER PRIMARY KEY);
+    CREATE TEMP TABLE IF NOT EXISTS clean_crops (id INTEGER PRIMARY KEY);
+    CREATE TEMP TABLE IF NOT EXISTS clean_positive_links (
+        crop_review_id INTEGER NOT NULL, factor_id INTEGER NOT NULL, PRIMARY KEY (crop_review_id, factor_id)
+    );
+    CREATE TEMP TABLE IF NOT EXISTS clean_negative_links (
+        crop_review_id INTEGER NOT NULL, factor_id INTEGER NOT NULL, PRIMARY KEY (crop_review_id, factor_id)
+    );
+    CREATE TEMP TABLE IF NOT EXISTS clean_images (
+        camera_name TEXT NOT NULL, filename TEXT NOT NULL, PRIMARY KEY (camera_name, filename)
+    );
+"""
+
+# Which temp table each database issue type feeds, and the key it contributes
+CLEAN_TARGETS = {
+    'orphaned_crop_reviews': ('clean_reviews', lambda issue: (issue['review_id'],)),
+    'incomplete_reviews': ('clean_reviews', lambda issue: (issue['review_id'],)),
+    'orphaned_positive_factors': ('clean_positive_links', lambda issue: (issue['crop_review_id'], issue['factor_id'])),
+    'orphaned_negative_factors': ('clean_negative_links', lambda issue: (issue['crop_review_id'], issue['factor_id'])),
+    'orphaned_image_views': ('clean_images', lambda issue: (issue['camera_name'], issue['filename'])),
+    'incomplete_crop_records': ('clean_crops', lambda issue: (issue['crop_id'],)),
+    'missing_crop_files': ('clean_crops', lambda issue: (issue['crop_id'],)),
+}
+
+VIEW_ROLLUP_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS image_view_daily (
+        camera_name TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        day TEXT NOT NULL,
+        views INTEGER NOT NULL,
+        unique_viewers INTEGER NOT NULL,
+        first_viewed_at DATETIME,
+        last_viewed_at DATETIME,
+        PRIMARY KEY (camera_name, filename, day)
+    );
+    CREATE TABLE IF NOT EXISTS image_view_rollup_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        rolled_before TEXT NOT NULL,
+        compacted_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+class IntegrityCheck(NamedTuple):
+    """A registered integrity check: a function taking (cleaner, cursor), and the checks it waits for."""
+    name: str
+    run: Callable[['DatabaseCleaner', sqlite3.Cursor], None]
+    depends_on: Tuple[str, ...]
+
+# Checks scan_database_integrity runs, in registration order (see integrity_check)
+INTEGRITY_CHECKS: Dict[str, IntegrityCheck] = {}
+
+def integrity_check(name: str, depends_on: Tuple[str, ...] = ()):
+    """
+    Registers a function (or DatabaseCleaner method) taking (cleaner, cursor)
+    as an integrity check. Each check gets its own read-only snapshot and
+    runs alongside the others once every check in depends_on has finished;
+    dependencies must be registered first, so there can be no cycles.
+    """
+    def register(function: Callable[['DatabaseCleaner', sqlite3.Cursor], None]):
+        unknown = [dependency for dependency in depends_on if dependency not in INTEGRITY_CHECKS]
+        if unknown:
+            raise ValueError(f"Integrity check {name} depends on unregistered checks: {', '.join(unknown)}")
+        INTEGRITY_CHECKS[name] = IntegrityCheck(name, function, tuple(depends_on))
+        return function
+    return register
+
+def open_report(path: str | Path, mode: str = 'rt', compressed: bool | None = None) -> TextIO:
+    """Opens a JSONL report, gzip-compressed when the name ends in .gz (unless compressed says otherwise)"""
+    if compressed is None:
+        compressed = str(path).endswith('.gz')
+    if compressed:
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def read_report_header(path: str | Path) -> Dict:
+    """
+    Returns the header of a JSONL integrity report.
+
+    Raises:
+        ValueError: If the file isn't a report written by this tool.
+    """
+    with open_report(path) as f:
+        first_line = f.readline()
+    try:
+        header = json.loads(first_line) if first_line else {}
+    except json.JSONDecodeError:
+        header = {}
+    if 'report' not in header:
+        raise ValueError(f"{path} is not a database integrity report (JSONL)")
+    return header['report']
+
+def iter_report_issues(path: str | Path) -> Iterator[Tuple[str, Dict]]:
+    """Yields (issue_type, issue) pairs from a JSONL integrity report, one line at a time"""
+    with open_report(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if 'type' in record:
+                yield record['type'], record['issue']
+
+def path_key(path: str | Path) -> str:
+    """Key for a directory in the listing snapshot and scan state (case-folded on Windows, like the filesystem)"""
+    return os.path.normcase(os.path.normpath(path))
+
+def load_scan_state(path: str | Path) -> Dict | None:
+    """Reads the state an incremental scan left behind, or None if there is none usable"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Ignoring unreadable scan state {path}: {e}")
+        return None
+    if not isinstance(state, dict) or state.get('version') != SCAN_STATE_VERSION:
+        return None
+    return state
+
+def save_scan_state(path: str | Path, state: Dict):
+    """Writes the scan state atomically, so an interrupted write keeps the previous one"""
+    part_path = f"{path}.part"
+    with open(part_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(part_path, path)
+
+def remove_orphan_file(path: str) -> str | None:
+    """Deletes an orphaned crop file; returns an error message on failure"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass  # File already gone
+    except Exception as e:
+        return f"Could not delete {path}: {e}"
+    return None
+
+def quarantine_file(src_path: Path, dst_path: Path) -> str | None:
+    """Moves an orphaned captured image into quarantine; returns an error message on failure"""
+    try:
+        src_path.rename(dst_path)
+    except Exception as e:
+        return f"Could not quarantine {src_path}: {e}"
+    return None
+
 class DatabaseCleaner:
     def __init__(self, db_path: str = "traffic_cameras.db", 
                  captured_images_dir: str = "captured_images",
@@ -30,72 +231,405 @@ class DatabaseCleaner:
         self.db_path = db_path
         self.captured_images_dir = Path(captured_images_dir)
         self.saved_images_dir = Path(saved_images_dir)
-        self.issues = defaultdict(list)
+        # Only counts and a few examples per issue type are kept in memory;
+        # the issues themselves are streamed to the report file
+        self.issue_counts = defaultdict(int)
+        self.issue_samples = defaultdict(list)
+        self.report_file = None
+        self.report_path = None
+        # Checks run in parallel threads; this guards the counters, samples, report and listings
+        self.lock = threading.Lock()
+        self.check_timings = {}
+        self.scan_seconds = 0.0
         self.stats = {
             'orphaned_records': 0,
             'missing_files': 0,
             'orphaned_files': 0,
             'broken_foreign_keys': 0,
             'total_files_checked': 0,
-            'total_records_checked': 0
+            'total_records_checked': 0,
+            'directories_listed': 0
         }
-    
+        # Directory listings shared by all checks in a scan: path_key(dir) -> {name: is_dir},
+        # plus each listing's names through os.path.normcase for existence checks
+        self.dir_snapshots = {}
+        self.dir_names = {}
+        # Incremental scan bookkeeping: the previous run's state (None for a full scan),
+        # this run's table marks and directory mtimes, and which tables lost rows since
+        self.previous_state = None
+        self.scan_mode = 'full'
+        self.table_marks = {}
+        self.dir_mtimes = {}
+        self.dir_changes = {}
+        self.rewritten_tables = set()
+        self.scan_started_at = None
+
     def connect_db(self) -> sqlite3.Connection:
-        """Connect to the SQLite database"""
+        """Connect to the SQLite database (WAL, busy timeout and tuned pragmas from db_access)"""
         if not os.path.exists(self.db_path):
             raise FileNotFoundError(f"Database file not found: {self.db_path}")
-        return sqlite3.connect(self.db_path)
+        return db_access.connect(self.db_path)
+
+    def snapshot_db(self):
+        """Read-only connection with one consistent snapshot of the database, for scans"""
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"Database file not found: {self.db_path}")
+        return db_access.snapshot(self.db_path)
+    
+    def reset(self):
+        """Clear counters and samples before a new scan"""
+        self.issue_counts.clear()
+        self.issue_samples.clear()
+        self.stats = {k: 0 for k in self.stats}
+        self.check_timings = {}
+        self.scan_seconds = 0.0
+        self.dir_snapshots = {}
+        self.dir_names = {}
+        self.previous_state = None
+        self.scan_mode = 'full'
+        self.table_marks = {}
+        self.dir_mtimes = {}
+        self.dir_changes = {}
+        self.rewritten_tables = set()
+        self.scan_started_at = None
+
+    def _report_issue(self, issue_type: str, issue: Dict):
+        """Count an issue, keep it if it's one of the first few of its type, and stream it to the report"""
+        line = json.dumps({'type': issue_type, 'issue': issue}, default=str) + '\n' if self.report_file else None
+        with self.lock:
+            self.issue_counts[issue_type] += 1
+            samples = self.issue_samples[issue_type]
+            if len(samples) < REPORT_SAMPLE_SIZE:
+                samples.append(issue)
+            if line:
+                self.report_file.write(line)
+    
+    def _log(self, message: str):
+        """Print a progress line in one piece (checks print from several threads)"""
+        with self.lock:
+            print(message)
+    
+    def _add_stat(self, stat: str, amount: int = 1):
+        """Add to one of the scan statistics (checks update them from several threads)"""
+        with self.lock:
+            self.stats[stat] += amount
+    
+    def _iter_rows(self, cursor: sqlite3.Cursor) -> Iterator[sqlite3.Row]:
+        """Iterate the current result set in batches instead of fetching it all at once"""
+        while True:
+            rows = cursor.fetchmany(SCAN_BATCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+    
+    def _open_report(self, report_path: str | Path):
+        """Start streaming issues to a JSONL report, written to a .part file until the scan completes"""
+        self.report_path = str(report_path)
+        self.report_file = open_report(f"{report_path}.part", 'wt', compressed=self.report_path.endswith('.gz'))
+        header = {
+            'version': REPORT_FORMAT_VERSION,
+            'timestamp': time.time(),
+            'database_path': os.path.abspath(self.db_path),
+            'captured_images_dir': str(self.captured_images_dir),
+            'saved_images_dir': str(self.saved_images_dir)
+        }
+        self.report_file.write(json.dumps({'report': header}) + '\n')
     
-    def scan_database_integrity(self) -> Dict:
-        """Scan the database for integrity issues"""
+    def _close_report(self, completed: bool):
+        """Finish the report with the scan statistics, or discard it if the scan failed"""
+        if not self.report_file:
+            return
+        part_path = f"{self.report_path}.part"
+        if completed:
+            self.report_file.write(json.dumps({'statistics': self.stats, 'issue_counts': dict(self.issue_counts)}) + '\n')
+        self.report_file.close()
+        self.report_file = None
+        if completed:
+            os.replace(part_path, self.report_path)
+            print(f"📄 Report saved to {self.report_path}")
+        else:
+            os.remove(part_path)
+    
+    def scan_database_integrity(self, report_path: str | Path | None = None,
+                                state_path: str | Path | None = None,
+                                full_scan_days: int = DEFAULT_FULL_SCAN_DAYS,
+                                force_full: bool = False) -> Dict:
+        """
+        Scan the database for integrity issues.
+
+        With a state file the scan is incremental: only rows added (or reviews
+        updated) since the previous scan, and files in directories whose mtime
+        changed, are checked, so issues already reported aren't reported again.
+        Checks whose inputs lost rows since then run in full, and the whole scan
+        is full when there is no usable state or the last full scan is too old.
+
+        Args:
+            report_path: Stream every issue found to this JSONL report (gzip if it ends in .gz).
+            state_path: Scan incrementally from, and record this scan in, this JSON state file.
+            full_scan_days: Run a full scan instead once the last one is this many days old.
+            force_full: Run a full scan (and record it) even if the state is usable.
+
+        Returns:
+            Issue counts by type.
+        """
         print("🔍 Scanning database integrity...")
+        self.reset()
+        if state_path:
+            self._load_previous_state(state_path, full_scan_days, force_full)
+        if report_path:
+            self._open_report(report_path)
+        completed = False
+        started = time.perf_counter()
         
-        with self.connect_db() as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Check saved_crops table
-            self._check_saved_crops(cursor)
-            
-            # Check crop_reviews table
-            self._check_crop_reviews(cursor)
-            
-            # Check factors relationships
-            self._check_factors_relationships(cursor)
-            
-            # Check image_views table
-            self._check_image_views(cursor)
-            
-            # Check for orphaned files
-            self._check_orphaned_files(cursor)
-            
-            # Check for incomplete/empty reviews
-            self._check_incomplete_reviews(cursor)
+        try:
+            self._run_checks()
+            completed = True
+        finally:
+            self.scan_seconds = time.perf_counter() - started
+            self._close_report(completed)
+        
+        if state_path:
+            save_scan_state(state_path, self._scan_state())
         
-        return self.issues
+        return self.issue_counts
+    
+    def _load_previous_state(self, state_path: str | Path, full_scan_days: int, force_full: bool):
+        """Scan incrementally from the previous state if it's for this database and recent enough"""
+        state = None if force_full else load_scan_state(state_path)
+        if force_full:
+            reason = "full scan requested"
+        elif state is None:
+            reason = "no previous scan state"
+        elif (state.get('database_path'), state.get('captured_images_dir'), state.get('saved_images_dir')) != \
+                (os.path.abspath(self.db_path), str(self.captured_images_dir), str(self.saved_images_dir)):
+            reason, state = "scan state is for a different database or image directories", None
+        elif time.time() - state.get('last_full_scan', 0) > full_scan_days * 86400:
+            reason, state = f"last full scan is over {full_scan_days} days old", None
+        
+        if state is None:
+            print(f"  ℹ️ Running a full scan ({reason})")
+            return
+        self.previous_state = state
+        self.scan_mode = 'incremental'
+        print(f"  ⚡ Incremental scan of changes since {state['scan_started_at']} UTC")
+    
+    def _scan_state(self) -> Dict:
+        """State for the next incremental scan: table marks and the mtime of every directory listed"""
+        directories = {}
+        if self.previous_state:
+            # Directories this scan didn't need to list are unchanged since the previous one
+            directories.update(self.previous_state['directories'])
+        directories.update(self.dir_mtimes)
+        return {
+            'version': SCAN_STATE_VERSION,
+            'database_path': os.path.abspath(self.db_path),
+            'captured_images_dir': str(self.captured_images_dir),
+            'saved_images_dir': str(self.saved_images_dir),
+            'last_full_scan': self.previous_state['last_full_scan'] if self.previous_state else time.time(),
+            'scan_started_at': self.scan_started_at,
+            'tables': self.table_marks,
+            'directories': directories
+        }
     
+    @integrity_check('table_marks')
+    def _record_table_marks(self, cursor: sqlite3.Cursor):
+        """
+        Record each table's rowid high-water mark and row count for the next
+        incremental scan, and note which tables lost rows since the previous one
+        (rows before the old mark plus rows after it no longer add up, or for
+        the link tables, the rows up to the old mark hash differently). The
+        other checks depend on this one, so rows added while they run are
+        always above the recorded marks.
+        """
+        cursor.execute("SELECT datetime('now')")
+        self.scan_started_at = cursor.fetchone()[0]
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        existing = {row[0] for row in cursor.fetchall()}
+        previous = self.previous_state['tables'] if self.previous_state else {}
+        
+        for table in INCREMENTAL_TABLES:
+            max_rowid, count, added = 0, 0, 0
+            checksum = checksum_below = None
+            before = previous.get(table)
+            if table in existing:
+                cursor.execute(f"SELECT COALESCE(MAX(rowid), 0), COUNT(*) FROM {table}")
+                max_rowid, count = cursor.fetchone()
+                if before:
+                    cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE rowid > ?", (before['max_rowid'],))
+                    added = cursor.fetchone()[0]
+                if table in ROW_CHECKSUMS:
+                    # One pass: the whole table for next time, and the rows the previous checksum covered
+                    row_hash = ROW_CHECKSUMS[table]
+                    cursor.execute(f"""
+                        SELECT COALESCE(SUM({row_hash}), 0),
+                               COALESCE(SUM(CASE WHEN rowid <= ? THEN {row_hash} END), 0)
+                        FROM {table}
+                    """, (before['max_rowid'] if before else 0,))
+                    checksum, checksum_below = cursor.fetchone()
+            self.table_marks[table] = {'max_rowid': max_rowid, 'count': count, 'checksum': checksum}
+            if self.previous_state and (not before or before['count'] + added != count
+                                        or before.get('checksum') != checksum_below):
+                self.rewritten_tables.add(table)
+    
+    def _incremental_floor(self, table: str, depends_on: Tuple[str, ...] = ()) -> int | None:
+        """
+        Rowid above which rows of a table are new since the previous scan, or
+        None if the check must cover every row: a full scan, or rows were
+        deleted from a table whose deletions can create new issues.
+        """
+        if not self.previous_state or self.rewritten_tables.intersection(depends_on):
+            return None
+        before = self.previous_state['tables'].get(table)
+        return before['max_rowid'] if before else None
+    
+    def _dir_changed(self, directory: str | Path) -> bool:
+        """Whether a directory may have gained or lost entries since the previous scan (always True in a full scan)"""
+        key = path_key(directory)
+        if key not in self.dir_changes:
+            before = self.previous_state['directories'].get(key) if self.previous_state else None
+            if before is None or before['mtime'] is None:
+                self.dir_changes[key] = True
+            else:
+                try:
+                    self.dir_changes[key] = os.stat(key).st_mtime_ns != before['mtime']
+                except OSError:
+                    self.dir_changes[key] = True
+        return self.dir_changes[key]
+    
+    def _run_checks(self):
+        """
+        Run the registered checks in a thread pool, each on its own read-only
+        snapshot, starting each as soon as the checks it depends on finish, so
+        filesystem-bound and SQL-bound checks overlap. Checks started at
+        different times can see slightly different states of the database.
+        """
+        pending = dict(INTEGRITY_CHECKS)
+        running = {}
+        finished = set()
+        with ThreadPoolExecutor(max_workers=CHECK_WORKERS, thread_name_prefix='integrity-check') as executor:
+            while pending or running:
+                for name, check in list(pending.items()):
+                    if finished.issuperset(check.depends_on):
+                        running[executor.submit(self._run_check, check)] = name
+                        del pending[name]
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    future.result()  # A failed check fails the scan
+                    finished.add(name)
+    
+    def _run_check(self, check: IntegrityCheck):
+        """Run one check on a fresh read-only snapshot and record how long it took"""
+        started = time.perf_counter()
+        with self.snapshot_db() as conn:
+            conn.row_factory = sqlite3.Row
+            check.run(self, conn.cursor())
+        self.check_timings[check.name] = time.perf_counter() - started
+    
+    def _list_directory(self, directory: str | Path) -> Dict[str, bool] | None:
+        """
+        Names in a directory (mapped to whether each is a subdirectory), listed
+        with one os.scandir pass the first time any check asks and shared by
+        the rest of the scan. Missing directories list as empty; None means
+        the directory couldn't be read and callers should stat instead.
+        """
+        key = path_key(directory)
+        if key in self.dir_snapshots:
+            return self.dir_snapshots[key]
+        mtime = None
+        try:
+            # Stat before listing, so a change made during the listing shows as a newer mtime next time
+            mtime = os.stat(key).st_mtime_ns
+            with os.scandir(key) as entries:
+                names = {entry.name: entry.is_dir() for entry in entries}
+        except (FileNotFoundError, NotADirectoryError):
+            names = {}
+        except OSError as e:
+            self._log(f"  ⚠️ Could not list {key}: {e}")
+            names = None
+        if mtime is not None and time.time_ns() - mtime < RACY_MTIME_SECONDS * 10**9:
+            mtime = None  # A later change could keep the same mtime; relist next time
+        with self.lock:
+            if key in self.dir_snapshots:
+                return self.dir_snapshots[key]  # Another check listed it meanwhile
+            self.dir_snapshots[key] = names
+            if names is not None:
+                self.dir_names[key] = frozenset(os.path.normcase(name) for name in names)
+            self.dir_mtimes[key] = {
+                'mtime': mtime if names is not None else None,
+                'subdirs': sorted(name for name, is_dir in (names or {}).items() if is_dir)
+            }
+            self.stats['directories_listed'] += 1
+        return names
+    
+    def _file_exists(self, path: str | Path) -> bool:
+        """
+        Existence check against the directory snapshot instead of a stat per
+        file. Names are compared through os.path.normcase, so on Windows a
+        path that differs only in case matches, as it would for a stat.
+        """
+        directory, name = os.path.split(os.path.normpath(path))
+        if self._list_directory(directory or '.') is None:
+            return os.path.exists(path)
+        return os.path.normcase(name) in self.dir_names[path_key(directory or '.')]
+    
+    def _walk_images(self, root: Path, changed_only: bool = False) -> Iterator[str]:
+        """
+        Paths of all image files under root (any of the formats frames may be
+        transcoded to), listing each directory through the
+        shared snapshot. With changed_only, directories unchanged since the
+        previous scan aren't listed; the walk descends into the subdirectories
+        recorded for them then.
+        """
+        pending = [str(root)]
+        while pending:
+            directory = pending.pop()
+            if changed_only and not self._dir_changed(directory):
+                subdirs = self.previous_state['directories'][path_key(directory)]['subdirs']
+                pending.extend(os.path.join(directory, name) for name in subdirs)
+                continue
+            names = self._list_directory(directory) or {}
+            for name, is_dir in sorted(names.items()):
+                path = os.path.join(directory, name)
+                if is_dir:
+                    pending.append(path)
+                elif is_image_file(name):
+                    yield path
+    
+    @integrity_check('saved_crops', depends_on=('table_marks',))
     def _check_saved_crops(self, cursor: sqlite3.Cursor):
         """Check saved_crops table for missing files and integrity"""
-        print("📁 Checking saved_crops table...")
+        self._log("📁 Checking saved_crops table...")
         
-        cursor.execute("SELECT * FROM saved_crops")
-        crops = cursor.fetchall()
+        floor = self._incremental_floor('saved_crops')
+        if floor is None:
+            cursor.execute("SELECT * FROM saved_crops")
+        else:
+            # New crops, plus crops whose crop or original directory changed since the last scan
+            folders, prefixes = self._changed_crop_directories(cursor)
+            cursor.execute("""
+                SELECT * FROM saved_crops
+                WHERE id > :floor
+                   OR crop_folder IN (SELECT value FROM json_each(:folders))
+                   OR rtrim(original_path, replace(original_path, '/', '')) IN (SELECT value FROM json_each(:prefixes))
+            """, {'floor': floor, 'folders': json.dumps(folders), 'prefixes': json.dumps(prefixes)})
         
-        for crop in crops:
-            self.stats['total_records_checked'] += 1
+        checked = 0
+        for crop in self._iter_rows(cursor):
+            checked += 1
             crop_id = crop['id']
             
             # Check if crop file exists
             if crop['crop_folder'] and crop['crop_filename']:
                 crop_path = Path(crop['crop_folder']) / crop['crop_filename']
-                if not crop_path.exists():
-                    self.issues['missing_crop_files'].append({
+                if not self._file_exists(crop_path):
+                    self._report_issue('missing_crop_files', {
                         'crop_id': crop_id,
                         'expected_path': str(crop_path),
                         'camera': crop['original_camera'],
                         'saved_at': crop['saved_at']
                     })
-                    self.stats['missing_files'] += 1
+                    self._add_stat('missing_files')
             
             # Check if original image exists (if path is specified)
             if crop['original_path']:
@@ -103,176 +637,177 @@ class DatabaseCleaner:
                 original_path = crop['original_path'].replace('/images/', 'captured_images/')
                 original_full_path = Path(original_path)
                 
-                if not original_full_path.exists():
-                    self.issues['missing_original_files'].append({
+                if not self._file_exists(original_full_path):
+                    self._report_issue('missing_original_files', {
                         'crop_id': crop_id,
                         'expected_path': str(original_full_path),
                         'camera': crop['original_camera'],
                         'original_filename': crop['original_filename']
                     })
-                    self.stats['missing_files'] += 1
+                    self._add_stat('missing_files')
             
             # Check for invalid/empty paths
             if not crop['crop_folder'] or not crop['crop_filename']:
-                self.issues['incomplete_crop_records'].append({
+                self._report_issue('incomplete_crop_records', {
                     'crop_id': crop_id,
                     'crop_folder': crop['crop_folder'],
                     'crop_filename': crop['crop_filename'],
                     'camera': crop['original_camera']
                 })
-                self.stats['orphaned_records'] += 1
+                self._add_stat('orphaned_records')
+        self._add_stat('total_records_checked', checked)
+    
+    def _changed_crop_directories(self, cursor: sqlite3.Cursor) -> Tuple[List[str], List[str]]:
+        """
+        crop_folder values, and original_path directory prefixes (as stored,
+        up to the last '/'), whose directories changed since the previous scan.
+        """
+        cursor.execute("SELECT DISTINCT crop_folder FROM saved_crops WHERE crop_folder IS NOT NULL AND crop_folder != ''")
+        folders = [row[0] for row in cursor.fetchall() if self._dir_changed(row[0])]
+        cursor.execute("""
+            SELECT DISTINCT rtrim(original_path, replace(original_path, '/', ''))
+            FROM saved_crops WHERE original_path IS NOT NULL AND original_path != ''
+        """)
+        prefixes = [row[0] for row in cursor.fetchall()
+                    if self._dir_changed(row[0].replace('/images/', 'captured_images/') or '.')]
+        return folders, prefixes
     
+    @integrity_check('crop_reviews', depends_on=('table_marks',))
     def _check_crop_reviews(self, cursor: sqlite3.Cursor):
         """Check crop_reviews table for orphaned records"""
-        print("📋 Checking crop_reviews table...")
+        self._log("📋 Checking crop_reviews table...")
         
-        cursor.execute("""
+        # Reviews only lose their crop when crops are deleted; otherwise check new reviews
+        floor = self._incremental_floor('crop_reviews', depends_on=('saved_crops',))
+        cursor.execute(f"""
             SELECT cr.*, sc.id as crop_exists 
             FROM crop_reviews cr
             LEFT JOIN saved_crops sc ON cr.crop_id = sc.id
-        """)
-        reviews = cursor.fetchall()
-        
-        for review in reviews:
-            self.stats['total_records_checked'] += 1
+            {'WHERE cr.id > ?' if floor is not None else ''}
+        """, (floor,) if floor is not None else ())
+        checked = 0
+        for review in self._iter_rows(cursor):
+            checked += 1
             
             if not review['crop_exists']:
-                self.issues['orphaned_crop_reviews'].append({
+                self._report_issue('orphaned_crop_reviews', {
                     'review_id': review['id'],
                     'crop_id': review['crop_id'],
                     'reviewed_at': review['reviewed_at'],
                     'notes': review['notes'][:100] if review['notes'] else None
                 })
-                self.stats['broken_foreign_keys'] += 1
+                self._add_stat('broken_foreign_keys')
+        self._add_stat('total_records_checked', checked)
     
+    @integrity_check('incomplete_reviews', depends_on=('table_marks',))
     def _check_incomplete_reviews(self, cursor: sqlite3.Cursor):
         """Check for crop_reviews records that are essentially empty/meaningless"""
-        print("📝 Checking for incomplete/empty review records...")
+        self._log("📝 Checking for incomplete/empty review records...")
         
-        cursor.execute("""
-            SELECT cr.id, cr.crop_id, cr.notes, cr.is_jonathan, cr.activities, cr.top_clothing,
-                   pf.factor_id as has_positive_factors,
-                   nf.factor_id as has_negative_factors
-            FROM crop_reviews cr
-            LEFT JOIN crop_review_positive_factors pf ON cr.id = pf.crop_review_id
-            LEFT JOIN crop_review_negative_factors nf ON cr.id = nf.crop_review_id
-        """)
+        # Reviews added or updated since the last scan (the server bumps updated_at when it
+        # saves a review and its factors), unless factor links were deleted some other way
+        floor = self._incremental_floor('crop_reviews', depends_on=('crop_review_positive_factors',
+                                                                    'crop_review_negative_factors'))
+        changed = "(cr.id > :floor OR cr.updated_at >= datetime(:since, '-1 minute'))" if floor is not None else "1"
+        params = {'whitespace': WHITESPACE, 'floor': floor,
+                  'since': self.previous_state and self.previous_state['scan_started_at']}
         
-        reviews = cursor.fetchall()
-        review_groups = {}
+        cursor.execute(f"SELECT COUNT(*) FROM crop_reviews cr WHERE {changed}", params)
+        self._add_stat('total_records_checked', cursor.fetchone()[0])
         
-        # Group by review ID to check if each review has any meaningful data
-        for review in reviews:
-            review_id = review['id']
-            if review_id not in review_groups:
-                review_groups[review_id] = {
-                    'crop_id': review['crop_id'],
-                    'notes': review['notes'],
-                    'is_jonathan': review['is_jonathan'],
-                    'activities': review['activities'],
-                    'top_clothing': review['top_clothing'],
-                    'has_positive_factors': False,
-                    'has_negative_factors': False
-                }
-            
-            # Check if this review has any factors
-            if review['has_positive_factors']:
-                review_groups[review_id]['has_positive_factors'] = True
-            if review['has_negative_factors']:
-                review_groups[review_id]['has_negative_factors'] = True
-        
-        # Find reviews that are essentially empty
-        for review_id, review_data in review_groups.items():
-            self.stats['total_records_checked'] += 1
-            
-            # Check if this review has any meaningful content
-            has_notes = review_data['notes'] and review_data['notes'].strip()
-            has_jonathan = review_data['is_jonathan'] is not None
-            has_activities = review_data['activities'] and review_data['activities'].strip()
-            has_clothing = review_data['top_clothing'] and review_data['top_clothing'].strip()
-            has_factors = review_data['has_positive_factors'] or review_data['has_negative_factors']
-            
-            # If ALL fields are empty/null, this is an incomplete review
-            if not (has_notes or has_jonathan or has_activities or has_clothing or has_factors):
-                self.issues['incomplete_reviews'].append({
-                    'review_id': review_id,
-                    'crop_id': review_data['crop_id'],
-                    'issue': 'all_fields_empty'
-                })
-                self.stats['orphaned_records'] += 1
+        # A review is empty when every text field is NULL or whitespace (as str.strip()
+        # sees it), is_jonathan is NULL, and it has no factors of either kind.
+        # NOT EXISTS probes the factor tables' primary keys once per review instead
+        # of joining both, which multiplied positive by negative factors per review.
+        blank = "({column} IS NULL OR TRIM({column}, :whitespace) = '')"
+        cursor.execute(f"""
+            SELECT cr.id, cr.crop_id
+            FROM crop_reviews cr
+            WHERE {changed}
+              AND {blank.format(column='cr.notes')}
+              AND cr.is_jonathan IS NULL
+              AND {blank.format(column='cr.activities')}
+              AND {blank.format(column='cr.top_clothing')}
+              AND NOT EXISTS (SELECT 1 FROM crop_review_positive_factors pf WHERE pf.crop_review_id = cr.id)
+              AND NOT EXISTS (SELECT 1 FROM crop_review_negative_factors nf WHERE nf.crop_review_id = cr.id)
+        """, params)
+        
+        for review in self._iter_rows(cursor):
+            self._report_issue('incomplete_reviews', {
+                'review_id': review['id'],
+                'crop_id': review['crop_id'],
+                'issue': 'all_fields_empty'
+            })
+            self._add_stat('orphaned_records')
 
+    @integrity_check('factors_relationships', depends_on=('table_marks',))
     def _check_factors_relationships(self, cursor: sqlite3.Cursor):
         """Check factors relationship tables for orphaned records"""
-        print("🏷️ Checking factors relationships...")
-        
-        # Check positive factors
-        cursor.execute("""
-            SELECT pf.*, cr.id as review_exists, f.id as factor_exists
-            FROM crop_review_positive_factors pf
-            LEFT JOIN crop_reviews cr ON pf.crop_review_id = cr.id
-            LEFT JOIN factors f ON pf.factor_id = f.id
-        """)
+        self._log("🏷️ Checking factors relationships...")
         
-        positive_factors = cursor.fetchall()
-        for pf in positive_factors:
-            self.stats['total_records_checked'] += 1
+        for table, issue_type in (('crop_review_positive_factors', 'orphaned_positive_factors'),
+                                  ('crop_review_negative_factors', 'orphaned_negative_factors')):
+            # Links only lose a parent when reviews or factors are deleted, and only land below
+            # the old mark when link rows were deleted or replaced (the rowid of a deleted last
+            # row is reused); otherwise check new links and the links of updated reviews
+            floor = self._incremental_floor(table, depends_on=(table, 'crop_reviews', 'factors'))
+            changed = "1"
+            params = {}
+            if floor is not None:
+                changed = """(link.rowid > :floor OR link.crop_review_id IN (
+                    SELECT id FROM crop_reviews WHERE updated_at >= datetime(:since, '-1 minute')))"""
+                params = {'floor': floor, 'since': self.previous_state['scan_started_at']}
             
-            if not pf['review_exists']:
-                self.issues['orphaned_positive_factors'].append({
-                    'factor_link_id': f"{pf['crop_review_id']}-{pf['factor_id']}",
-                    'crop_review_id': pf['crop_review_id'],
-                    'factor_id': pf['factor_id'],
-                    'issue': 'review_not_found'
-                })
-                self.stats['broken_foreign_keys'] += 1
-            
-            if not pf['factor_exists']:
-                self.issues['orphaned_positive_factors'].append({
-                    'factor_link_id': f"{pf['crop_review_id']}-{pf['factor_id']}",
-                    'crop_review_id': pf['crop_review_id'],
-                    'factor_id': pf['factor_id'],
-                    'issue': 'factor_not_found'
-                })
-                self.stats['broken_foreign_keys'] += 1
-        
-        # Check negative factors (similar logic)
-        cursor.execute("""
-            SELECT nf.*, cr.id as review_exists, f.id as factor_exists
-            FROM crop_review_negative_factors nf
-            LEFT JOIN crop_reviews cr ON nf.crop_review_id = cr.id
-            LEFT JOIN factors f ON nf.factor_id = f.id
-        """)
-        
-        negative_factors = cursor.fetchall()
-        for nf in negative_factors:
-            self.stats['total_records_checked'] += 1
+            cursor.execute(f"SELECT COUNT(*) FROM {table} link WHERE {changed}", params)
+            self._add_stat('total_records_checked', cursor.fetchone()[0])
             
-            if not nf['review_exists']:
-                self.issues['orphaned_negative_factors'].append({
-                    'factor_link_id': f"{nf['crop_review_id']}-{nf['factor_id']}",
-                    'crop_review_id': nf['crop_review_id'],
-                    'factor_id': nf['factor_id'],
-                    'issue': 'review_not_found'
-                })
-                self.stats['broken_foreign_keys'] += 1
+            # Anti-joins against both parents; only the broken links come back
+            cursor.execute(f"""
+                SELECT crop_review_id, factor_id, review_missing, factor_missing
+                FROM (
+                    SELECT link.crop_review_id, link.factor_id,
+                           NOT EXISTS (SELECT 1 FROM crop_reviews cr WHERE cr.id = link.crop_review_id) AS review_missing,
+                           NOT EXISTS (SELECT 1 FROM factors f WHERE f.id = link.factor_id) AS factor_missing
+                    FROM {table} link
+                    WHERE {changed}
+                )
+                WHERE review_missing OR factor_missing
+            """, params)
             
-            if not nf['factor_exists']:
-                self.issues['orphaned_negative_factors'].append({
-                    'factor_link_id': f"{nf['crop_review_id']}-{nf['factor_id']}",
-                    'crop_review_id': nf['crop_review_id'],
-                    'factor_id': nf['factor_id'],
-                    'issue': 'factor_not_found'
-                })
-                self.stats['broken_foreign_keys'] += 1
+            for link in self._iter_rows(cursor):
+                for missing, issue in ((link['review_missing'], 'review_not_found'),
+                                       (link['factor_missing'], 'factor_not_found')):
+                    if missing:
+                        self._report_issue(issue_type, {
+                            'factor_link_id': f"{link['crop_review_id']}-{link['factor_id']}",
+                            'crop_review_id': link['crop_review_id'],
+                            'factor_id': link['factor_id'],
+                            'issue': issue
+                        })
+                        self._add_stat('broken_foreign_keys')
     
+    def _view_rollup_boundary(self, cursor: sqlite3.Cursor):
+        """
+        Day (YYYY-MM-DD) before which image_views has been rolled up into
+        image_view_daily, or None if the views have never been compacted.
+        Raw rows older than this are only kept to preserve distinct viewers.
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='image_view_rollup_state'")
+        if not cursor.fetchone():
+            return None
+        cursor.execute("SELECT rolled_before FROM image_view_rollup_state WHERE id = 1")
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @integrity_check('image_views', depends_on=('table_marks',))
     def _check_image_views(self, cursor: sqlite3.Cursor):
         """Check image_views table for orphaned records"""
-        print("👁️ Checking image_views table...")
+        self._log("👁️ Checking image_views table...")
         
         # First check if image_views table exists
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='image_views'")
         if not cursor.fetchone():
-            print("  ℹ️ image_views table not found, skipping...")
+            self._log("  ℹ️ image_views table not found, skipping...")
             return
         
         try:
@@ -283,7 +818,6 @@ class DatabaseCleaner:
             # Determine correct column names
             camera_col = None
             filename_col = None
-            id_col = None
             
             # Check for various possible column names
             for col in ['camera_name', 'camera']:
@@ -296,53 +830,103 @@ class DatabaseCleaner:
                     filename_col = col
                     break
                     
-            for col in ['id', 'rowid']:
-                if col in columns:
-                    id_col = col
-                    break
-            
             if not camera_col or not filename_col:
-                print(f"  ⚠️ Could not identify camera/filename columns. Available: {columns}")
+                self._log(f"  ⚠️ Could not identify camera/filename columns. Available: {columns}")
                 return
-                
-            cursor.execute("SELECT * FROM image_views")
-            views = cursor.fetchall()
             
-            for view in views:
-                self.stats['total_records_checked'] += 1
-                
-                # Access by index position to avoid key issues
-                row_dict = dict(view)
-                camera_name = row_dict.get(camera_col, '')
-                filename = row_dict.get(filename_col, '')
-                view_id = row_dict.get(id_col, 'unknown') if id_col else 'unknown'
+            # Check each viewed image once, not each view: raw views not yet rolled
+            # up plus the compacted per-day aggregates (see compact_image_views)
+            last_viewed = 'viewed_at' if 'viewed_at' in columns else 'NULL'
+            boundary = self._view_rollup_boundary(cursor)
+            raw_filter = "WHERE viewed_at >= :boundary" if boundary and 'viewed_at' in columns else ""
+            sources = [f"""
+                SELECT {camera_col} AS camera_name, {filename_col} AS filename,
+                       COUNT(*) AS views, MAX({last_viewed}) AS last_viewed
+                FROM image_views {raw_filter}
+                GROUP BY {camera_col}, {filename_col}
+            """]
+            if boundary:
+                sources.append("""
+                    SELECT camera_name, filename, SUM(views), MAX(last_viewed_at)
+                    FROM image_view_daily GROUP BY camera_name, filename
+                """)
+            
+            # Incrementally, only images with new views or in camera directories that changed
+            floor = self._incremental_floor('image_views')
+            image_filter = ""
+            params = {'boundary': boundary}
+            if floor is not None:
+                cursor.execute(f"SELECT DISTINCT {camera_col} FROM image_views WHERE {camera_col} IS NOT NULL"
+                               + (" UNION SELECT camera_name FROM image_view_daily" if boundary else ""))
+                params['cameras'] = json.dumps([row[0] for row in cursor.fetchall()
+                                                if self._dir_changed(self.captured_images_dir / row[0])])
+                params['floor'] = floor
+                image_filter = f"""
+                    WHERE camera_name IN (SELECT value FROM json_each(:cameras))
+                       OR (camera_name, filename) IN (SELECT {camera_col}, {filename_col} FROM image_views WHERE rowid > :floor)
+                """
+            cursor.execute(f"""
+                SELECT camera_name, filename, SUM(views) AS views, MAX(last_viewed) AS last_viewed
+                FROM ({' UNION ALL '.join(sources)})
+                {image_filter}
+                GROUP BY camera_name, filename
+            """, params)
+            
+            checked = 0
+            for image in self._iter_rows(cursor):
+                checked += 1
+                camera_name = image['camera_name']
+                filename = image['filename']
                 
                 if camera_name and filename:
                     image_path = self.captured_images_dir / camera_name / filename
                     
-                    if not image_path.exists():
-                        self.issues['orphaned_image_views'].append({
-                            'view_id': view_id,
+                    if not self._file_exists(image_path):
+                        self._report_issue('orphaned_image_views', {
                             'camera_name': camera_name,
                             'filename': filename,
                             'expected_path': str(image_path),
-                            'view_count': row_dict.get('view_count', 0),
-                            'last_viewed': row_dict.get('last_viewed_at', 'unknown')
+                            'view_count': image['views'],
+                            'last_viewed': image['last_viewed'] or 'unknown'
                         })
-                        self.stats['orphaned_records'] += 1
+                        self._add_stat('orphaned_records')
+            self._add_stat('total_records_checked', checked)
                         
         except Exception as e:
-            print(f"  ❌ Error checking image_views table: {e}")
+            self._log(f"  ❌ Error checking image_views table: {e}")
             # Continue with other checks
     
+    @integrity_check('orphaned_files', depends_on=('table_marks',))
     def _check_orphaned_files(self, cursor: sqlite3.Cursor):
         """Check for files that exist but aren't referenced in the database"""
-        print("🗃️ Checking for orphaned files...")
+        self._log("🗃️ Checking for orphaned files...")
+        
+        # Incrementally, walk only the directories that changed and load only the references
+        # into them. Deleted rows can orphan files anywhere, so then that tree is walked in full.
+        crop_files = image_files = None
+        crop_filter = image_filter = daily_filter = ""
+        params = {}
+        if self._incremental_floor('saved_crops', depends_on=('saved_crops',)) is not None:
+            crop_files = list(self._walk_images(self.saved_images_dir, changed_only=True)) if self.saved_images_dir.exists() else []
+            walked = {os.path.dirname(path) for path in crop_files}
+            cursor.execute("SELECT DISTINCT crop_folder FROM saved_crops WHERE crop_folder IS NOT NULL")
+            params['folders'] = json.dumps([row[0] for row in cursor.fetchall() if str(Path(row[0])) in walked])
+            crop_filter = " AND crop_folder IN (SELECT value FROM json_each(:folders))"
+        if self._incremental_floor('image_views', depends_on=('image_views',)) is not None:
+            image_files = list(self._walk_images(self.captured_images_dir, changed_only=True)) if self.captured_images_dir.exists() else []
+            # Every directory prefix, since filenames may carry part of the path
+            cameras = set()
+            for path in image_files:
+                parts = Path(os.path.relpath(os.path.dirname(path), self.captured_images_dir)).parts
+                cameras.update('/'.join(parts[:i]) for i in range(1, len(parts) + 1))
+            params['cameras'] = json.dumps(sorted(cameras))
+            image_filter = " AND {} IN (SELECT value FROM json_each(:cameras))"
+            daily_filter = " WHERE camera_name IN (SELECT value FROM json_each(:cameras))"
         
         # Get all crop files referenced in database
-        cursor.execute("SELECT crop_folder, crop_filename FROM saved_crops WHERE crop_folder IS NOT NULL AND crop_filename IS NOT NULL")
+        cursor.execute(f"SELECT crop_folder, crop_filename FROM saved_crops WHERE crop_folder IS NOT NULL AND crop_filename IS NOT NULL{crop_filter}", params)
         referenced_crops = set()
-        for row in cursor.fetchall():
+        for row in self._iter_rows(cursor):
             crop_folder = row['crop_folder'] if 'crop_folder' in row.keys() else row[0]
             crop_filename = row['crop_filename'] if 'crop_filename' in row.keys() else row[1]
             if crop_folder and crop_filename:
@@ -360,9 +944,13 @@ class DatabaseCleaner:
                 camera_col = 'camera_name' if 'camera_name' in columns else 'camera'
                 filename_col = 'filename' if 'filename' in columns else 'file_name'
                 
-                cursor.execute(f"SELECT {camera_col}, {filename_col} FROM image_views WHERE {camera_col} IS NOT NULL AND {filename_col} IS NOT NULL")
+                query = f"SELECT DISTINCT {camera_col}, {filename_col} FROM image_views WHERE {camera_col} IS NOT NULL AND {filename_col} IS NOT NULL"
+                query += image_filter.format(camera_col)
+                if self._view_rollup_boundary(cursor):
+                    query += " UNION SELECT DISTINCT camera_name, filename FROM image_view_daily" + daily_filter
+                cursor.execute(query, params)
                 referenced_images = set()
-                for row in cursor.fetchall():
+                for row in self._iter_rows(cursor):
                     camera_name = row[0]
                     filename = row[1]
                     if camera_name and filename:
@@ -371,45 +959,56 @@ class DatabaseCleaner:
             else:
                 referenced_images = set()
         except Exception as e:
-            print(f"  ⚠️ Could not check image references: {e}")
+            self._log(f"  ⚠️ Could not check image references: {e}")
             referenced_images = set()
         
         # Scan saved_images directory
-        if self.saved_images_dir.exists():
-            for crop_file in self.saved_images_dir.rglob("*.jpg"):
-                self.stats['total_files_checked'] += 1
-                crop_path_str = str(crop_file)
+        if crop_files is None and self.saved_images_dir.exists():
+            crop_files = self._walk_images(self.saved_images_dir)
+        if crop_files:
+            checked = 0
+            for crop_path_str in crop_files:
+                checked += 1
                 
                 if crop_path_str not in referenced_crops:
                     # Skip test files
-                    if 'test_camera' not in str(crop_file) and 'test_image' not in str(crop_file):
-                        self.issues['orphaned_crop_files'].append({
+                    if 'test_camera' not in crop_path_str and 'test_image' not in crop_path_str:
+                        try:
+                            stat = os.stat(crop_path_str)
+                        except FileNotFoundError:
+                            continue  # Removed since the directory was listed
+                        self._report_issue('orphaned_crop_files', {
                             'file_path': crop_path_str,
-                            'size_bytes': crop_file.stat().st_size,
-                            'modified': crop_file.stat().st_mtime
+                            'size_bytes': stat.st_size,
+                            'modified': stat.st_mtime
                         })
-                        self.stats['orphaned_files'] += 1
+                        self._add_stat('orphaned_files')
+            self._add_stat('total_files_checked', checked)
         
         # Scan captured_images directory
-        if self.captured_images_dir.exists():
-            for img_file in self.captured_images_dir.rglob("*.jpg"):
-                self.stats['total_files_checked'] += 1
-                img_path_str = str(img_file)
+        if image_files is None and self.captured_images_dir.exists():
+            image_files = self._walk_images(self.captured_images_dir)
+        if image_files:
+            checked = 0
+            for img_path_str in image_files:
+                checked += 1
                 
                 if img_path_str not in referenced_images:
                     # Only flag as orphaned if it's been there a while (not recently captured)
                     try:
-                        file_age_hours = (os.path.getctime(str(img_file)) - os.path.getmtime(str(img_file))) / 3600
+                        stat = os.stat(img_path_str)
+                        file_age_hours = (stat.st_ctime - stat.st_mtime) / 3600
                         if file_age_hours > 24:  # Older than 24 hours
-                            self.issues['orphaned_captured_images'].append({
+                            self._report_issue('orphaned_captured_images', {
                                 'file_path': img_path_str,
-                                'size_bytes': img_file.stat().st_size,
-                                'modified': img_file.stat().st_mtime
+                                'size_bytes': stat.st_size,
+                                'modified': stat.st_mtime
                             })
-                            self.stats['orphaned_files'] += 1
+                            self._add_stat('orphaned_files')
                     except Exception:
                         # If we can't check file age, skip it to be safe
                         pass
+            self._add_stat('total_files_checked', checked)
     
     def print_report(self):
         """Print a detailed report of found issues"""
@@ -418,14 +1017,24 @@ class DatabaseCleaner:
         print("="*60)
         
         print(f"\n📈 Summary Statistics:")
+        if self.scan_mode == 'incremental':
+            print(f"  • Scan mode: incremental (changes since {self.previous_state['scan_started_at']} UTC)")
+        else:
+            print(f"  • Scan mode: full")
         print(f"  • Total records checked: {self.stats['total_records_checked']}")
         print(f"  • Total files checked: {self.stats['total_files_checked']}")
+        print(f"  • Directories listed: {self.stats['directories_listed']}")
         print(f"  • Orphaned records: {self.stats['orphaned_records']}")
         print(f"  • Missing files: {self.stats['missing_files']}")
         print(f"  • Orphaned files: {self.stats['orphaned_files']}")
         print(f"  • Broken foreign keys: {self.stats['broken_foreign_keys']}")
         
-        total_issues = sum(len(issues) for issues in self.issues.values())
+        if self.check_timings:
+            print(f"\n⏱️ Check Timings ({self.scan_seconds:.2f}s total, checks run concurrently):")
+            for name, seconds in sorted(self.check_timings.items(), key=lambda item: -item[1]):
+                print(f"  • {name.replace('_', ' ').title()}: {seconds:.2f}s")
+        
+        total_issues = sum(self.issue_counts.values())
         print(f"\n🚨 Total Issues Found: {total_issues}")
         
         if total_issues == 0:
@@ -434,137 +1043,314 @@ class DatabaseCleaner:
         
         print(f"\n🔍 Detailed Issues:")
         
-        for issue_type, issue_list in self.issues.items():
-            if issue_list:
-                print(f"\n  📋 {issue_type.replace('_', ' ').title()} ({len(issue_list)} issues):")
-                for i, issue in enumerate(issue_list[:5]):  # Show first 5 examples
+        for issue_type, count in self.issue_counts.items():
+            if count:
+                print(f"\n  📋 {issue_type.replace('_', ' ').title()} ({count} issues):")
+                for i, issue in enumerate(self.issue_samples[issue_type]):  # Show first 5 examples
                     print(f"    {i+1}. {issue}")
                 
-                if len(issue_list) > 5:
-                    print(f"    ... and {len(issue_list) - 5} more")
+                if count > len(self.issue_samples[issue_type]):
+                    print(f"    ... and {count - len(self.issue_samples[issue_type])} more")
     
-    def clean_database(self, confirm: bool = False) -> bool:
-        """Clean orphaned records from the database"""
+    def clean_database(self, confirm: bool = False, report_path: str | Path | None = None) -> bool:
+        """
+        Clean orphaned records from the database, streaming the issues from a
+        JSONL report so the issue list never has to fit in memory.
+
+        Record keys are loaded into temp tables in chunks and removed with
+        set-based deletes in one transaction, cascading to the reviews of
+        deleted crops and the factor links of deleted reviews. Orphaned files
+        are removed or quarantined in a bounded thread pool while the report
+        is read.
+
+        Args:
+            confirm: Required for any changes to be made.
+            report_path: Report to clean from; defaults to the one the last scan wrote.
+
+        Returns:
+            True if the cleanup ran.
+        """
         if not confirm:
             print("❌ Cleanup requires --confirm flag for safety")
             return False
         
-        total_issues = sum(len(issues) for issues in self.issues.values())
-        if total_issues == 0:
-            print("✅ No issues to clean!")
-            return True
+        report_path = report_path or self.report_path
+        if not report_path:
+            print("❌ No report to clean from; scan with a report first")
+            return False
         
-        print(f"\n🧹 Cleaning {total_issues} database issues...")
+        header = read_report_header(report_path)
+        if header.get('database_path') != os.path.abspath(self.db_path):
+            print(f"⚠️ Report was written for {header.get('database_path')}, cleaning {os.path.abspath(self.db_path)}")
         
-        with self.connect_db() as conn:
-            cursor = conn.cursor()
-            cleaned = 0
+        print(f"\n🧹 Cleaning database issues from {report_path}...")
+        started = time.time()
+        handled = defaultdict(int)
+        
+        conn = self.connect_db()
+        try:
+            conn.executescript(CLEAN_TEMP_SCHEMA)
+            pending = defaultdict(list)
+            file_results = self._clean_files_in_pool()
+            next(file_results)  # Start the pool
             
-            # Clean orphaned crop reviews
-            if 'orphaned_crop_reviews' in self.issues:
-                for review in self.issues['orphaned_crop_reviews']:
-                    cursor.execute("DELETE FROM crop_reviews WHERE id = ?", (review['review_id'],))
-                    cleaned += 1
-                print(f"  🗑️ Removed {len(self.issues['orphaned_crop_reviews'])} orphaned crop reviews")
+            def flush(table: str):
+                rows = pending.pop(table, [])
+                if rows:
+                    placeholders = ', '.join('?' * len(rows[0]))
+                    conn.executemany(f"INSERT OR IGNORE INTO temp.{table} VALUES ({placeholders})", rows)
             
-            # Clean incomplete/empty reviews (reviews with no meaningful data)
-            if 'incomplete_reviews' in self.issues:
-                for review in self.issues['incomplete_reviews']:
-                    cursor.execute("DELETE FROM crop_reviews WHERE id = ?", (review['review_id'],))
-                    cleaned += 1
-                print(f"  🗑️ Removed {len(self.issues['incomplete_reviews'])} incomplete/empty review records")
+            # One pass over the report: record keys go to the temp tables, files to the pool
+            for issue_type, issue in iter_report_issues(report_path):
+                if issue_type in CLEAN_TARGETS:
+                    table, key = CLEAN_TARGETS[issue_type]
+                    pending[table].append(key(issue))
+                    if len(pending[table]) >= CLEAN_CHUNK_SIZE:
+                        flush(table)
+                elif issue_type in ('orphaned_crop_files', 'orphaned_captured_images'):
+                    file_results.send((issue_type, issue['file_path']))
+                else:
+                    continue  # Reported only, e.g. missing original files
+                handled[issue_type] += 1
+            for table in list(pending):
+                flush(table)
+            conn.commit()
+            files_cleaned = file_results.send(None)
             
-            # Clean orphaned factor relationships
-            if 'orphaned_positive_factors' in self.issues:
-                for factor in self.issues['orphaned_positive_factors']:
-                    cursor.execute("DELETE FROM crop_review_positive_factors WHERE crop_review_id = ? AND factor_id = ?", 
-                                 (factor['crop_review_id'], factor['factor_id']))
-                    cleaned += 1
-                print(f"  🗑️ Removed {len(self.issues['orphaned_positive_factors'])} orphaned positive factors")
+            if not handled:
+                print("✅ No issues to clean!")
+                return True
             
-            if 'orphaned_negative_factors' in self.issues:
-                for factor in self.issues['orphaned_negative_factors']:
-                    cursor.execute("DELETE FROM crop_review_negative_factors WHERE crop_review_id = ? AND factor_id = ?", 
-                                 (factor['crop_review_id'], factor['factor_id']))
-                    cleaned += 1
-                print(f"  🗑️ Removed {len(self.issues['orphaned_negative_factors'])} orphaned negative factors")
+            db_started = time.time()
+            deleted = db_access.retry_on_busy(lambda: self._delete_marked_records(conn), description="Cleanup transaction")
+            print(f"  ⏱️ Database deletes took {time.time() - db_started:.2f}s")
+        finally:
+            conn.close()
+        
+        for issue_type, message in CLEAN_MESSAGES.items():
+            if handled[issue_type]:
+                print(f"  {message.format(handled[issue_type])}")
+        if deleted['cascaded_reviews'] or deleted['cascaded_links']:
+            print(f"  🔗 Also removed {deleted['cascaded_reviews']} reviews of deleted crops "
+                  f"and {deleted['cascaded_links']} factor links of deleted reviews")
+        
+        cleaned = sum(count for key, count in deleted.items() if not key.startswith('cascaded_'))
+        print(f"\n✅ Cleaned {cleaned} database records and {files_cleaned} files in {time.time() - started:.1f}s")
+        return True
+    
+    def _delete_marked_records(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """
+        Deletes every row keyed in the cleanup temp tables in one transaction.
+        Safe to retry: the temp tables are committed before it runs and a
+        failed attempt rolls back completely.
+
+        Returns:
+            Rows deleted per table, plus the cascaded review and link counts.
+        """
+        deleted = {}
+        with conn:
+            # Reviews of crops being deleted go too, and with them their factor links
+            before = conn.execute("SELECT COUNT(*) FROM temp.clean_reviews").fetchone()[0]
+            conn.execute("""
+                INSERT OR IGNORE INTO temp.clean_reviews
+                SELECT id FROM crop_reviews WHERE crop_id IN (SELECT id FROM temp.clean_crops)
+            """)
+            deleted['cascaded_reviews'] = conn.execute("SELECT COUNT(*) FROM temp.clean_reviews").fetchone()[0] - before
             
-            # Clean orphaned image views
-            if 'orphaned_image_views' in self.issues:
-                for view in self.issues['orphaned_image_views']:
-                    cursor.execute("DELETE FROM image_views WHERE id = ?", (view['view_id'],))
-                    cleaned += 1
-                print(f"  🗑️ Removed {len(self.issues['orphaned_image_views'])} orphaned image views")
+            deleted['cascaded_links'] = 0
+            for table, links in (('crop_review_positive_factors', 'clean_positive_links'),
+                                 ('crop_review_negative_factors', 'clean_negative_links')):
+                deleted[table] = conn.execute(f"""
+                    DELETE FROM {table}
+                    WHERE (crop_review_id, factor_id) IN (SELECT crop_review_id, factor_id FROM temp.{links})
+                """).rowcount
+                deleted['cascaded_links'] += conn.execute(f"""
+                    DELETE FROM {table} WHERE crop_review_id IN (SELECT id FROM temp.clean_reviews)
+                """).rowcount
             
-            # Clean incomplete crop records
-            if 'incomplete_crop_records' in self.issues:
-                for crop in self.issues['incomplete_crop_records']:
-                    cursor.execute("DELETE FROM saved_crops WHERE id = ?", (crop['crop_id'],))
-                    cleaned += 1
-                print(f"  🗑️ Removed {len(self.issues['incomplete_crop_records'])} incomplete crop records")
+            deleted['crop_reviews'] = conn.execute(
+                "DELETE FROM crop_reviews WHERE id IN (SELECT id FROM temp.clean_reviews)").rowcount
+            deleted['saved_crops'] = conn.execute(
+                "DELETE FROM saved_crops WHERE id IN (SELECT id FROM temp.clean_crops)").rowcount
             
-            # Clean missing crop files (database records that point to non-existent files)
-            if 'missing_crop_files' in self.issues:
-                for crop in self.issues['missing_crop_files']:
-                    cursor.execute("DELETE FROM saved_crops WHERE id = ?", (crop['crop_id'],))
-                    cleaned += 1
-                print(f"  🗑️ Removed {len(self.issues['missing_crop_files'])} database records for missing crop files")
+            # Views of missing images, raw and rolled up
+            view_tables = ['image_views']
+            if conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='image_view_daily'").fetchone():
+                view_tables.append('image_view_daily')
+            for table in view_tables:
+                deleted[table] = conn.execute(f"""
+                    DELETE FROM {table}
+                    WHERE (camera_name, filename) IN (SELECT camera_name, filename FROM temp.clean_images)
+                """).rowcount
+        return deleted
+    
+    def _clean_files_in_pool(self):
+        """
+        Generator that removes orphaned crop files and quarantines orphaned
+        captured images in a thread pool, keeping a bounded number in flight.
+        Send (issue_type, path) for each file, then None to wait for the rest
+        and receive the number of files handled.
+        """
+        quarantine_dir = Path("quarantine_images")
+        quarantine_names = None  # Listed once, on the first quarantined file
+        done = failed = 0
+        started = time.time()
+        in_flight: Set[Future] = set()
+        
+        def collect(futures):
+            nonlocal done, failed
+            for future in futures:
+                error = future.result()
+                if error:
+                    print(f"  ⚠️ {error}")
+                    failed += 1
+                else:
+                    done += 1
+                if (done + failed) % PROGRESS_EVERY == 0:
+                    print(f"  ... {done + failed} files handled ({(done + failed) / (time.time() - started):.0f}/s)")
+        
+        with ThreadPoolExecutor(max_workers=FILE_WORKERS) as pool:
+            item = yield
+            while item is not None:
+                issue_type, path = item
+                if issue_type == 'orphaned_crop_files':
+                    future = pool.submit(remove_orphan_file, path)
+                else:
+                    if quarantine_names is None:
+                        quarantine_dir.mkdir(exist_ok=True)
+                        quarantine_names = set(os.listdir(quarantine_dir))
+                    # Pick a free name up front, instead of probing the disk per candidate name
+                    src_path = Path(path)
+                    name, counter = src_path.name, 1
+                    while name in quarantine_names:
+                        name = f"{src_path.stem}_{counter}{src_path.suffix}"
+                        counter += 1
+                    quarantine_names.add(name)
+                    future = pool.submit(quarantine_file, src_path, quarantine_dir / name)
+                in_flight.add(future)
+                if len(in_flight) >= FILE_WORKERS * 4:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                item = yield
+            collect(in_flight)
+        
+        if done or failed:
+            print(f"  ⏱️ Handled {done} files ({failed} failed) in {time.time() - started:.2f}s")
+        yield done
+    
+    def compact_image_views(self, older_than_days: int = DEFAULT_VIEW_RETENTION_DAYS, confirm: bool = False) -> bool:
+        """
+        Roll raw image_views rows older than the cutoff up into per-image,
+        per-day aggregates in image_view_daily, then delete the raw rows.
+
+        Each day is rolled up and deleted in its own short transaction, so the
+        server is never locked out for long and an interrupted run resumes at
+        the next day. The newest raw row per (image, viewer) is kept, because
+        the server recomputes image_stats.unique_viewers from image_views on
+        every new view; totals stay equal to image_stats.total_views as
+        image_view_daily.views plus the raw views since the rollup boundary.
+
+        Args:
+            older_than_days: Only whole days (UTC, like viewed_at) older than this are rolled up.
+            confirm: Without it, only report what would be compacted.
+
+        Returns:
+            True if compaction ran (or there was nothing to do).
+        """
+        print(f"🗜️ Compacting image views older than {older_than_days} days...")
+        started = time.time()
+        
+        with self.connect_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA table_info(image_views)")
+            columns = {col[1] for col in cursor.fetchall()}
+            if not {'camera_name', 'filename', 'viewer_ip', 'viewed_at'} <= columns:
+                print(f"  ⚠️ image_views is missing or has unexpected columns, skipping: {sorted(columns)}")
+                return False
             
-            # Clean orphaned crop files
-            if 'orphaned_crop_files' in self.issues:
-                for crop_file in self.issues['orphaned_crop_files']:
-                    try:
-                        os.remove(crop_file['file_path'])
-                        cleaned += 1
-                    except FileNotFoundError:
-                        pass  # File already gone
-                    except Exception as e:
-                        print(f"  ⚠️ Could not delete {crop_file['file_path']}: {e}")
-                print(f"  🗑️ Removed {len(self.issues['orphaned_crop_files'])} orphaned crop files")
-
-            # Clean orphaned captured images (move to quarantine)
-            if 'orphaned_captured_images' in self.issues:
-                quarantine_dir = Path("quarantine_images")
-                quarantine_dir.mkdir(exist_ok=True)
+            cursor.execute("SELECT date('now', ?)", (f"-{older_than_days} days",))
+            cutoff_day = cursor.fetchone()[0]
+            boundary = self._view_rollup_boundary(cursor) or ''
+            cursor.execute("SELECT COUNT(*), COUNT(DISTINCT date(viewed_at)) FROM image_views WHERE viewed_at >= ? AND viewed_at < ?",
+                           (boundary, cutoff_day))
+            eligible_rows, eligible_days = cursor.fetchone()
+            print(f"  • {eligible_rows} raw views across {eligible_days} days before {cutoff_day}")
+            
+            if not confirm:
+                print("❌ Compaction requires --confirm flag for safety")
+                return False
+            
+            conn.executescript(VIEW_ROLLUP_SCHEMA)
+            rolled_days = deleted_rows = 0
+            
+            while True:
+                cursor.execute("SELECT date(MIN(viewed_at)) FROM image_views WHERE viewed_at >= ?", (boundary,))
+                day = cursor.fetchone()[0]
+                if day is None or day >= cutoff_day:
+                    break
+                cursor.execute("SELECT date(?, '+1 day')", (day,))
+                next_day = cursor.fetchone()[0]
                 
-                for img_file in self.issues['orphaned_captured_images']:
-                    try:
-                        src_path = Path(img_file['file_path'])
-                        dst_path = quarantine_dir / src_path.name
-                        
-                        # Ensure unique filename if collision
-                        counter = 1
-                        while dst_path.exists():
-                            stem = src_path.stem
-                            suffix = src_path.suffix
-                            dst_path = quarantine_dir / f"{stem}_{counter}{suffix}"
-                            counter += 1
-                        
-                        src_path.rename(dst_path)
-                        cleaned += 1
-                    except Exception as e:
-                        print(f"  ⚠️ Could not quarantine {img_file['file_path']}: {e}")
-                print(f"  📦 Quarantined {len(self.issues['orphaned_captured_images'])} orphaned captured images")
-
-            conn.commit()
-            print(f"\n✅ Cleaned {cleaned} database records")
+                def roll_up_day():
+                    with conn:
+                        conn.execute("""
+                            INSERT INTO image_view_daily
+                                (camera_name, filename, day, views, unique_viewers, first_viewed_at, last_viewed_at)
+                            SELECT camera_name, filename, ?, COUNT(*), COUNT(DISTINCT viewer_ip), MIN(viewed_at), MAX(viewed_at)
+                            FROM image_views
+                            WHERE viewed_at >= ? AND viewed_at < ?
+                            GROUP BY camera_name, filename
+                        """, (day, day, next_day))
+                        deleted = conn.execute("""
+                            DELETE FROM image_views
+                            WHERE viewed_at >= ? AND viewed_at < ?
+                              AND EXISTS (
+                                  SELECT 1 FROM image_views newer
+                                  WHERE newer.camera_name = image_views.camera_name
+                                    AND newer.filename = image_views.filename
+                                    AND newer.viewer_ip = image_views.viewer_ip
+                                    AND newer.id > image_views.id
+                              )
+                        """, (day, next_day)).rowcount
+                        conn.execute("""
+                            INSERT INTO image_view_rollup_state (id, rolled_before, compacted_at)
+                            VALUES (1, ?, CURRENT_TIMESTAMP)
+                            ON CONFLICT(id) DO UPDATE SET rolled_before = excluded.rolled_before,
+                                                          compacted_at = excluded.compacted_at
+                        """, (next_day,))
+                        return deleted
+                
+                deleted_rows += db_access.retry_on_busy(roll_up_day, description=f"Rollup of views on {day}")
+                rolled_days += 1
+                boundary = next_day
+                if rolled_days % 30 == 0:
+                    print(f"  ... rolled up {rolled_days} days ({deleted_rows} raw rows deleted, {time.time() - started:.1f}s)")
+            
+            print(f"  📊 Rolled up {rolled_days} days, deleted {deleted_rows} raw view rows")
+            
+            # Return freed pages to the filesystem; only possible with auto_vacuum=INCREMENTAL
+            cursor.execute("PRAGMA auto_vacuum")
+            if cursor.fetchone()[0] == 2:
+                freed_pages = 0
+                while True:
+                    cursor.execute("PRAGMA freelist_count")
+                    free = cursor.fetchone()[0]
+                    if free == 0:
+                        break
+                    step = min(free, INCREMENTAL_VACUUM_PAGES)
+                    # executescript steps the pragma to completion; execute() frees a single page
+                    db_access.retry_on_busy(lambda: conn.executescript(f"PRAGMA incremental_vacuum({step});"),
+                                            description="Incremental vacuum")
+                    freed_pages += step
+                cursor.execute("PRAGMA page_size")
+                print(f"  💾 Released {freed_pages * cursor.fetchone()[0] / 1024**2:.1f} MB back to the filesystem")
+            elif deleted_rows:
+                print("  ℹ️ auto_vacuum is not INCREMENTAL, so freed pages are only reused by new rows. To shrink the file,")
+                print("     run 'PRAGMA auto_vacuum=INCREMENTAL; VACUUM;' once while the server is stopped.")
         
+        print(f"✅ View compaction finished in {time.time() - started:.1f}s")
         return True
     
-    def save_report(self, filename: str = "database_integrity_report.json"):
-        """Save the integrity report to a JSON file"""
-        report = {
-            'timestamp': os.getctime(self.db_path),
-            'database_path': self.db_path,
-            'statistics': self.stats,
-            'issues': dict(self.issues)
-        }
-        
-        with open(filename, 'w') as f:
-            json.dump(report, f, indent=2, default=str)
-        
-        print(f"📄 Report saved to {filename}")
-
 def main():
     parser = argparse.ArgumentParser(description="Traffic Camera Database Integrity Checker and Cleaner")
     parser.add_argument('--scan', action='store_true', help='Scan database for integrity issues')
@@ -573,34 +1359,69 @@ def main():
     parser.add_argument('--db', default='traffic_cameras.db', help='Path to database file')
     parser.add_argument('--captured-dir', default='captured_images', help='Path to captured images directory')
     parser.add_argument('--saved-dir', default='saved_images', help='Path to saved images directory')
-    parser.add_argument('--report', help='Save report to JSON file')
+    parser.add_argument('--report', help='Stream issues to a JSONL report file (gzip-compressed if it ends in .gz)')
+    parser.add_argument('--from-report', metavar='FILE', help='With --clean: clean the issues in a saved report instead of rescanning')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only check rows and directories changed since the last incremental scan (see --state)')
+    parser.add_argument('--state', default=DEFAULT_SCAN_STATE, metavar='FILE',
+                        help=f'State file for --incremental (default {DEFAULT_SCAN_STATE})')
+    parser.add_argument('--full-scan-days', type=int, default=DEFAULT_FULL_SCAN_DAYS, metavar='N',
+                        help=f'With --incremental: run a full scan when the last one is over N days old (default {DEFAULT_FULL_SCAN_DAYS})')
+    parser.add_argument('--full', action='store_true', help='With --incremental: force a full scan and record it')
+    parser.add_argument('--compact-views', type=int, nargs='?', const=DEFAULT_VIEW_RETENTION_DAYS, metavar='DAYS',
+                        help=f'Roll up image_views older than DAYS (default {DEFAULT_VIEW_RETENTION_DAYS}) into daily aggregates (requires --confirm)')
     
     args = parser.parse_args()
     
-    if not args.scan and not args.clean:
+    if not args.scan and not args.clean and args.compact_views is None:
         parser.print_help()
         return
     
+    if args.from_report and not args.clean:
+        parser.error("--from-report is only used with --clean")
+    if args.full and not args.incremental:
+        parser.error("--full is only used with --incremental")
+    
     try:
         cleaner = DatabaseCleaner(args.db, args.captured_dir, args.saved_dir)
         
-        # Always scan first
-        print("🚀 Starting database integrity scan...")
-        cleaner.scan_database_integrity()
-        cleaner.print_report()
+        if args.compact_views is not None:
+            cleaner.compact_image_views(args.compact_views, args.confirm)
+            if not args.scan and not args.clean:
+                return 0
         
-        if args.report:
-            cleaner.save_report(args.report)
-        
-        # Clean if requested
-        if args.clean:
-            success = cleaner.clean_database(args.confirm)
+        # Clean straight from a saved report, without rescanning
+        if args.from_report:
+            success = cleaner.clean_database(args.confirm, args.from_report)
             if success:
-                print("\n🔄 Re-scanning after cleanup...")
-                cleaner.issues.clear()
-                cleaner.stats = {k: 0 for k in cleaner.stats}
-                cleaner.scan_database_integrity()
-                cleaner.print_report()
+                print("\nℹ️ Run --scan to verify the result")
+            return 0 if success else 1
+        
+        # Always scan first. Cleaning reads the issues back from the report,
+        # so keep one in a temporary file if none was asked for.
+        report_path = args.report
+        temp_report = None
+        if args.clean and not report_path:
+            fd, temp_report = tempfile.mkstemp(prefix='integrity_report_', suffix='.jsonl.gz')
+            os.close(fd)
+            report_path = temp_report
+        
+        try:
+            print("🚀 Starting database integrity scan...")
+            cleaner.scan_database_integrity(report_path, args.state if args.incremental else None,
+                                            args.full_scan_days, args.full)
+            cleaner.print_report()
+            
+            # Clean if requested
+            if args.clean:
+                success = cleaner.clean_database(args.confirm, report_path)
+                if success:
+                    print("\n🔄 Re-scanning after cleanup...")
+                    cleaner.scan_database_integrity()
+                    cleaner.print_report()
+        finally:
+            if temp_report and os.path.exists(temp_report):
+                os.remove(temp_report)
     
     except Exception as e:
         print(f"❌ Error: {e}")
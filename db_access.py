@@ -0,0 +1,131 @@
+"""
+Shared SQLite access for the Python tools (file_cleanup.py, database_cleaner.py).
+
+traffic_cameras.db is written by the Node server while these tools read and
+update it, so every connection opened here is tuned for sharing:
+- WAL journal mode, so readers never block the server's writes
+- a busy timeout, plus retries with jittered exponential backoff for the
+  lock errors SQLite raises without waiting (e.g. a stale WAL snapshot)
+- synchronous=NORMAL (durable in WAL mode), a larger page cache and mmap'd reads
+- a bigger prepared-statement cache, since the tools run the same few
+  statements many thousands of times
+
+Bulk writes go through executemany_chunked, which commits in short
+transactions so the server is never locked out for long, and scans can use
+snapshot() for a consistent read-only view.
+"""
+
+import sqlite3
+import time
+import random
+import logging
+import itertools
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_SECONDS = 10
+CACHE_SIZE_KB = 64 * 1024             # Negative cache_size is in KiB: 64 MB page cache
+MMAP_SIZE_BYTES = 256 * 1024**2
+STATEMENT_CACHE_SIZE = 256
+RETRY_ATTEMPTS = 6
+RETRY_BASE_DELAY = 0.05               # Seconds; doubles each attempt, with jitter
+RETRY_MAX_DELAY = 2.0
+DEFAULT_CHUNK_SIZE = 500
+
+T = TypeVar('T')
+
+def is_busy_error(error: Exception) -> bool:
+    """Whether an error is SQLite reporting a lock held by another connection."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+def connect(db_path: str | Path, readonly: bool = False) -> sqlite3.Connection:
+    """
+    Opens a tuned connection to the database. The caller owns it and should close it.
+
+    Args:
+        db_path: Path to the SQLite database.
+        readonly: Open with mode=ro, for scans that must never write.
+
+    Returns:
+        The open connection.
+    """
+    if readonly:
+        conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True,
+                               timeout=BUSY_TIMEOUT_SECONDS, cached_statements=STATEMENT_CACHE_SIZE)
+    else:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, cached_statements=STATEMENT_CACHE_SIZE)
+        try:
+            # The server already uses WAL; this covers databases created elsewhere
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Could not switch {db_path} to WAL mode: {e}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+    return conn
+
+def retry_on_busy(operation: Callable[[], T], attempts: int = RETRY_ATTEMPTS, description: str = "database write") -> T:
+    """
+    Runs an operation, retrying with jittered exponential backoff while the
+    database is locked. The operation must be safe to re-run, e.g. a whole
+    `with conn:` transaction, which rolls back when it fails.
+
+    Raises:
+        sqlite3.OperationalError: If the database is still locked after the last attempt,
+        or for any other error.
+    """
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == attempts - 1:
+                raise
+            delay = min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY) * random.uniform(0.5, 1.5)
+            logger.warning(f"{description} hit a locked database ({e}); retrying in {delay:.2f}s "
+                           f"(attempt {attempt + 2}/{attempts})")
+            time.sleep(delay)
+
+def executemany_chunked(conn: sqlite3.Connection, sql: str, rows: Iterable[tuple], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Runs executemany over rows in chunks, committing each chunk in its own
+    short transaction (retried if the database is locked), so a large
+    bulk write never holds the write lock for long.
+
+    Returns:
+        The number of rows executed.
+    """
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return total
+
+        def write_chunk():
+            with conn:
+                conn.executemany(sql, chunk)
+
+        retry_on_busy(write_chunk, description=f"Bulk write of {len(chunk)} rows")
+        total += len(chunk)
+
+@contextmanager
+def snapshot(db_path: str | Path) -> Iterator[sqlite3.Connection]:
+    """
+    Yields a read-only connection holding one read transaction, so every
+    query in the block sees the same consistent state of the database
+    while the server keeps writing (WAL readers don't block writers).
+    """
+    conn = connect(db_path, readonly=True)
+    try:
+        conn.execute("BEGIN")
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1")  # The snapshot starts at the first read
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
@@ -1,10 +1,34 @@
 import os
+import sys
+import argparse
 import sqlite3
 import logging
 import shutil
 from pathlib import Path
 from datetime import datetime, timedelta
 import time
+import json
+import hashlib
+import heapq
+import itertools
+import select
+import ctypes
+import ctypes.util
+import threading
+import struct
+import zipfile
+import zlib
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, NamedTuple
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+import db_access
+from image_formats import is_image_file
 
 # Set up logging, consistent with camera_capture.py
 logging.basicConfig(
@@ -17,185 +41,821 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def find_old_files(directory: str | Path, hours: int) -> list[Path]:
+# Candidates are inserted into the database's temp table in batches of this size
+CANDIDATE_BATCH_SIZE = 5000
+
+# Archive paths are committed to image_stats every this many moved files
+ARCHIVE_DB_BATCH_SIZE = 500
+
+# Archive rate limits used when no time-of-day profile applies (roughly the old 10 files/s pace)
+DEFAULT_RATE_PROFILE = {
+    'name': 'default',
+    'workers': 2,
+    'files_per_sec': 10,
+    'mb_per_sec': 10,
+    'target_latency_ms': 200
+}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until the bucket has tokens,
+    then takes the full amount, borrowing against future refills if it is
+    larger than the bucket, so one big file can't stall forever.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def set_rate(self, rate: float):
+        with self.lock:
+            self._refill()
+            self.rate = rate
+
+    def acquire(self, amount: float):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens > 0:
+                    self.tokens -= amount
+                    return
+                wait_seconds = -self.tokens / self.rate if self.rate > 0 else 1.0
+            time.sleep(min(max(wait_seconds, 0.001), 1.0))
+
+class AdaptiveRateLimiter:
+    """
+    Limits archive moves to a files/s and bytes/s budget. Each move's latency
+    is fed back in: when the smoothed latency on the source disk goes above
+    the target, the limits are halved, and when it is well below the target
+    they creep back up toward the configured maximum.
+    """
+
+    def __init__(self, files_per_sec: float, bytes_per_sec: float, target_latency: float, min_scale: float = 0.05):
+        self.max_files_per_sec = files_per_sec
+        self.max_bytes_per_sec = bytes_per_sec
+        self.target_latency = target_latency
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self.latency_ewma = None
+        self.last_adjustment = time.monotonic()
+        self.lock = threading.Lock()
+        self.files_bucket = TokenBucket(files_per_sec)
+        self.bytes_bucket = TokenBucket(bytes_per_sec)
+
+    def acquire(self, size: int):
+        self.files_bucket.acquire(1)
+        self.bytes_bucket.acquire(size)
+
+    def record(self, latency: float):
+        with self.lock:
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * latency
+
+            # Adjust at most once a second so a burst of samples doesn't collapse the rate
+            now = time.monotonic()
+            if now - self.last_adjustment < 1.0:
+                return
+            self.last_adjustment = now
+
+            if self.latency_ewma > self.target_latency:
+                new_scale = max(self.min_scale, self.scale * 0.5)
+            elif self.latency_ewma < self.target_latency * 0.5:
+                new_scale = min(1.0, self.scale + 0.1)
+            else:
+                return
+
+            if new_scale != self.scale:
+                logger.info(f"Source disk latency {self.latency_ewma * 1000:.0f} ms, archive rate now {new_scale:.0%} of limit")
+                self.scale = new_scale
+                self.files_bucket.set_rate(self.max_files_per_sec * new_scale)
+                self.bytes_bucket.set_rate(self.max_bytes_per_sec * new_scale)
+
+# Read size for checksums and user-space copies
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Packed camera-days are stored as <archive>/<camera>/<YYYYMMDD>.zip with a
+# sidecar JSON index of each frame's data offset next to it
+CONTAINER_SUFFIX = '.zip'
+CONTAINER_INDEX_SUFFIX = '.idx.json'
+ZIP_LOCAL_HEADER_SIZE = 30
+
+class TransferVerificationError(Exception):
+    """Raised when an archived copy's checksum doesn't match its source."""
+
+def file_checksum(path: Path) -> str:
+    """Streams a file through BLAKE2b and returns the hex digest."""
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        while chunk := f.read(COPY_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def copy_file_contents(fsrc, fdst, size: int) -> tuple[str, str | None]:
+    """
+    Copies an open file into another, preferring kernel-assisted copies.
+
+    Tries os.copy_file_range, then os.sendfile, then a plain read/write loop.
+    A kernel method is abandoned only if it fails before copying anything.
+
+    Returns:
+        The copy mode used and, for the read/write loop, the checksum of the
+        bytes copied (kernel copies never see the data, so that is None).
+    """
+    src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+
+    for mode in ('copy_file_range', 'sendfile'):
+        if not hasattr(os, mode):
+            continue
+        copied = 0
+        try:
+            while copied < size:
+                if mode == 'copy_file_range':
+                    sent = os.copy_file_range(src_fd, dst_fd, size - copied)
+                else:
+                    sent = os.sendfile(dst_fd, src_fd, copied, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return mode, None
+        except OSError:
+            if copied:
+                raise
+            # Not supported between these filesystems, try the next method
+
+    digest = hashlib.blake2b()
+    while chunk := fsrc.read(COPY_CHUNK_SIZE):
+        digest.update(chunk)
+        fdst.write(chunk)
+    return 'copy', digest.hexdigest()
+
+def transfer_file(source: Path, destination: Path) -> str:
+    """
+    Moves a file to its archive destination and returns the transfer mode used.
+
+    On the same filesystem this is a single rename. Across devices the file
+    is copied to a temporary name and fsynced. The copy's checksum is then
+    checked against the source before it is renamed into place, and only
+    after that is the source unlinked. If the copy fails (e.g. ENOSPC or
+    EIO) the partial copy is removed, the source is left alone and the
+    OSError propagates; on a checksum mismatch the same happens with
+    TransferVerificationError.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    if os.stat(source).st_dev == os.stat(destination.parent).st_dev:
+        os.replace(source, destination)
+        return 'rename'
+
+    temp_path = destination.with_name(f".{destination.name}.part")
+    try:
+        with open(source, 'rb') as fsrc, open(temp_path, 'wb') as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            mode, source_digest = copy_file_contents(fsrc, fdst, size)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+
+        if source_digest is None:
+            source_digest = file_checksum(source)
+        if file_checksum(temp_path) != source_digest:
+            raise TransferVerificationError(f"Checksum mismatch copying {source} to {destination}")
+
+        # Keep the capture mtime, which archive cleanup orders by
+        shutil.copystat(source, temp_path)
+        os.replace(temp_path, destination)
+        if os.name != 'nt':
+            # Make the rename itself durable before the source goes away
+            dir_fd = os.open(destination.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    except BaseException:
+        try:
+            temp_path.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+
+    os.unlink(source)
+    return mode
+
+def select_rate_profile(profiles: list[dict], now: datetime | None = None) -> dict:
+    """Picks the rate profile whose [start_hour, end_hour) window contains the current hour."""
+    hour = (now or datetime.now()).hour
+    for profile in profiles:
+        start, end = profile.get('start_hour', 0), profile.get('end_hour', 24)
+        in_window = start <= hour < end if start <= end else (hour >= start or hour < end)
+        if in_window:
+            return {**DEFAULT_RATE_PROFILE, **profile}
+    return DEFAULT_RATE_PROFILE
+
+def run_bounded(executor: ThreadPoolExecutor, fn, items: Iterable, max_in_flight: int) -> Iterator:
+    """Runs fn over items on the executor with at most max_in_flight pending, yielding results as they finish."""
+    pending = set()
+    for item in items:
+        if len(pending) >= max_in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(executor.submit(fn, item))
+    for future in pending:
+        yield future.result()
+
+class FileCandidate(NamedTuple):
+    """A captured frame found by the scanner, carrying the stat data already read for it."""
+    path: Path
+    camera: str
+    size: int
+    mtime: float
+    capture_time: float  # From the YYYYMMDD_HHMMSS filename when possible, otherwise mtime
+
+class ArchivedFile(NamedTuple):
+    """A file in the archive, as stored in the archive_files index."""
+    path: Path
+    camera: str
+    size: int
+    mtime: float
+
+class RuleMatch(NamedTuple):
+    """A candidate file together with the cleanup rule it matched."""
+    candidate: FileCandidate
+    rule: str
+
+def capture_time_from_name(filename: str) -> float | None:
+    """Parses the capture time out of a 'YYYYMMDD_HHMMSS.ext' frame name, or returns None."""
+    stem = filename.split('.', 1)[0]
+    if len(stem) != 15:
+        return None
+    try:
+        return datetime.strptime(stem, '%Y%m%d_%H%M%S').timestamp()
+    except ValueError:
+        return None
+
+def load_scan_state(state_path: Path) -> dict:
+    """Loads the per-directory state saved by the previous scan (empty if there is none)."""
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read scan state from '{state_path}', doing a full scan: {e}")
+        return {}
+
+def save_scan_state(state_path: Path, scan_state: dict):
+    """Saves the per-directory scan state for the next run."""
+    try:
+        temp_path = state_path.with_name(f".{state_path.name}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(scan_state, f)
+        os.replace(temp_path, state_path)
+    except OSError as e:
+        logger.warning(f"Could not save scan state to '{state_path}': {e}")
+
+def find_old_files(directory: str | Path, hours: float, scan_state: dict | None = None) -> Iterator[FileCandidate]:
     """
-    Finds files in a directory and its subdirectories older than a specified
-    number of hours based on their modification time.
+    Streams the frames under the per-camera folders of a directory that are
+    older than a specified number of hours.
+
+    The tree is walked with os.scandir so each entry is stat'ed at most once,
+    and a frame's age comes from its YYYYMMDD_HHMMSS filename when it has
+    one (falling back to the modification time).
+
+    If a scan_state dict is passed in, it is used to skip directories whose
+    mtime hasn't changed since the last scan, that produced no candidates
+    last time, and that had no frame close enough to the age limit to have
+    crossed it since. The dict is updated in place as directories finish.
 
     Args:
         directory: The path (string or Path object) to the directory to search.
         hours: The age in hours to consider a file "old".
+        scan_state: Optional state from a previous scan, as loaded by load_scan_state.
 
-    Returns:
-        A list of Path objects for files older than the specified age.
+    Yields:
+        FileCandidate entries for files older than the specified age.
     """
     search_path = Path(directory)
     if not search_path.is_dir():
         logger.error(f"Directory not found at '{directory}'")
-        return []
+        return
 
     # Calculate the time threshold for what is considered "old"
     now = datetime.now()
     time_threshold = now - timedelta(hours=hours)
+    threshold_ts = time_threshold.timestamp()
 
     logger.info(f"Searching for files in '{search_path}'...")
-    logger.info(f"Finding files older than {hours} hours (modified before {time_threshold.strftime('%Y-%m-%d %H:%M:%S')}).")
+    logger.info(f"Finding files older than {hours} hours (captured before {time_threshold.strftime('%Y-%m-%d %H:%M:%S')}).")
 
-    old_files = []
-    # Use rglob to recursively find all files in all subdirectories
-    for file_path in search_path.rglob('*'):
-        if file_path.is_file():
-            try:
-                # Get the file's modification time as a datetime object
-                mod_time = datetime.fromtimestamp(file_path.stat().st_mtime)
+    # Directory state is tracked per age limit, since "had candidates" depends on it
+    dir_states = scan_state.setdefault(str(hours), {}) if scan_state is not None else None
+    skipped_dirs = 0
 
-                # Check if the file is older than the threshold
-                if mod_time < time_threshold:
-                    old_files.append(file_path)
-            except FileNotFoundError:
-                # File might have been deleted during the scan, so we skip it
-                logger.warning(f"File not found during scan, skipping: {file_path}")
-                continue
+    # Frames live in per-camera folders; top-level files (e.g. latest_index.json) aren't frames
+    try:
+        with os.scandir(search_path) as entries:
+            pending_dirs = [(entry.path, entry.name) for entry in entries if entry.is_dir(follow_symlinks=False)]
+    except OSError as e:
+        logger.error(f"Could not list '{search_path}': {e}")
+        return
 
-    return old_files
+    while pending_dirs:
+        dir_path, camera = pending_dirs.pop()
+        try:
+            dir_mtime = os.stat(dir_path).st_mtime
+        except FileNotFoundError:
+            continue
+
+        previous = dir_states.get(dir_path) if dir_states is not None else None
+        if (previous and previous['dir_mtime'] == dir_mtime and not previous['had_candidates']
+                and (previous['next_due'] is None or previous['next_due'] >= threshold_ts)):
+            skipped_dirs += 1
+            pending_dirs.extend((sub, camera) for sub in previous.get('subdirs', []))
+            continue
+
+        had_candidates = False
+        next_due = None
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            continue
+                        # Frames in any format they may be transcoded to; skips temp files
+                        if not entry.is_file(follow_symlinks=False) or not is_image_file(entry.name):
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        # File might have been deleted during the scan, so we skip it
+                        logger.warning(f"File not found during scan, skipping: {entry.path}")
+                        continue
 
-def filter_files_by_rule(file_paths: list[Path], db_path: Path, rule: dict) -> tuple[list[Path], dict]:
+                    capture_time = capture_time_from_name(entry.name) or stat.st_mtime
+                    if capture_time < threshold_ts:
+                        had_candidates = True
+                        yield FileCandidate(Path(entry.path), camera, stat.st_size, stat.st_mtime, capture_time)
+                    elif next_due is None or capture_time < next_due:
+                        next_due = capture_time
+        except OSError as e:
+            logger.warning(f"Could not scan directory '{dir_path}': {e}")
+            continue
+
+        pending_dirs.extend((sub, camera) for sub in subdirs)
+        if dir_states is not None:
+            dir_states[dir_path] = {
+                'dir_mtime': dir_mtime,
+                'had_candidates': had_candidates,
+                'next_due': next_due,
+                'subdirs': subdirs
+            }
+
+    if skipped_dirs:
+        logger.info(f"Skipped {skipped_dirs} unchanged directories with nothing old enough to move.")
+
+def load_candidates_into_temp_table(cursor: sqlite3.Cursor, candidates: Iterable[FileCandidate]) -> int:
     """
-    Gathers statistics and filters files based on a single cleanup rule.
+    Streams candidates into a temporary table keyed on (camera_name, filename),
+    inserting them in fixed-size batches so memory use doesn't grow with the
+    number of files.
 
-    A file is marked for moving if it matches the provided rule.
+    Returns:
+        The number of candidates loaded.
+    """
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS cleanup_candidates (
+            camera_name TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            capture_time REAL NOT NULL,
+            PRIMARY KEY (camera_name, filename)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("DELETE FROM temp.cleanup_candidates")
+
+    total = 0
+    iterator = iter(candidates)
+    while True:
+        batch = [(c.camera, c.path.name, str(c.path), c.size, c.mtime, c.capture_time)
+                 for c in itertools.islice(iterator, CANDIDATE_BATCH_SIZE)]
+        if not batch:
+            break
+        cursor.executemany("INSERT OR IGNORE INTO temp.cleanup_candidates VALUES (?, ?, ?, ?, ?, ?)", batch)
+        total += len(batch)
+    return total
+
+def iter_candidate_stats(cursor: sqlite3.Cursor, candidates: Iterable[FileCandidate]) -> Iterator[tuple[FileCandidate, bool, int, int]]:
+    """
+    Loads candidates into the temp table and streams back each one with its
+    database stats. Files with no database entry are included with zero views.
+
+    Yields:
+        Tuples of (candidate, has_db_record, total_views, crop_count).
+    """
+    total = load_candidates_into_temp_table(cursor, candidates)
+    if not total:
+        return
+
+    # Both lookups use the existing (camera, filename) indexes.
+    query = """
+        SELECT
+            c.path,
+            c.camera_name,
+            c.size,
+            c.mtime,
+            c.capture_time,
+            s.id IS NOT NULL AS in_db,
+            COALESCE(s.total_views, 0) AS total_views,
+            (SELECT COUNT(*) FROM saved_crops sc
+             WHERE sc.original_camera = c.camera_name AND sc.original_filename = c.filename) AS crop_count
+        FROM
+            temp.cleanup_candidates c
+        LEFT JOIN
+            image_stats s ON s.camera_name = c.camera_name AND s.filename = c.filename
+    """
+
+    logger.info(f"Querying DB for stats on {total} files...")
+    cursor.execute(query)
+    for path, camera, size, mtime, capture_time, in_db, total_views, crop_count in cursor:
+        yield FileCandidate(Path(path), camera, size, mtime, capture_time), bool(in_db), total_views, crop_count
+
+def rule_label(rule: dict) -> str:
+    """Name used to attribute files to a rule in logs and statistics."""
+    return rule.get('description') or f"age>={rule['age_hours']}h views>={rule['min_views']} crops<={rule['max_crops']}"
+
+def order_rules(rules: list[dict]) -> list[dict]:
+    """Orders rules by their 'priority' (lowest first), keeping list order for ties."""
+    return [rule for _, rule in sorted(enumerate(rules), key=lambda item: (item[1].get('priority', 100), item[0]))]
+
+def evaluate_cleanup_rules(candidates: Iterable[FileCandidate], db_path: Path, rules: list[dict],
+                           conn: sqlite3.Connection | None = None) -> tuple[list[RuleMatch], dict]:
+    """
+    Evaluates every cleanup rule against the candidates in a single database pass.
+
+    Rules are tried in priority order and the first one a file matches wins,
+    so each file is attributed to exactly one rule. Feed this a single scan
+    at the smallest 'age_hours' of all the rules.
 
     Args:
-        file_paths: A list of Path objects to check.
+        candidates: The FileCandidate entries to check (e.g. from find_old_files).
         db_path: The path to the SQLite database.
-        rule: A rule dictionary. The dict must contain 'age_hours',
-              'min_views', and 'max_crops'.
+        rules: Rule dictionaries, each with 'age_hours', 'min_views' and
+               'max_crops', and optionally 'priority' and 'description'.
+        conn: An open connection to reuse (left open, with no transaction
+              pending); by default one is opened and closed for this call.
 
     Returns:
         A tuple containing:
-        - A list of Path objects that meet the criteria for moving.
-        - A dictionary with summary statistics of the initial file set.
+        - A list of RuleMatch entries for files that matched a rule.
+        - A dictionary with summary statistics, including a 'per_rule'
+          breakdown of matched files and bytes.
     """
-    summary_stats = {'total_in_db': 0, 'with_multiple_views': 0, 'with_crops': 0}
-    if not file_paths:
-        return [], summary_stats
+    ordered = order_rules(rules)
+    summary_stats = {
+        'total_candidates': 0,
+        'total_in_db': 0,
+        'with_views': 0,
+        'with_crops': 0,
+        'unmatched': 0,
+        'per_rule': {rule_label(rule): {'files': 0, 'bytes': 0} for rule in ordered}
+    }
 
     if not db_path.is_file():
         logger.error(f"Database not found at '{db_path}'. Cannot filter files.")
         return [], summary_stats
 
-    filenames_to_check = [p.name for p in file_paths]
-    path_map = {p.name: p for p in file_paths}
-
-    conn = None
+    own_conn = conn is None
     try:
-        conn = sqlite3.connect(db_path)
+        if own_conn:
+            conn = db_access.connect(db_path)
         cursor = conn.cursor()
 
-        placeholders = ','.join('?' for _ in filenames_to_check)
-        # This query gets view and crop counts for all candidate files in one go.
-        query = f"""
-            SELECT
-                s.filename,
-                s.total_views,
-                COUNT(c.id) as crop_count
-            FROM
-                image_stats s
-            LEFT JOIN
-                saved_crops c ON s.filename = c.original_filename
-            WHERE
-                s.filename IN ({placeholders})
-            GROUP BY
-                s.filename
-        """
+        matches = []
+        now = time.time()
 
-        params = filenames_to_check
-        logger.info(f"Querying DB for stats on {len(filenames_to_check)} files...")
-        cursor.execute(query, params)
+        for candidate, in_db, total_views, crop_count in iter_candidate_stats(cursor, candidates):
+            summary_stats['total_candidates'] += 1
+            if in_db:
+                summary_stats['total_in_db'] += 1
+            if total_views > 0:
+                summary_stats['with_views'] += 1
+            if crop_count > 0:
+                summary_stats['with_crops'] += 1
 
-        db_results = cursor.fetchall()
-        summary_stats['total_in_db'] = len(db_results)
+            age_hours = (now - candidate.capture_time) / 3600
+            for rule in ordered:
+                if (age_hours >= rule['age_hours'] and
+                    total_views >= rule['min_views'] and
+                    crop_count <= rule['max_crops']):
+                    label = rule_label(rule)
+                    matches.append(RuleMatch(candidate, label))
+                    summary_stats['per_rule'][label]['files'] += 1
+                    summary_stats['per_rule'][label]['bytes'] += candidate.size
+                    break
+            else:
+                summary_stats['unmatched'] += 1
 
-        # Create a lookup map for file stats from the database.
-        # This allows us to efficiently find stats for any given filename.
-        stats_map = {filename: {'views': total_views, 'crops': crop_count}
-                     for filename, total_views, crop_count in db_results}
+        return matches, summary_stats
 
-        files_to_move = []
-        now = datetime.now()
+    except sqlite3.Error as e:
+        logger.error(f"Database error: {e}")
+        return [], summary_stats
+    finally:
+        if own_conn and conn:
+            conn.close()
+        elif conn:
+            conn.rollback()  # Ends the read transaction the temp table opened, so the WAL isn't pinned between calls
 
-        # Iterate through ALL candidate files from the filesystem scan.
-        # This is crucial for correctly handling files that have no database entry.
-        for file_path in file_paths:
-            filename = file_path.name
+def ensure_archive_schema(conn: sqlite3.Connection):
+    """Makes sure image_stats can record archive locations and that they can be looked up by path."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(image_stats)")]
+    if 'archived_path' not in columns:
+        conn.execute("ALTER TABLE image_stats ADD COLUMN archived_path TEXT")
+    # (camera_name, filename) is already UNIQUE; this covers lookups by archive path
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_image_stats_archived_path
+        ON image_stats(archived_path) WHERE archived_path IS NOT NULL
+    """)
+    # Index of what's on the archive drive, so eviction doesn't need to scan it
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive_files (
+            path TEXT PRIMARY KEY,
+            camera_name TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_files_mtime ON archive_files(mtime)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_files_camera ON archive_files(camera_name, mtime)")
+    # Which archive roots have had a full index build (files archived before the index existed aren't in it)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive_index_state (
+            archive_root TEXT PRIMARY KEY,
+            rebuilt_at REAL NOT NULL
+        )
+    """)
+    # Coarsest retention interval each camera-day has been thinned to, so finished days are skipped
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive_thinning (
+            camera_name TEXT NOT NULL,
+            day TEXT NOT NULL,
+            interval_minutes INTEGER NOT NULL,
+            thinned_at REAL NOT NULL,
+            PRIMARY KEY (camera_name, day)
+        )
+    """)
+    # Camera-days whose frames have been packed into a single container file
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive_containers (
+            camera_name TEXT NOT NULL,
+            day TEXT NOT NULL,
+            path TEXT NOT NULL,
+            frame_count INTEGER NOT NULL,
+            packed_at REAL NOT NULL,
+            PRIMARY KEY (camera_name, day)
+        )
+    """)
+    # Write-ahead journal of archive moves. A row is written before its move
+    # starts and deleted in the same transaction that records the archived path.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cleanup_journal (
+            source TEXT PRIMARY KEY,
+            camera_name TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            destination TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            cycle_id TEXT NOT NULL,
+            planned_at REAL NOT NULL
+        )
+    """)
+    conn.commit()
 
-            # Get stats from our map, or default to 0 if no DB entry exists.
-            file_stats = stats_map.get(filename, {'views': 0, 'crops': 0})
-            total_views = file_stats['views']
-            crop_count = file_stats['crops']
+def record_archived_frames(conn: sqlite3.Connection, records: list[tuple[str, str, str, int, float]],
+                           completed_sources: list[str] | None = None) -> int:
+    """
+    Records where each archived frame now lives, in one transaction.
+    Frames that were never viewed get an image_stats row too, so every
+    archived frame can be found with a single (camera, filename) lookup,
+    and each frame is added to the archive_files index.
 
-            # Gather summary stats across all candidate files
-            if total_views >= rule['min_views']:
-                summary_stats['with_multiple_views'] += 1
-            if crop_count > 0:
-                summary_stats['with_crops'] += 1
+    Args:
+        conn: An open database connection.
+        records: (camera_name, filename, archived_path, size, mtime) tuples.
+        completed_sources: Journal entries to clear in the same transaction.
 
-            # Check the file against the rule.
-            try:
-                mod_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                age_hours = (now - mod_time).total_seconds() / 3600
-            except FileNotFoundError:
-                continue  # Skip if file was deleted since scan
+    Returns:
+        The number of records written.
+    """
+    def write():
+        with conn:
+            if completed_sources:
+                conn.executemany("DELETE FROM cleanup_journal WHERE source = ?", [(source,) for source in completed_sources])
+            conn.executemany("""
+                INSERT INTO image_stats (camera_name, filename, archived_path, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(camera_name, filename) DO UPDATE SET
+                    archived_path = excluded.archived_path,
+                    updated_at = CURRENT_TIMESTAMP
+            """, [(camera, filename, path) for camera, filename, path, _, _ in records])
+            conn.executemany("""
+                INSERT OR REPLACE INTO archive_files (path, camera_name, filename, size, mtime)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(path, camera, filename, size, mtime) for camera, filename, path, size, mtime in records])
 
-            if (age_hours >= rule['age_hours'] and
-                total_views >= rule['min_views'] and
-                crop_count <= rule['max_crops']):
-                files_to_move.append(file_path)
+    db_access.retry_on_busy(write, description="Recording archive paths")
+    return len(records)
 
-        return list(set(files_to_move)), summary_stats
+def locate_frame(db_path: Path, camera_name: str, filename: str) -> Path | None:
+    """Returns the archive location recorded for a frame, or None if it hasn't been archived."""
+    conn = db_access.connect(db_path, readonly=True)
+    try:
+        row = conn.execute(
+            "SELECT archived_path FROM image_stats WHERE camera_name = ? AND filename = ?",
+            (camera_name, filename)
+        ).fetchone()
+        return Path(row[0]) if row and row[0] else None
+    finally:
+        conn.close()
 
-    except sqlite3.Error as e:
-        logger.error(f"Database error: {e}")
-        return [], summary_stats
+def archive_destination(archive_base: Path, source: Path) -> Path:
+    """Returns where a frame is archived, keeping its camera folder (captured_images/<camera>/<file>)."""
+    return archive_base / source.relative_to(source.parent.parent)
+
+def journal_planned_moves(conn: sqlite3.Connection, candidates: list[FileCandidate], archive_base: Path) -> str:
+    """
+    Writes every planned move to the cleanup journal before any file is touched.
+
+    Returns:
+        The cycle id the entries were written under.
+    """
+    cycle_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    planned_at = time.time()
+    rows = ((os.path.abspath(c.path), c.camera, c.path.name, os.path.abspath(archive_destination(archive_base, c.path)),
+             c.size, c.mtime, cycle_id, planned_at) for c in candidates)
+    db_access.executemany_chunked(conn, """
+        INSERT OR REPLACE INTO cleanup_journal (source, camera_name, filename, destination, size, mtime, cycle_id, planned_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows, chunk_size=CANDIDATE_BATCH_SIZE)
+    return cycle_id
+
+def clear_journal_entries(conn: sqlite3.Connection, sources: list[str]):
+    """Removes journal entries for moves that were abandoned or resolved without recording an archive path."""
+    db_access.executemany_chunked(conn, "DELETE FROM cleanup_journal WHERE source = ?", ((source,) for source in sources))
+
+def recover_cleanup_journal(db_path: Path) -> list[FileCandidate]:
+    """
+    Resolves moves left in the journal by a run that was killed part-way.
+
+    Each entry is checked against the filesystem:
+    - moved (destination present, source gone): the archive path is recorded now
+    - both present: the destination only appears once a copy is verified,
+      so the leftover source is removed and the move recorded
+    - not started (source present, no destination): returned so the cycle can
+      resume those moves without rescanning
+    - neither present: the entry is dropped
+
+    Returns:
+        FileCandidate entries for the moves that still need doing.
+    """
+    if not db_path.is_file():
+        return []
+
+    conn = db_access.connect(db_path)
+    try:
+        ensure_archive_schema(conn)
+        rows = conn.execute("""
+            SELECT source, camera_name, filename, destination, size, mtime FROM cleanup_journal ORDER BY planned_at
+        """).fetchall()
+        if not rows:
+            return []
+
+        logger.warning(f"Found {len(rows)} unfinished archive moves in the cleanup journal; recovering...")
+        replayed = []
+        dropped = []
+        pending = []
+        for source, camera, filename, destination, size, mtime in rows:
+            source_path = Path(source)
+            destination_path = Path(destination)
+            # A copy interrupted before verification leaves only a temp file behind
+            destination_path.with_name(f".{destination_path.name}.part").unlink(missing_ok=True)
+
+            source_exists = source_path.exists()
+            if destination_path.exists():
+                if source_exists:
+                    if destination_path.stat().st_size != size:
+                        logger.error(f"Archive copy {destination} doesn't match {source}; keeping both for manual review.")
+                        dropped.append(source)
+                        continue
+                    source_path.unlink()
+                replayed.append((camera, filename, destination, size, mtime, source))
+            elif source_exists:
+                pending.append(FileCandidate(source_path, camera, size, mtime, capture_time_from_name(filename) or mtime))
+            else:
+                dropped.append(source)
+
+        for start in range(0, len(replayed), ARCHIVE_DB_BATCH_SIZE):
+            chunk = replayed[start:start + ARCHIVE_DB_BATCH_SIZE]
+            record_archived_frames(conn, [record[:5] for record in chunk], completed_sources=[record[5] for record in chunk])
+        # Resumed moves are journaled again when they run
+        clear_journal_entries(conn, dropped + [str(candidate.path) for candidate in pending])
+
+        logger.info(f"Journal recovery: recorded {len(replayed)} completed moves, dropped {len(dropped)} stale entries, "
+                    f"{len(pending)} moves left to resume.")
+        return pending
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Could not recover the cleanup journal: {e}")
+        return []
     finally:
-        if conn:
-            conn.close()
+        conn.close()
+
+def acquire_run_lock(lock_path: Path):
+    """
+    Takes an exclusive, non-blocking lock on lock_path, so only one cleanup
+    run at a time recovers the journal and moves files. Another run's .part
+    copies and journal entries would otherwise look like a killed run's.
 
-def move_files_and_update_records(files_to_move: list[Path], db_path: Path, archive_drive: str = "G:", dry_run: bool = True):
+    The lock belongs to the open file, so the OS drops it when the process
+    exits, even if it was killed.
+
+    Returns:
+        The open lock file, to be kept for as long as the lock is needed, or
+        None if another run already holds the lock.
+    """
+    lock_file = open(lock_path, 'a+b')
+    try:
+        if os.name == 'nt':
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+def move_files_and_update_records(files_to_move: list[FileCandidate], db_path: Path, archive_drive: str = "G:", dry_run: bool = True,
+                                  rate_profile: dict | None = None, conn: sqlite3.Connection | None = None) -> dict:
     """
     Moves files from the filesystem to an archive drive and updates their records in the database.
-    Uses a transaction to ensure atomicity.
+    Each archived frame's real destination is written to image_stats in
+    batched transactions as the moves complete.
+
+    Moves run on a small worker pool, paced by an adaptive files/s and
+    bytes/s limiter instead of a fixed per-file sleep.
+
+    Every move is written to the cleanup journal before it starts and
+    cleared when its archive path is recorded, so a killed run can be
+    recovered by recover_cleanup_journal.
+
+    A file is never deleted unless its archived copy was verified: if the
+    move fails for any reason, the file keeps its source and its database
+    rows and is tried again next cycle.
 
     Args:
-        files_to_move: A list of Path objects to move.
+        files_to_move: A list of FileCandidate entries to move.
         db_path: The path to the SQLite database.
         archive_drive: The drive letter to move files to (default: "G:").
         dry_run: If True, only log what would be moved without performing actions.
+        rate_profile: Worker count and rate limits to use (default: DEFAULT_RATE_PROFILE).
+        conn: An open connection to reuse (left open); by default one is opened and closed for this call.
+
+    Returns:
+        Dictionary with the number of files and bytes moved, and the paths
+        of the files that are still in place ('kept') for a retry.
     """
     if not files_to_move:
         logger.info("No files to move.")
-        return
+        return {'moved': 0, 'bytes_moved': 0, 'kept': []}
 
     # Ensure archive drive exists
     archive_path = Path(archive_drive)
     if not dry_run and not archive_path.exists():
         logger.error(f"Archive drive {archive_drive} not found. Cannot move files.")
-        return
+        return {'moved': 0, 'bytes_moved': 0, 'kept': [candidate.path for candidate in files_to_move]}
 
     if dry_run:
         logger.info(f"[DRY RUN] The following files would be moved to {archive_drive} and their DB records updated:")
-        logger.info(f"[DRY RUN] NOTE: Files that fail to move would be DELETED to prevent main drive from filling up.")
+        logger.info(f"[DRY RUN] NOTE: Files that can't be copied or verified would be kept for the next cycle.")
 
-        total_size_bytes = 0
-        for f in files_to_move:
-            try:
-                total_size_bytes += f.stat().st_size
-            except FileNotFoundError:
-                logger.warning(f"Could not stat file for size calculation (it may have been deleted already): {f}")
-                continue
+        total_size_bytes = sum(candidate.size for candidate in files_to_move)
 
         logger.info(f"[DRY RUN] Total: {len(files_to_move)} files, {format_bytes(total_size_bytes)} to be moved. To execute, set DRY_RUN = False.")
-        return
+        return {'moved': 0, 'bytes_moved': 0, 'kept': [candidate.path for candidate in files_to_move]}
 
     logger.warning("---[ LIVE RUN ]---")
     logger.warning(f"Preparing to move {len(files_to_move)} files to {archive_drive} and update their database records.")
@@ -203,125 +863,279 @@ def move_files_and_update_records(files_to_move: list[Path], db_path: Path, arch
     # Create archive directory structure
     archive_base = archive_path / "archived_camera_images"
     
-    # --- Step 1: Move files from filesystem with a delay to reduce I/O load ---
-    logger.info(f"Moving files to {archive_base}...")
+    # --- Step 1: Move files from filesystem, rate-limited to leave I/O for other processes ---
+    profile = rate_profile or DEFAULT_RATE_PROFILE
+    limiter = AdaptiveRateLimiter(
+        files_per_sec=profile['files_per_sec'],
+        bytes_per_sec=profile['mb_per_sec'] * 1024**2,
+        target_latency=profile['target_latency_ms'] / 1000
+    )
+    logger.info(f"Moving files to {archive_base} using the '{profile['name']}' profile "
+                f"({profile['workers']} workers, {profile['files_per_sec']} files/s, {profile['mb_per_sec']} MB/s)...")
     moved_count = 0
     space_moved_bytes = 0
-    successful_moves = []
-    failed_moves = []
-    
-    for file_path in files_to_move:
+    kept_moves = []
+    missing_files = []
+    transfer_stats = {}
+    move_start = time.monotonic()
+
+    # Archive locations are committed in batches while the moves are still running
+    own_conn = conn is None
+    pending_records = []
+    records_written = 0
+    if not own_conn or db_path.is_file():
         try:
-            file_size = file_path.stat().st_size
-            
+            # Busy timeout and lock retries come from db_access
+            if own_conn:
+                conn = db_access.connect(db_path)
+            ensure_archive_schema(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Could not open database to record archive paths: {e}. Files will be moved without DB updates.")
+            conn = None
+    else:
+        logger.error(f"Database not found at '{db_path}'. Files will be moved without DB updates.")
+
+    journaled = False
+    if conn is not None:
+        try:
+            journal_planned_moves(conn, files_to_move, archive_base)
+            journaled = True
+        except sqlite3.Error as e:
+            logger.error(f"Could not write the cleanup journal: {e}. Moves will not be recoverable if interrupted.")
+
+    def flush_records():
+        nonlocal records_written
+        if conn is None or not pending_records:
+            pending_records.clear()
+            return
+        try:
+            sources = [source for _, _, _, _, _, source in pending_records] if journaled else None
+            records_written += record_archived_frames(conn, [record[:5] for record in pending_records], completed_sources=sources)
+        except sqlite3.Error as e:
+            logger.error(f"A database error occurred during record update: {e}. "
+                         f"{len(pending_records)} files were moved but their archive paths were not recorded "
+                         f"(they stay in the journal for the next start).")
+        pending_records.clear()
+
+    def move_one(candidate: FileCandidate) -> tuple[FileCandidate, str, Exception | None, str | None, float, Path | None]:
+        file_path = candidate.path
+        try:
+            limiter.acquire(candidate.size)
+            started = time.monotonic()
+
             # Preserve the original directory structure
-            relative_path = file_path.relative_to(file_path.parent.parent)  # Remove the base captured_images part
-            destination = archive_base / relative_path
+            destination = archive_destination(archive_base, file_path)
             
             # Create destination directory if it doesn't exist
             destination.parent.mkdir(parents=True, exist_ok=True)
             
-            # Move the file
-            shutil.move(str(file_path), str(destination))
-            logger.info(f"Moved file: {file_path} -> {destination}")
-            moved_count += 1
-            space_moved_bytes += file_size
-            successful_moves.append(file_path.name)
-
-            # Add the requested delay to free up I/O for other processes
-            time.sleep(0.1)  # 100ms delay
-
-        except FileNotFoundError:
-            logger.warning(f"File not found (may have been deleted by another process): {file_path}")
-            continue
+            # Move the file (rename, or verified copy + delete across devices)
+            mode = transfer_file(file_path, destination)
+            elapsed = time.monotonic() - started
+            limiter.record(elapsed)
+            logger.info(f"Moved file ({mode}): {file_path} -> {destination}")
+            return candidate, 'moved', None, mode, elapsed, destination
+        except FileNotFoundError as e:
+            return candidate, 'missing', e, None, 0.0, None
         except Exception as e:
-            logger.error(f"Error moving file {file_path}: {e}. Will delete to prevent main drive from filling up.")
-            failed_moves.append(file_path)
-            continue  # Continue to the next file
-    
-    # --- Step 1.5: Delete files that failed to move to prevent filling up main drive ---
-    deleted_count = 0
-    space_freed_bytes = 0
-    failed_deletes = []
-    
-    if failed_moves:
-        logger.warning(f"Deleting {len(failed_moves)} files that failed to move to prevent main drive from filling up...")
-        
-        for file_path in failed_moves:
-            try:
-                file_size = file_path.stat().st_size
-                file_path.unlink()
-                logger.info(f"Deleted file that failed to move: {file_path}")
-                deleted_count += 1
-                space_freed_bytes += file_size
-                
-                # Small delay to reduce I/O impact
-                time.sleep(0.05)
-                
-            except FileNotFoundError:
-                logger.warning(f"File already gone: {file_path}")
-                continue
-            except Exception as e:
-                logger.error(f"Critical: Could not delete file {file_path}: {e}. Manual intervention may be required.")
-                failed_deletes.append(file_path)
-                continue
-        
-        if failed_deletes:
-            logger.error(f"CRITICAL: {len(failed_deletes)} files could not be moved OR deleted. Manual cleanup required to prevent main drive from filling up:")
-            for file_path in failed_deletes:
-                logger.error(f"  - {file_path}")
-        
-        if deleted_count > 0:
-            logger.info(f"Deleted {deleted_count} files that couldn't be moved, freed {format_bytes(space_freed_bytes)}")
-    
-    # Also delete database records for files that were deleted instead of moved
-    if deleted_count > 0:
-        deleted_filenames = [f.name for f in failed_moves if f not in failed_deletes]
-        if deleted_filenames:
-            conn = None
-            try:
-                conn = sqlite3.connect(db_path, timeout=10)
-                with conn:
-                    cursor = conn.cursor()
-                    params = [(name,) for name in deleted_filenames]
-                    cursor.executemany("DELETE FROM image_stats WHERE filename = ?", params)
-                    stats_deleted_count = cursor.rowcount
-                    cursor.executemany("DELETE FROM saved_crops WHERE original_filename = ?", params)
-                    crops_deleted_count = cursor.rowcount
-                    logger.info(f"DB cleanup: Deleted {stats_deleted_count} image_stats and {crops_deleted_count} saved_crops records for deleted files.")
-            except sqlite3.Error as e:
-                logger.error(f"Database error during cleanup of deleted file records: {e}")
-            finally:
-                if conn:
-                    conn.close()
+            # transfer_file only unlinks the source once the copy is verified and in place,
+            # so whatever went wrong (copy, fsync, verify, rename or anything else) it's intact
+            return candidate, 'kept', e, None, 0.0, None
+
+    with ThreadPoolExecutor(max_workers=profile['workers']) as executor:
+        for candidate, status, error, mode, elapsed, destination in run_bounded(executor, move_one, files_to_move, profile['workers'] * 4):
+            file_path = candidate.path
+            if status == 'moved':
+                moved_count += 1
+                space_moved_bytes += candidate.size
+                pending_records.append((candidate.camera, file_path.name, os.path.abspath(destination), candidate.size, candidate.mtime,
+                                        os.path.abspath(file_path)))
+                if len(pending_records) >= ARCHIVE_DB_BATCH_SIZE:
+                    flush_records()
+                mode_stats = transfer_stats.setdefault(mode, {'files': 0, 'bytes': 0, 'seconds': 0.0})
+                mode_stats['files'] += 1
+                mode_stats['bytes'] += candidate.size
+                mode_stats['seconds'] += elapsed
+            elif status == 'missing':
+                logger.warning(f"File not found (may have been deleted by another process): {file_path}")
+                missing_files.append(file_path)
+            else:
+                # The source is intact, so keep it and try again next cycle rather than deleting it
+                logger.error(f"Could not archive {file_path}: {error}. Keeping the original to retry next cycle.")
+                kept_moves.append(file_path)
 
-    # --- Step 2: Update database records for successfully moved files ---
-    if successful_moves:
-        # For executemany, we need a list of tuples
-        params = [(f"{archive_drive}/archived_camera_images/...", name) for name in successful_moves]
+    flush_records()
+    if records_written:
+        logger.info(f"DB transaction successful: Recorded archive paths for {records_written} frames.")
 
-        conn = None
+    move_seconds = time.monotonic() - move_start
+    if moved_count and move_seconds > 0:
+        logger.info(f"Moved {moved_count} files in {move_seconds:.1f}s "
+                    f"({moved_count / move_seconds:.1f} files/s, {format_bytes(int(space_moved_bytes / move_seconds))}/s)")
+    for mode, mode_stats in sorted(transfer_stats.items()):
+        per_file_seconds = mode_stats['seconds'] or 1e-9
+        logger.info(f"  - {mode}: {mode_stats['files']} files, {format_bytes(mode_stats['bytes'])}, "
+                    f"{format_bytes(int(mode_stats['bytes'] / per_file_seconds))}/s per transfer")
+    
+    if journaled:
+        # These were never moved (missing or kept), so there is nothing to recover
+        abandoned = [os.path.abspath(path) for path in missing_files + kept_moves]
         try:
-            # Use a timeout to prevent indefinite waiting if the DB is locked
-            conn = sqlite3.connect(db_path, timeout=10)
-            with conn:
-                cursor = conn.cursor()
-                # Update the file path in image_stats to indicate it's archived
-                cursor.executemany("UPDATE image_stats SET archived_path = ? WHERE filename = ?", params)
-                stats_updated_count = cursor.rowcount
-                logger.info(f"DB transaction successful: Updated {stats_updated_count} image_stats records with archive paths.")
+            clear_journal_entries(conn, abandoned)
         except sqlite3.Error as e:
-            logger.error(f"A database error occurred during record update: {e}. Files were moved but database not updated.")
-        finally:
-            if conn:
-                conn.close()
+            logger.error(f"Could not clear the cleanup journal: {e}")
+
+    if conn is not None and own_conn:
+        conn.close()
 
     logger.info(f"---[ LIVE RUN COMPLETE ]---")
     logger.info(f"Successfully moved {moved_count} of {len(files_to_move)} targeted files to {archive_drive}, totaling {format_bytes(space_moved_bytes)}.")
-    if deleted_count > 0:
-        logger.info(f"Deleted {deleted_count} files that couldn't be moved, freed {format_bytes(space_freed_bytes)}.")
-    if len(failed_deletes) > 0:
-        logger.error(f"WARNING: {len(failed_deletes)} files could not be moved or deleted and may fill up the main drive!")
+    if kept_moves:
+        logger.warning(f"{len(kept_moves)} files could not be archived and were kept for the next cycle.")
+
+    return {'moved': moved_count, 'bytes_moved': space_moved_bytes, 'kept': kept_moves}
+
+PLAN_FORMAT_VERSION = 1
+
+def write_cleanup_plan(plan_path: Path, matches: list[RuleMatch], archive_drive: str, rules: list[dict]) -> dict:
+    """
+    Serializes a cleanup plan as JSON Lines: a header line, then one line per
+    file sorted by source path, so two plans can be compared with plain diff.
+    The file is written to a temporary name and renamed into place.
+
+    Returns:
+        The plan header.
+    """
+    archive_base = Path(archive_drive) / "archived_camera_images"
+    per_rule = {}
+    for match in matches:
+        rule_stats = per_rule.setdefault(match.rule, {'files': 0, 'bytes': 0})
+        rule_stats['files'] += 1
+        rule_stats['bytes'] += match.candidate.size
+    header = {
+        'version': PLAN_FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'archive_drive': archive_drive,
+        'rules': rules,
+        'total_files': len(matches),
+        'total_bytes': sum(match.candidate.size for match in matches),
+        'per_rule': per_rule
+    }
+
+    temp_path = plan_path.with_name(f".{plan_path.name}.tmp")
+    with open(temp_path, 'w') as f:
+        f.write(json.dumps(header) + '\n')
+        for match in sorted(matches, key=lambda m: str(m.candidate.path)):
+            candidate = match.candidate
+            f.write(json.dumps({
+                'source': os.path.abspath(candidate.path),
+                'camera': candidate.camera,
+                'size': candidate.size,
+                'mtime': candidate.mtime,
+                'capture_time': candidate.capture_time,
+                'destination': os.path.abspath(archive_destination(archive_base, candidate.path)),
+                'rule': match.rule
+            }) + '\n')
+    os.replace(temp_path, plan_path)
+    return header
+
+def load_cleanup_plan(plan_path: Path) -> tuple[dict, list[dict]]:
+    """Reads a plan written by write_cleanup_plan, returning its header and file entries."""
+    with open(plan_path, 'r') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != PLAN_FORMAT_VERSION:
+            raise ValueError(f"Unsupported plan version {header.get('version')} in {plan_path}")
+        entries = [json.loads(line) for line in f if line.strip()]
+    return header, entries
+
+def diff_cleanup_plans(old_path: Path, new_path: Path) -> dict:
+    """
+    Compares two plans by source file.
+
+    Returns:
+        Dictionary with the 'added', 'removed' and 'changed' (size, rule or
+        destination differs) entries, and the change in planned bytes.
+    """
+    _, old_entries = load_cleanup_plan(old_path)
+    _, new_entries = load_cleanup_plan(new_path)
+    old_by_source = {entry['source']: entry for entry in old_entries}
+    new_by_source = {entry['source']: entry for entry in new_entries}
+
+    added = [entry for source, entry in new_by_source.items() if source not in old_by_source]
+    removed = [entry for source, entry in old_by_source.items() if source not in new_by_source]
+    changed = [(old_by_source[source], entry) for source, entry in new_by_source.items()
+               if source in old_by_source and any(old_by_source[source][key] != entry[key] for key in ('size', 'rule', 'destination'))]
+    return {
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'bytes_delta': sum(entry['size'] for entry in new_entries) - sum(entry['size'] for entry in old_entries)
+    }
+
+def execute_cleanup_plan(plan_path: Path, db_path: Path, dry_run: bool = True, rate_profile: dict | None = None,
+                         chunk_size: int = 1000) -> dict:
+    """
+    Executes a saved plan without rescanning the capture directory.
+
+    Entries whose source is gone or has changed size since planning are
+    skipped, and the rest are re-checked against the plan's rules in one
+    database pass (a frame may have been cropped since). The moves then run
+    in chunks on the usual parallel mover, with progress and throughput
+    reported against the plan's total size.
+
+    Args:
+        plan_path: The plan file to execute.
+        db_path: The path to the SQLite database.
+        dry_run: If True, only report what would be moved.
+        rate_profile: Worker count and rate limits to use.
+        chunk_size: Number of files handed to the mover at a time.
+
+    Returns:
+        Dictionary with execution statistics.
+    """
+    header, entries = load_cleanup_plan(plan_path)
+    logger.info(f"Loaded plan from {header['created_at']}: {header['total_files']} files, {format_bytes(header['total_bytes'])} "
+                f"to {header['archive_drive']}")
+
+    candidates = []
+    stale = 0
+    for entry in entries:
+        try:
+            size = os.stat(entry['source']).st_size
+        except OSError:
+            stale += 1
+            continue
+        if size != entry['size']:
+            stale += 1
+            continue
+        candidates.append(FileCandidate(Path(entry['source']), entry['camera'], entry['size'], entry['mtime'], entry['capture_time']))
+
+    matches, _ = evaluate_cleanup_rules(candidates, db_path, header['rules'])
+    to_move = [match.candidate for match in matches]
+    logger.info(f"{len(to_move)} planned files still apply ({stale} gone or changed since planning, "
+                f"{len(candidates) - len(to_move)} no longer match a rule).")
+
+    stats = {'planned_files': header['total_files'], 'planned_bytes': header['total_bytes'], 'stale': stale,
+             'moved': 0, 'bytes_moved': 0, 'seconds': 0.0}
+    started = time.monotonic()
+    for start in range(0, len(to_move), chunk_size):
+        chunk = to_move[start:start + chunk_size]
+        result = move_files_and_update_records(chunk, db_path, header['archive_drive'], dry_run=dry_run, rate_profile=rate_profile)
+        stats['moved'] += result['moved']
+        stats['bytes_moved'] += result['bytes_moved']
+        elapsed = time.monotonic() - started
+        done_fraction = stats['bytes_moved'] / header['total_bytes'] if header['total_bytes'] else 1.0
+        logger.info(f"Plan progress: {min(start + chunk_size, len(to_move))}/{len(to_move)} files, "
+                    f"{format_bytes(stats['bytes_moved'])} of {format_bytes(header['total_bytes'])} planned ({done_fraction:.0%}) in {elapsed:.1f}s")
+
+    stats['seconds'] = time.monotonic() - started
+    if stats['moved'] and stats['seconds'] > 0:
+        rate = stats['bytes_moved'] / stats['seconds']
+        remaining = max(header['total_bytes'] - stats['bytes_moved'], 0)
+        logger.info(f"Executed plan at {format_bytes(int(rate))}/s ({stats['moved'] / stats['seconds']:.1f} files/s); "
+                    f"moved {stats['moved']} of {header['total_files']} planned files"
+                    + (f", {format_bytes(remaining)} of the plan was not moved" if remaining else ""))
+    return stats
 
 def get_disk_usage(drive_path: str | Path) -> dict:
     """
@@ -362,44 +1176,506 @@ def format_bytes(size_bytes: int) -> str:
         return f"{size_bytes / 1024**2:.2f} MB"
     return f"{size_bytes / 1024**3:.2f} GB"
 
-def find_oldest_archived_files(archive_path: str | Path, limit: int = 100) -> list[Path]:
+def scan_archive_files(archive_dir: Path) -> Iterator[ArchivedFile]:
+    """Streams every file under the archive directory with os.scandir, one stat per entry."""
+    pending_dirs = [(str(archive_dir), None)]
+    while pending_dirs:
+        dir_path, camera = pending_dirs.pop()
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            # The first level below the archive root is the camera folder
+                            pending_dirs.append((entry.path, camera or entry.name))
+                        elif entry.is_file(follow_symlinks=False):
+                            if entry.name.endswith(CONTAINER_INDEX_SUFFIX):
+                                continue  # Sidecar indexes go with their container
+                            stat = entry.stat(follow_symlinks=False)
+                            yield ArchivedFile(Path(entry.path), camera or '', stat.st_size, stat.st_mtime)
+                    except OSError:
+                        continue  # Skip files that can't be accessed
+        except OSError as e:
+            logger.warning(f"Could not scan archive directory '{dir_path}': {e}")
+
+def rebuild_archive_index(conn: sqlite3.Connection, archive_dir: Path) -> int:
+    """
+    Replaces the archive_files index with a fresh streaming scan of the archive directory.
+
+    Returns:
+        The number of files indexed.
+    """
+    logger.info(f"Rebuilding archive index from {archive_dir}...")
+    total = 0
+    with conn:
+        conn.execute("DELETE FROM archive_files")
+        files = scan_archive_files(archive_dir)
+        while True:
+            batch = [(os.path.abspath(f.path), f.camera, f.path.name, f.size, f.mtime)
+                     for f in itertools.islice(files, CANDIDATE_BATCH_SIZE)]
+            if not batch:
+                break
+            conn.executemany("INSERT OR REPLACE INTO archive_files (path, camera_name, filename, size, mtime) VALUES (?, ?, ?, ?, ?)", batch)
+            total += len(batch)
+        conn.execute("INSERT OR REPLACE INTO archive_index_state (archive_root, rebuilt_at) VALUES (?, ?)",
+                     (os.path.abspath(archive_dir), time.time()))
+    logger.info(f"Archive index rebuilt with {total} files.")
+    return total
+
+def archive_index_ready(conn: sqlite3.Connection, archive_dir: Path) -> bool:
+    """Whether the archive_files index has been fully built for this archive directory."""
+    row = conn.execute("SELECT 1 FROM archive_index_state WHERE archive_root = ?", (os.path.abspath(archive_dir),)).fetchone()
+    return row is not None
+
+def iter_archive_index(conn: sqlite3.Connection) -> Iterator[ArchivedFile]:
+    """Streams the indexed archive files oldest first, using the mtime index."""
+    cursor = conn.execute("SELECT path, camera_name, size, mtime FROM archive_files ORDER BY mtime")
+    for path, camera, size, mtime in cursor:
+        yield ArchivedFile(Path(path), camera, size, mtime)
+
+def forget_archived_files(conn: sqlite3.Connection, paths: list[str]):
+    """Drops deleted archive files from the index and clears image_stats rows that pointed at them."""
+    params = [(path,) for path in paths]
+    containers = [path for path in paths if path.endswith(CONTAINER_SUFFIX)]
+
+    def write():
+        with conn:
+            conn.executemany("DELETE FROM archive_files WHERE path = ?", params)
+            conn.executemany("UPDATE image_stats SET archived_path = NULL WHERE archived_path = ?", params)
+            if containers:
+                # Frames inside a container are recorded as '<container>#<name>'; '$' sorts right after '#'
+                conn.executemany("UPDATE image_stats SET archived_path = NULL WHERE archived_path >= ? AND archived_path < ?",
+                                 [(path + '#', path + '$') for path in containers])
+                conn.executemany("DELETE FROM archive_containers WHERE path = ?", [(path,) for path in containers])
+
+    db_access.retry_on_busy(write, description="Removing archive index entries")
+
+def remove_archive_file(path: Path):
+    """Deletes an archived file, along with the sidecar index if it is a container."""
+    path.unlink()
+    if path.name.endswith(CONTAINER_SUFFIX):
+        container_index_path(path).unlink(missing_ok=True)
+
+def find_oldest_archived_files(archive_path: str | Path, limit: int = 100, db_path: Path | None = None) -> list[ArchivedFile]:
     """
     Find the oldest files in the archive directory.
+
+    With a database, this is an indexed query on archive_files (built from
+    the directory first if it has never been built for this archive). Without one, it falls back
+    to a streaming scan that keeps only the oldest `limit` files in memory.
     
     Args:
         archive_path: Path to the archive directory
         limit: Maximum number of files to return
+        db_path: Optional path to the database holding the archive index
     
     Returns:
-        List of Path objects sorted by modification time (oldest first)
+        List of ArchivedFile entries sorted by modification time (oldest first)
     """
     archive_dir = Path(archive_path)
     if not archive_dir.exists():
         logger.warning(f"Archive directory {archive_path} does not exist")
         return []
-    
-    all_files = []
-    for file_path in archive_dir.rglob('*'):
-        if file_path.is_file():
-            try:
-                mod_time = file_path.stat().st_mtime
-                all_files.append((mod_time, file_path))
-            except (FileNotFoundError, OSError):
-                continue  # Skip files that can't be accessed
-    
-    # Sort by modification time (oldest first) and return up to limit
-    all_files.sort(key=lambda x: x[0])
-    return [file_path for _, file_path in all_files[:limit]]
 
-def cleanup_archive_space(archive_drive: str = "G:", target_free_gb: float = 5.0, max_cleanup_gb: float = 10.0, dry_run: bool = True) -> dict:
+    if db_path is not None and db_path.is_file():
+        conn = db_access.connect(db_path)
+        try:
+            ensure_archive_schema(conn)
+            if not archive_index_ready(conn, archive_dir):
+                rebuild_archive_index(conn, archive_dir)
+            return list(itertools.islice(iter_archive_index(conn), limit))
+        except sqlite3.Error as e:
+            logger.error(f"Archive index query failed, scanning the archive instead: {e}")
+        finally:
+            conn.close()
+
+    return heapq.nsmallest(limit, scan_archive_files(archive_dir), key=lambda f: f.mtime)
+
+def retention_interval(tiers: list[dict], day_end: float, now: float) -> int:
+    """
+    Returns the spacing (in minutes) a day's frames should be thinned to.
+
+    A tier applies once the whole day is older than its 'after_days'; the
+    coarsest applicable tier wins. 0 means the day is still kept in full.
+    """
+    interval = 0
+    for tier in tiers:
+        if day_end <= now - tier['after_days'] * 86400:
+            interval = max(interval, int(tier['keep_every_minutes']))
+    return interval
+
+def protected_frames(conn: sqlite3.Connection, camera: str, first_name: str, last_name: str) -> set[str]:
+    """
+    Returns the filenames in [first_name, last_name] for a camera that have
+    saved crops or have been viewed. Both lookups are range scans on the
+    existing (camera, filename) indexes.
+    """
+    protected = set()
+    cursor = conn.execute("""
+        SELECT original_filename FROM saved_crops
+        WHERE original_camera = ? AND original_filename BETWEEN ? AND ?
+    """, (camera, first_name, last_name))
+    protected.update(row[0] for row in cursor)
+    cursor = conn.execute("""
+        SELECT filename FROM image_stats
+        WHERE camera_name = ? AND filename BETWEEN ? AND ? AND total_views > 0
+    """, (camera, first_name, last_name))
+    protected.update(row[0] for row in cursor)
+    return protected
+
+def select_thinned_frames(frames: list[tuple[str, str, int, float]], interval_minutes: int,
+                          protected: set[str]) -> list[tuple[str, str, int, float]]:
+    """
+    Picks which of a camera-day's frames to delete so that one frame is kept
+    per interval. The earliest frame in each interval is kept, unless the
+    interval holds protected frames, in which case those are kept instead.
+
+    Args:
+        frames: (path, filename, size, mtime) tuples for one camera and day.
+        interval_minutes: Spacing to keep frames at.
+        protected: Filenames that must never be deleted.
+
+    Returns:
+        The frames to delete.
+    """
+    bucket_seconds = interval_minutes * 60
+    buckets = {}
+    for frame in frames:
+        buckets.setdefault(int(frame[3] // bucket_seconds), []).append(frame)
+
+    to_delete = []
+    for bucket in buckets.values():
+        bucket.sort(key=lambda frame: frame[3])
+        if any(frame[1] in protected for frame in bucket):
+            to_delete.extend(frame for frame in bucket if frame[1] not in protected)
+        else:
+            to_delete.extend(bucket[1:])
+    return to_delete
+
+def thin_archive(db_path: Path, archive_drive: str, tiers: list[dict], dry_run: bool = True,
+                 max_days: int = 500, files_per_sec: float = 200) -> dict:
+    """
+    Applies the time-decay retention tiers to the archive, one camera-day at a time.
+
+    Each camera's days are walked oldest first through the archive_files
+    index. A day is only thinned when it has aged into a coarser tier than
+    it was last thinned to (tracked in archive_thinning), so each run only
+    touches days that changed tier. Frames with saved crops or views are
+    always kept.
+
+    Args:
+        db_path: Path to the database holding the archive index.
+        archive_drive: The archive drive letter (e.g., "G:").
+        tiers: Retention tiers, e.g. [{"after_days": 7, "keep_every_minutes": 5}].
+        dry_run: If True, only report what would be deleted.
+        max_days: Maximum number of camera-days to thin in one run.
+        files_per_sec: Deletion pace, to limit I/O impact on the archive drive.
+
+    Returns:
+        Dictionary with thinning statistics.
+    """
+    stats = {'days_thinned': 0, 'deleted_count': 0, 'space_freed': 0, 'protected_kept': 0}
+    archive_base = Path(archive_drive) / "archived_camera_images"
+    if not tiers or not archive_base.exists() or not db_path.is_file():
+        return stats
+
+    now = time.time()
+    # Only days that have fully aged past the youngest tier can need thinning
+    cutoff = now - min(tier['after_days'] for tier in tiers) * 86400
+    pacer = TokenBucket(files_per_sec)
+
+    conn = db_access.connect(db_path)
+    try:
+        ensure_archive_schema(conn)
+        if not archive_index_ready(conn, archive_base):
+            rebuild_archive_index(conn, archive_base)
+
+        cameras = [row[0] for row in conn.execute("SELECT DISTINCT camera_name FROM archive_files")]
+        for camera in cameras:
+            thinned = dict(conn.execute(
+                "SELECT day, interval_minutes FROM archive_thinning WHERE camera_name = ?", (camera,)))
+            packed = {row[0] for row in conn.execute("SELECT day FROM archive_containers WHERE camera_name = ?", (camera,))}
+            row = conn.execute("SELECT MIN(mtime) FROM archive_files WHERE camera_name = ?", (camera,)).fetchone()
+            next_mtime = row[0] if row else None
+
+            while next_mtime is not None and next_mtime < cutoff and stats['days_thinned'] < max_days:
+                day = datetime.fromtimestamp(next_mtime).date()
+                day_start = datetime.combine(day, datetime.min.time()).timestamp()
+                day_end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+                interval = retention_interval(tiers, day_end, now)
+
+                if interval and thinned.get(day.isoformat(), 0) < interval and day.isoformat() not in packed:
+                    frames = conn.execute("""
+                        SELECT path, filename, size, mtime FROM archive_files
+                        WHERE camera_name = ? AND mtime >= ? AND mtime < ?
+                    """, (camera, day_start, day_end)).fetchall()
+                    names = [frame[1] for frame in frames]
+                    protected = protected_frames(conn, camera, min(names), max(names))
+                    to_delete = select_thinned_frames(frames, interval, protected)
+                    stats['protected_kept'] += sum(1 for name in names if name in protected)
+
+                    if dry_run:
+                        stats['deleted_count'] += len(to_delete)
+                        stats['space_freed'] += sum(frame[2] for frame in to_delete)
+                    else:
+                        removed_paths = []
+                        for path, _, size, _ in to_delete:
+                            pacer.acquire(1)
+                            try:
+                                os.unlink(path)
+                                stats['deleted_count'] += 1
+                                stats['space_freed'] += size
+                                removed_paths.append(path)
+                            except FileNotFoundError:
+                                removed_paths.append(path)  # Already gone, so the index entry is stale
+                            except OSError as e:
+                                logger.warning(f"Could not delete archived file {path}: {e}")
+                        forget_archived_files(conn, removed_paths)
+                        with conn:
+                            conn.execute("""
+                                INSERT OR REPLACE INTO archive_thinning (camera_name, day, interval_minutes, thinned_at)
+                                VALUES (?, ?, ?, ?)
+                            """, (camera, day.isoformat(), interval, time.time()))
+
+                    stats['days_thinned'] += 1
+                    logger.info(f"Thinned {camera} {day.isoformat()} to 1 frame per {interval} min: "
+                                f"{len(to_delete)} of {len(frames)} frames removed")
+
+                row = conn.execute("SELECT MIN(mtime) FROM archive_files WHERE camera_name = ? AND mtime >= ?",
+                                   (camera, day_end)).fetchone()
+                next_mtime = row[0] if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Database error while thinning the archive: {e}")
+    finally:
+        conn.close()
+
+    return stats
+
+def container_index_path(container: Path) -> Path:
+    """Returns the sidecar offset index path for a container."""
+    return container.with_name(container.name + CONTAINER_INDEX_SUFFIX)
+
+def write_day_container(container: Path, frames: list[tuple[str, str, int, float]]) -> dict:
+    """
+    Packs frames into an uncompressed zip and writes its sidecar offset index.
+
+    The zip is written under a temporary name, each entry is read back and
+    checked against the CRC computed from its source file, and it is fsynced
+    before being renamed into place, so a crash never leaves a partial
+    container under the real name.
+
+    Args:
+        container: Where the container should end up.
+        frames: (path, filename, size, mtime) tuples to pack.
+
+    Returns:
+        The offset index: {filename: [data_offset, size, mtime]}.
+    """
+    temp_path = container.with_name(f".{container.name}.part")
+    mtimes = {}
+    try:
+        with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for path, name, _, mtime in frames:
+                # Zip timestamps can't predate 1980; the real mtime is kept in the index
+                info = zipfile.ZipInfo(name, date_time=max(time.localtime(mtime)[:6], (1980, 1, 1, 0, 0, 0)))
+                with open(path, 'rb') as src, zf.open(info, 'w') as dst:
+                    shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+                mtimes[name] = mtime
+
+        index = {}
+        with open(temp_path, 'rb') as f, zipfile.ZipFile(f) as zf:
+            for info in zf.infolist():
+                f.seek(info.header_offset)
+                header = f.read(ZIP_LOCAL_HEADER_SIZE)
+                name_length, extra_length = struct.unpack('<HH', header[26:30])
+                offset = info.header_offset + ZIP_LOCAL_HEADER_SIZE + name_length + extra_length
+                f.seek(offset)
+                if zlib.crc32(f.read(info.file_size)) != info.CRC:
+                    raise TransferVerificationError(f"CRC mismatch for {info.filename} in {temp_path}")
+                index[info.filename] = [offset, info.file_size, mtimes[info.filename]]
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, container)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+    index_path = container_index_path(container)
+    temp_index = index_path.with_name(f".{index_path.name}.part")
+    with open(temp_index, 'w') as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_index, index_path)
+    return index
+
+def read_container_frame(container: Path, name: str) -> bytes:
+    """
+    Reads one frame out of a day container without unpacking the rest.
+
+    Uses the sidecar offset index for a single seek and read, falling back
+    to the zip's own central directory if the sidecar is missing or stale.
+
+    Raises:
+        KeyError: If the container has no frame with that name.
+    """
+    try:
+        with open(container_index_path(container), 'r') as f:
+            entry = json.load(f).get(name)
+    except (OSError, ValueError):
+        entry = None
+
+    if entry is not None:
+        offset, size = entry[0], entry[1]
+        with open(container, 'rb') as f:
+            f.seek(offset)
+            data = f.read(size)
+        if len(data) == size:
+            return data
+
+    with zipfile.ZipFile(container) as zf:
+        return zf.read(name)
+
+def read_archived_frame(archived_path: str | Path) -> bytes:
+    """Reads a frame given its image_stats.archived_path, which is either a loose file or '<container>#<name>'."""
+    container, separator, name = str(archived_path).rpartition('#')
+    if separator and container.endswith(CONTAINER_SUFFIX):
+        return read_container_frame(Path(container), name)
+    with open(archived_path, 'rb') as f:
+        return f.read()
+
+def pack_archive_days(db_path: Path, archive_drive: str, pack_after_days: float, tiers: list[dict] | None = None,
+                      dry_run: bool = True, max_days: int = 50) -> dict:
+    """
+    Packs each old camera-day of archived frames into a single container.
+
+    A day is packed once it is older than pack_after_days and, when retention
+    tiers are in use, has been thinned to the coarsest tier's interval, so
+    nothing inside it will need deleting later. With pack_after_days below
+    the last tier's after_days, days wait unpacked until they reach it. The container replaces the day's
+    frames in the archive_files index, each frame's image_stats.archived_path
+    becomes '<container>#<name>', and the loose files are removed afterwards.
+    Evicting a packed day is then a single unlink.
+
+    Args:
+        db_path: Path to the database holding the archive index.
+        archive_drive: The archive drive letter (e.g., "G:").
+        pack_after_days: Minimum age in days before a day is packed.
+        tiers: The retention tiers passed to thin_archive, if any.
+        dry_run: If True, only report what would be packed.
+        max_days: Maximum number of camera-days to pack in one run.
+
+    Returns:
+        Dictionary with packing statistics.
+    """
+    stats = {'days_packed': 0, 'frames_packed': 0, 'bytes_packed': 0}
+    archive_base = Path(archive_drive) / "archived_camera_images"
+    if not archive_base.exists() or not db_path.is_file():
+        return stats
+
+    now = time.time()
+    cutoff = now - pack_after_days * 86400
+    # thin_archive skips packed days, so a day is only packed once it reached the coarsest tier
+    final_interval = max(int(tier['keep_every_minutes']) for tier in tiers) if tiers else 0
+
+    conn = db_access.connect(db_path)
+    try:
+        ensure_archive_schema(conn)
+        if not archive_index_ready(conn, archive_base):
+            rebuild_archive_index(conn, archive_base)
+
+        cameras = [row[0] for row in conn.execute("SELECT DISTINCT camera_name FROM archive_files")]
+        for camera in cameras:
+            thinned = dict(conn.execute(
+                "SELECT day, interval_minutes FROM archive_thinning WHERE camera_name = ?", (camera,)))
+            packed = {row[0] for row in conn.execute("SELECT day FROM archive_containers WHERE camera_name = ?", (camera,))}
+            row = conn.execute("SELECT MIN(mtime) FROM archive_files WHERE camera_name = ?", (camera,)).fetchone()
+            next_mtime = row[0] if row else None
+
+            while next_mtime is not None and stats['days_packed'] < max_days:
+                day = datetime.fromtimestamp(next_mtime).date()
+                day_start = datetime.combine(day, datetime.min.time()).timestamp()
+                day_end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+                if day_end > cutoff:
+                    break
+
+                fully_thinned = thinned.get(day.isoformat(), 0) >= final_interval
+                if fully_thinned and day.isoformat() not in packed:
+                    frames = conn.execute("""
+                        SELECT path, filename, size, mtime FROM archive_files
+                        WHERE camera_name = ? AND mtime >= ? AND mtime < ?
+                        ORDER BY filename
+                    """, (camera, day_start, day_end)).fetchall()
+                    frames = [frame for frame in frames if os.path.exists(frame[0])]
+                    day_bytes = sum(frame[2] for frame in frames)
+                    container = archive_base / camera / f"{day.strftime('%Y%m%d')}{CONTAINER_SUFFIX}"
+
+                    if frames and not dry_run:
+                        try:
+                            write_day_container(container, frames)
+                        except (OSError, zipfile.BadZipFile, TransferVerificationError) as e:
+                            logger.error(f"Could not pack {camera} {day.isoformat()}, keeping loose files: {e}")
+                            frames = []
+                        else:
+                            newest = max(frame[3] for frame in frames)
+                            os.utime(container, (newest, newest))  # Evicted along with the rest of its day
+                            container_path = os.path.abspath(container)
+                            with conn:
+                                conn.executemany("DELETE FROM archive_files WHERE path = ?", [(frame[0],) for frame in frames])
+                                conn.execute("""
+                                    INSERT OR REPLACE INTO archive_files (path, camera_name, filename, size, mtime)
+                                    VALUES (?, ?, ?, ?, ?)
+                                """, (container_path, camera, container.name, os.path.getsize(container), newest))
+                                conn.executemany("""
+                                    INSERT INTO image_stats (camera_name, filename, archived_path, updated_at)
+                                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                                    ON CONFLICT(camera_name, filename) DO UPDATE SET
+                                        archived_path = excluded.archived_path,
+                                        updated_at = CURRENT_TIMESTAMP
+                                """, [(camera, frame[1], f"{container_path}#{frame[1]}") for frame in frames])
+                                conn.execute("""
+                                    INSERT OR REPLACE INTO archive_containers (camera_name, day, path, frame_count, packed_at)
+                                    VALUES (?, ?, ?, ?, ?)
+                                """, (camera, day.isoformat(), container_path, len(frames), time.time()))
+
+                            for frame in frames:
+                                try:
+                                    os.unlink(frame[0])
+                                except OSError as e:
+                                    logger.warning(f"Could not remove packed file {frame[0]}: {e}")
+                            logger.info(f"Packed {len(frames)} frames of {camera} {day.isoformat()} into {container}")
+
+                    if frames:
+                        stats['days_packed'] += 1
+                        stats['frames_packed'] += len(frames)
+                        stats['bytes_packed'] += day_bytes
+
+                row = conn.execute("SELECT MIN(mtime) FROM archive_files WHERE camera_name = ? AND mtime >= ?",
+                                   (camera, day_end)).fetchone()
+                next_mtime = row[0] if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Database error while packing the archive: {e}")
+    finally:
+        conn.close()
+
+    return stats
+
+def cleanup_archive_space(archive_drive: str = "G:", target_free_gb: float = 5.0, max_cleanup_gb: float = 10.0, dry_run: bool = True,
+                          db_path: Path | None = None, files_per_sec: float = 200) -> dict:
     """
     Clean up old archived files to free space when the archive drive is getting full.
+
+    Files are taken oldest first from the archive_files index when a
+    database is given, so no scan of the archive drive is needed; deleted
+    files are removed from the index as they go.
     
     Args:
         archive_drive: The archive drive letter (e.g., "G:")
         target_free_gb: Target free space in GB to maintain
         max_cleanup_gb: Maximum amount of data to delete in one cleanup session (GB)
         dry_run: If True, only simulate the cleanup
+        db_path: Optional path to the database holding the archive index
+        files_per_sec: Deletion pace, to limit I/O impact on the archive drive
     
     Returns:
         Dictionary with cleanup statistics
@@ -435,65 +1711,89 @@ def cleanup_archive_space(archive_drive: str = "G:", target_free_gb: float = 5.0
     if not archive_base.exists():
         logger.info(f"No archived files found at {archive_base}")
         return {'deleted_count': 0, 'space_freed': 0, 'message': 'No archived files to clean'}
-    
-    # Find oldest files
-    logger.info("Finding oldest archived files...")
-    oldest_files = find_oldest_archived_files(archive_base, limit=1000)  # Look at up to 1000 oldest files
-    
-    if not oldest_files:
-        logger.warning("No archived files found to clean")
-        return {'deleted_count': 0, 'space_freed': 0, 'message': 'No files found to clean'}
-    
-    # Calculate which files to delete
-    files_to_delete = []
-    cumulative_size = 0
-    
-    for file_path in oldest_files:
+
+    conn = None
+    if db_path is not None and db_path.is_file():
         try:
-            file_size = file_path.stat().st_size
-            if cumulative_size + file_size <= space_to_free:
-                files_to_delete.append(file_path)
-                cumulative_size += file_size
-            else:
+            conn = db_access.connect(db_path)
+            ensure_archive_schema(conn)
+            if not archive_index_ready(conn, archive_base):
+                rebuild_archive_index(conn, archive_base)
+        except sqlite3.Error as e:
+            logger.error(f"Archive index unavailable, scanning the archive instead: {e}")
+            if conn:
+                conn.close()
+            conn = None
+
+    try:
+        # Walk files oldest first until we've found enough to delete. The last one may
+        # overshoot the target (a packed day container can be large) rather than block eviction.
+        logger.info("Finding oldest archived files...")
+        if conn is not None:
+            oldest_files = iter_archive_index(conn)
+        else:
+            oldest_files = iter(find_oldest_archived_files(archive_base, limit=1000))  # Look at up to 1000 oldest files
+
+        files_to_delete = []
+        cumulative_size = 0
+
+        for archived in oldest_files:
+            if cumulative_size >= space_to_free:
                 break  # Stop when we've found enough files to delete
-        except (FileNotFoundError, OSError):
-            continue  # Skip files that can't be accessed
-    
-    if not files_to_delete:
-        logger.warning("No suitable files found for deletion")
-        return {'deleted_count': 0, 'space_freed': 0, 'message': 'No suitable files for deletion'}
-    
-    logger.info(f"Planning to delete {len(files_to_delete)} oldest archived files to free {format_bytes(cumulative_size)}")
-    
-    if dry_run:
-        logger.info(f"[DRY RUN] Would delete {len(files_to_delete)} files totaling {format_bytes(cumulative_size)}")
-        logger.info(f"[DRY RUN] Oldest file to delete: {files_to_delete[0]} (modified: {datetime.fromtimestamp(files_to_delete[0].stat().st_mtime)})")
-        if len(files_to_delete) > 1:
-            logger.info(f"[DRY RUN] Newest file to delete: {files_to_delete[-1]} (modified: {datetime.fromtimestamp(files_to_delete[-1].stat().st_mtime)})")
-        return {'deleted_count': 0, 'space_freed': 0, 'would_delete': len(files_to_delete), 'would_free': cumulative_size}
-    
-    # Actually delete the files
-    deleted_count = 0
-    space_freed = 0
-    
-    logger.warning(f"[LIVE RUN] Deleting {len(files_to_delete)} oldest archived files...")
-    
-    for file_path in files_to_delete:
-        try:
-            file_size = file_path.stat().st_size
-            file_path.unlink()
-            deleted_count += 1
-            space_freed += file_size
-            
-            if deleted_count % 50 == 0:  # Log progress every 50 files
-                logger.info(f"Deleted {deleted_count}/{len(files_to_delete)} files, freed {format_bytes(space_freed)}")
-            
-            # Small delay to reduce I/O impact
-            time.sleep(0.05)  # 50ms delay
-            
-        except (FileNotFoundError, OSError) as e:
-            logger.warning(f"Could not delete file {file_path}: {e}")
-            continue
+            files_to_delete.append(archived)
+            cumulative_size += archived.size
+
+        if not files_to_delete:
+            logger.warning("No suitable files found for deletion")
+            return {'deleted_count': 0, 'space_freed': 0, 'message': 'No suitable files for deletion'}
+
+        logger.info(f"Planning to delete {len(files_to_delete)} oldest archived files to free {format_bytes(cumulative_size)}")
+
+        if dry_run:
+            logger.info(f"[DRY RUN] Would delete {len(files_to_delete)} files totaling {format_bytes(cumulative_size)}")
+            logger.info(f"[DRY RUN] Oldest file to delete: {files_to_delete[0].path} (modified: {datetime.fromtimestamp(files_to_delete[0].mtime)})")
+            if len(files_to_delete) > 1:
+                logger.info(f"[DRY RUN] Newest file to delete: {files_to_delete[-1].path} (modified: {datetime.fromtimestamp(files_to_delete[-1].mtime)})")
+            return {'deleted_count': 0, 'space_freed': 0, 'would_delete': len(files_to_delete), 'would_free': cumulative_size}
+
+        # Actually delete the files
+        deleted_count = 0
+        space_freed = 0
+        removed_paths = []
+
+        logger.warning(f"[LIVE RUN] Deleting {len(files_to_delete)} oldest archived files...")
+        pacer = TokenBucket(files_per_sec)
+
+        for archived in files_to_delete:
+            pacer.acquire(1)
+            try:
+                remove_archive_file(archived.path)
+                deleted_count += 1
+                space_freed += archived.size
+                removed_paths.append(os.path.abspath(archived.path))
+
+                if deleted_count % 50 == 0:  # Log progress every 50 files
+                    logger.info(f"Deleted {deleted_count}/{len(files_to_delete)} files, freed {format_bytes(space_freed)}")
+
+            except FileNotFoundError:
+                # Already gone, so the index entry is stale
+                removed_paths.append(os.path.abspath(archived.path))
+            except OSError as e:
+                logger.warning(f"Could not delete file {archived.path}: {e}")
+                continue
+
+            if conn is not None and len(removed_paths) >= ARCHIVE_DB_BATCH_SIZE:
+                forget_archived_files(conn, removed_paths)
+                removed_paths = []
+
+        if conn is not None and removed_paths:
+            forget_archived_files(conn, removed_paths)
+    except sqlite3.Error as e:
+        logger.error(f"Database error while cleaning the archive: {e}")
+        return {'deleted_count': 0, 'space_freed': 0, 'error': str(e)}
+    finally:
+        if conn is not None:
+            conn.close()
     
     logger.info(f"Archive cleanup complete: Deleted {deleted_count} files, freed {format_bytes(space_freed)}")
     
@@ -509,25 +1809,359 @@ def cleanup_archive_space(archive_drive: str = "G:", target_free_gb: float = 5.0
         'cleanup_successful': final_disk_usage['free'] >= target_free_bytes
     }
 
+# inotify event flags (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+INOTIFY_EVENT_HEADER = struct.Struct('iIII')
+
+class InotifyWatcher:
+    """
+    Reports frames that finish writing under the camera folders, using Linux
+    inotify through ctypes. Finished writes and renames into a folder are
+    reported, and new camera folders are watched as they appear.
+    """
+
+    def __init__(self, root: Path):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        self.add_watch(root)
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    self.add_watch(Path(entry.path))
+
+    def add_watch(self, directory: Path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.watches[wd] = directory
+
+    def poll(self, timeout: float) -> tuple[list[Path], bool]:
+        """
+        Waits up to timeout seconds for events.
+
+        Returns:
+            The new frame paths, and whether events were lost (queue overflow)
+            so the caller should rescan.
+        """
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return [], False
+
+        paths = []
+        overflowed = False
+        while True:
+            try:
+                buffer = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(buffer, offset)
+                offset += INOTIFY_EVENT_HEADER.size
+                name = os.fsdecode(buffer[offset:offset + name_length].rstrip(b'\0'))
+                offset += name_length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                    continue
+                directory = self.watches.get(wd)
+                if directory is None or not name:
+                    continue
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        try:
+                            self.add_watch(directory / name)
+                        except OSError as e:
+                            # Removed again or unreadable; the rescan below picks up whatever is there
+                            logger.warning(f"Could not watch new folder: {e}")
+                        overflowed = True  # Frames may have landed before the watch was added
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    paths.append(directory / name)
+        return paths, overflowed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """
+    Fallback for platforms without inotify: re-lists only the camera folders
+    whose mtime changed since the last poll and reports the new names.
+    """
+
+    def __init__(self, root: Path, interval: float = 30):
+        self.root = root
+        self.interval = interval
+        self.known = {}
+        self.poll(0)
+
+    def poll(self, timeout: float) -> tuple[list[Path], bool]:
+        time.sleep(min(max(timeout, 0), self.interval))
+        paths = []
+        try:
+            with os.scandir(self.root) as entries:
+                folders = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+        except OSError as e:
+            logger.warning(f"Could not list '{self.root}': {e}")
+            return [], False
+
+        for folder in folders:
+            try:
+                dir_mtime = os.stat(folder).st_mtime
+                previous_mtime, previous_names = self.known.get(folder, (None, set()))
+                if dir_mtime == previous_mtime:
+                    continue
+                with os.scandir(folder) as entries:
+                    names = {entry.name for entry in entries if entry.is_file(follow_symlinks=False)}
+            except OSError:
+                continue
+            paths.extend(Path(folder) / name for name in names - previous_names)
+            self.known[folder] = (dir_mtime, names)
+        return paths, False
+
+    def close(self):
+        pass
+
+def create_watcher(root: Path, poll_interval: float) -> InotifyWatcher | PollingWatcher:
+    """Returns an inotify watcher where available, otherwise a polling one."""
+    try:
+        watcher = InotifyWatcher(root)
+        logger.info(f"Watching {root} with inotify ({len(watcher.watches)} folders).")
+        return watcher
+    except (OSError, AttributeError) as e:
+        logger.info(f"inotify unavailable ({e}); polling {root} every {poll_interval:.0f}s instead.")
+        return PollingWatcher(root, poll_interval)
+
+def run_daemon(target_dir: Path, db_path: Path, archive_drive: str, rules: list[dict], dry_run: bool,
+               rate_profiles: list[dict], maintenance, maintenance_interval: float,
+               batch_interval: float = 30, recheck_interval: float = 3 * 3600, max_batch: int = 2000,
+               lock_path: Path | None = None):
+    """
+    Archives frames as they age past the cleanup rules, instead of in periodic full scans.
+
+    Every frame is kept in an in-memory heap ordered by when it becomes old
+    enough for the youngest rule. The heap is seeded by one scan at start-up
+    and then fed by the watcher, so the tree is only rescanned if inotify
+    drops events. Due frames are evaluated and moved in small batches. A
+    frame no rule wants yet is requeued for the next rule age, or for a
+    recheck later since its views and crops can change.
+
+    Args:
+        target_dir: The captured images directory to watch.
+        db_path: The path to the SQLite database.
+        archive_drive: The archive drive letter (e.g., "G:").
+        rules: The cleanup rules.
+        dry_run: If True, only log what would be moved.
+        rate_profiles: Time-of-day archive rate profiles.
+        maintenance: Callable run every maintenance_interval seconds (archive thinning and space checks).
+        maintenance_interval: Seconds between maintenance runs.
+        batch_interval: Minimum seconds between move batches.
+        recheck_interval: Seconds before re-evaluating a frame that matched no rule at the oldest rule age.
+        max_batch: Maximum number of frames evaluated per batch.
+        lock_path: If given, the run lock is taken for each batch and maintenance run
+            only, so an on-demand --once run can get in while the daemon waits.
+
+    A matched frame the mover kept in place (copy or verify failure, a full
+    archive drive, or a dry run) is requeued with an exponential backoff
+    from batch_interval up to recheck_interval.
+    """
+    rule_ages = sorted({rule['age_hours'] * 3600 for rule in rules})
+    heap = []
+    queued = set()
+    failed_attempts = {}
+
+    def enqueue(path: Path, capture_time: float, due: float):
+        key = str(path)
+        if key not in queued:
+            queued.add(key)
+            heapq.heappush(heap, (due, key, capture_time))
+
+    def enqueue_new(path: Path):
+        # Frames live in per-camera folders; hidden names are in-progress temp files
+        if path.name.startswith('.') or path.parent == target_dir or not is_image_file(path.name):
+            return
+        capture_time = capture_time_from_name(path.name)
+        if capture_time is None:
+            try:
+                capture_time = os.stat(path).st_mtime
+            except OSError:
+                return
+        enqueue(path, capture_time, capture_time + rule_ages[0])
+
+    def seed():
+        for candidate in find_old_files(target_dir, 0):
+            if not candidate.path.name.startswith('.'):
+                enqueue(candidate.path, candidate.capture_time, candidate.capture_time + rule_ages[0])
+        logger.info(f"{len(heap)} frames queued.")
+
+    def take_lock():
+        # The open lock file, a no-op stand-in when there's no lock_path, or None if another run holds it
+        return acquire_run_lock(lock_path) if lock_path is not None else contextlib.nullcontext()
+
+    def process_batch(batch: list[FileCandidate], now: float):
+        matches, _ = evaluate_cleanup_rules(batch, db_path, rules, conn=db_conn)
+        matched = {match.candidate.path for match in matches}
+        for candidate in batch:
+            if candidate.path in matched:
+                continue
+            age = now - candidate.capture_time
+            next_age = next((rule_age for rule_age in rule_ages if rule_age > age), None)
+            due = candidate.capture_time + next_age if next_age is not None else now + recheck_interval
+            enqueue(candidate.path, candidate.capture_time, due)
+
+        logger.info(f"{len(batch)} frames due: {len(matches)} matched a rule, {len(batch) - len(matches)} requeued. "
+                    f"{len(heap)} frames queued.")
+        if matches:
+            result = move_files_and_update_records([match.candidate for match in matches], db_path, archive_drive, dry_run=dry_run,
+                                                   rate_profile=select_rate_profile(rate_profiles), conn=db_conn)
+            kept = {str(path) for path in result['kept']}
+            for match in matches:
+                key = str(match.candidate.path)
+                if key not in kept:
+                    failed_attempts.pop(key, None)
+                    continue
+                attempts = failed_attempts[key] = failed_attempts.get(key, 0) + 1
+                backoff = min(batch_interval * 2 ** (attempts - 1), recheck_interval)
+                enqueue(match.candidate.path, match.candidate.capture_time, time.time() + backoff)
+            if kept:
+                logger.info(f"{len(kept)} frames kept in place, retrying with backoff.")
+
+    # Batches come every batch_interval, so they share one connection (and its statement cache)
+    db_conn = None
+    if db_path.is_file():
+        try:
+            db_conn = db_access.connect(db_path)
+        except sqlite3.Error as e:
+            logger.error(f"Could not open the database: {e}. Each batch will open its own connection.")
+
+    watcher = create_watcher(target_dir, batch_interval)
+    seed()
+    next_maintenance = time.monotonic()
+    last_batch = 0.0
+
+    try:
+        while True:
+            if time.monotonic() >= next_maintenance:
+                run_lock = take_lock()
+                if run_lock is None:
+                    logger.info("Another cleanup run holds the lock; postponing archive maintenance.")
+                    next_maintenance = time.monotonic() + batch_interval
+                else:
+                    with run_lock:
+                        maintenance()
+                    next_maintenance = time.monotonic() + maintenance_interval
+
+            now = time.time()
+            due_in = heap[0][0] - now if heap else batch_interval
+            wait_seconds = min(max(due_in, last_batch + batch_interval - time.monotonic()),
+                               next_maintenance - time.monotonic())
+            if wait_seconds > 0:
+                new_paths, rescan = watcher.poll(wait_seconds)
+                for path in new_paths:
+                    enqueue_new(path)
+                if rescan:
+                    logger.warning("Watcher may have missed events; rescanning the capture directory.")
+                    seed()
+                continue
+
+            # Pop everything that's due, up to the batch limit
+            batch = []
+            now = time.time()
+            while heap and heap[0][0] <= now and len(batch) < max_batch:
+                _, key, capture_time = heapq.heappop(heap)
+                queued.discard(key)
+                path = Path(key)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Moved, transcoded or deleted since it was queued
+                batch.append(FileCandidate(path, path.relative_to(target_dir).parts[0], stat.st_size, stat.st_mtime, capture_time))
+            last_batch = time.monotonic()
+            if not batch:
+                continue
+
+            run_lock = take_lock()
+            if run_lock is None:
+                logger.info(f"Another cleanup run holds the lock; retrying {len(batch)} due frames shortly.")
+                for candidate in batch:
+                    enqueue(candidate.path, candidate.capture_time, now + batch_interval)
+                continue
+            with run_lock:
+                process_batch(batch, now)
+    finally:
+        watcher.close()
+        if db_conn is not None:
+            db_conn.close()
+
+def log_rule_summary(summary: dict, min_age_hours: float):
+    """Logs the per-rule breakdown returned by evaluate_cleanup_rules."""
+    logger.info(f"--- Analysis of {summary['total_candidates']} files older than {min_age_hours} hours ---")
+    logger.info(f"  - Found {summary['total_in_db']} files with records in the database.")
+    logger.info(f"  - {summary['with_views']} files have been viewed.")
+    logger.info(f"  - {summary['with_crops']} files have saved crops.")
+    for label, rule_stats in summary['per_rule'].items():
+        logger.info(f"  - Rule '{label}': {rule_stats['files']} files, {format_bytes(rule_stats['bytes'])}")
+    logger.info(f"  - {summary['unmatched']} files matched no rule and will stay.")
+    logger.info("---------------------------------")
+
 def main():
+    parser = argparse.ArgumentParser(description="Archive old captured images and keep the archive drive within its space budget")
+    parser.add_argument('--once', action='store_true', help='Run a single cleanup cycle and exit (used for on-demand runs)')
+    parser.add_argument('--daemon', action='store_true', help='Watch captured_images and archive each frame as soon as it is old enough')
+    parser.add_argument('--plan', metavar='PLAN_FILE', help='Scan and evaluate the rules, write the moves to PLAN_FILE and exit without moving anything')
+    parser.add_argument('--execute', metavar='PLAN_FILE', help='Execute the moves in PLAN_FILE without rescanning, then exit')
+    parser.add_argument('--diff', nargs=2, metavar=('OLD_PLAN', 'NEW_PLAN'), help='Show how two plan files differ, then exit')
+    args = parser.parse_args()
+
     # --- Configuration ---
     SCRIPT_DIR = Path(__file__).resolve().parent
     TARGET_DIR = SCRIPT_DIR / "captured_images"
     DB_PATH = SCRIPT_DIR / "traffic_cameras.db"
+    SCAN_STATE_PATH = SCRIPT_DIR / "file_cleanup_scan_state.json"  # Lets unchanged folders be skipped next cycle
+    LOCK_PATH = SCRIPT_DIR / "file_cleanup.lock"  # Held while a run moves files so two runs never overlap
     ARCHIVE_DRIVE = "G:"
     DRY_RUN = False  # SAFETY FIRST: Set to False to perform actual moves.
     RUN_INTERVAL_HOURS = 3
     
+    # Archive move pacing by time of day (hours are local, end is exclusive)
+    ARCHIVE_RATE_PROFILES = [
+        {"name": "night", "start_hour": 0, "end_hour": 6, "workers": 8, "files_per_sec": 200, "mb_per_sec": 100, "target_latency_ms": 500},
+        {"name": "day", "start_hour": 6, "end_hour": 24, "workers": 2, "files_per_sec": 10, "mb_per_sec": 10, "target_latency_ms": 200},
+    ]
+
+    # Archive retention tiers (off by default): frames are kept in full until the first tier
+    # applies, then thinned to one frame per interval per camera. Viewed/cropped frames are
+    # always kept. Thinning permanently deletes archived frames, so opt in by listing tiers, e.g.
+    #     ARCHIVE_RETENTION_TIERS = [
+    #         {"after_days": 7, "keep_every_minutes": 5},
+    #         {"after_days": 30, "keep_every_minutes": 60},
+    #     ]
+    # and try it with DRY_RUN = True first to see how many frames each cycle would delete.
+    ARCHIVE_RETENTION_TIERS = None
+    ARCHIVE_THIN_MAX_DAYS = 500       # Camera-days thinned per cycle, so a backlog is worked off gradually
+    ARCHIVE_PACK_AFTER_DAYS = None    # e.g. 31: pack each older camera-day into one .zip (None keeps loose files)
+
     # Archive space management settings
     ARCHIVE_TARGET_FREE_GB = 5.0      # Keep at least 5GB free on archive drive
     ARCHIVE_MAX_CLEANUP_GB = 10.0     # Don't delete more than 10GB in one cleanup session
     CHECK_ARCHIVE_SPACE = True        # Enable archive space monitoring
 
     # --- Define Cleanup Rules ---
-    # A file will be moved if it matches ANY of these rules.
+    # A file will be moved if it matches ANY of these rules. Rules are tried in
+    # 'priority' order (lowest first) and each file is credited to the first match.
     CLEANUP_RULES = [
         {
             "description": "Older than 9h, no crops",
+            "priority": 10,
             "age_hours": 6,
             "min_views": 0,
             "max_crops": 0,
@@ -545,49 +2179,133 @@ def main():
         logger.warning("No cleanup rules defined. Exiting.")
         return
 
+    def maintain_archive():
+        """Thins, packs and trims the archive drive; runs once per cycle (or per interval in daemon mode)."""
+        # Thin aged archive days before falling back to deleting the oldest files
+        if ARCHIVE_RETENTION_TIERS:
+            logger.info("--- Applying archive retention tiers ---")
+            thin_stats = thin_archive(DB_PATH, ARCHIVE_DRIVE, ARCHIVE_RETENTION_TIERS, dry_run=DRY_RUN,
+                                      max_days=ARCHIVE_THIN_MAX_DAYS)
+            if thin_stats['days_thinned']:
+                prefix = "[DRY RUN] Would thin" if DRY_RUN else "Thinned"
+                logger.info(f"{prefix} {thin_stats['days_thinned']} camera-days: {thin_stats['deleted_count']} frames, "
+                            f"{format_bytes(thin_stats['space_freed'])} ({thin_stats['protected_kept']} protected frames kept)")
+
+        if ARCHIVE_PACK_AFTER_DAYS is not None:
+            pack_stats = pack_archive_days(DB_PATH, ARCHIVE_DRIVE, ARCHIVE_PACK_AFTER_DAYS, ARCHIVE_RETENTION_TIERS,
+                                           dry_run=DRY_RUN)
+            if pack_stats['days_packed']:
+                prefix = "[DRY RUN] Would pack" if DRY_RUN else "Packed"
+                logger.info(f"{prefix} {pack_stats['days_packed']} camera-days ({pack_stats['frames_packed']} frames, "
+                            f"{format_bytes(pack_stats['bytes_packed'])}) into day containers")
+
+        # Then make sure the archive drive has enough free space
+        if CHECK_ARCHIVE_SPACE:
+            logger.info("--- Checking archive drive space ---")
+            cleanup_stats = cleanup_archive_space(
+                archive_drive=ARCHIVE_DRIVE,
+                target_free_gb=ARCHIVE_TARGET_FREE_GB,
+                max_cleanup_gb=ARCHIVE_MAX_CLEANUP_GB,
+                dry_run=DRY_RUN,
+                db_path=DB_PATH
+            )
+
+            if cleanup_stats.get('deleted_count', 0) > 0:
+                logger.info(f"Archive cleanup freed {format_bytes(cleanup_stats['space_freed'])} by deleting {cleanup_stats['deleted_count']} old files")
+            elif cleanup_stats.get('would_delete', 0) > 0:
+                logger.info(f"[DRY RUN] Archive cleanup would free {format_bytes(cleanup_stats['would_free'])} by deleting {cleanup_stats['would_delete']} old files")
+
+    if args.diff:
+        diff = diff_cleanup_plans(Path(args.diff[0]), Path(args.diff[1]))
+        for entry in diff['added']:
+            logger.info(f"+ {entry['source']} ({format_bytes(entry['size'])}, {entry['rule']})")
+        for entry in diff['removed']:
+            logger.info(f"- {entry['source']} ({format_bytes(entry['size'])}, {entry['rule']})")
+        for old, new in diff['changed']:
+            logger.info(f"~ {new['source']}: {format_bytes(old['size'])} -> {format_bytes(new['size'])}, '{old['rule']}' -> '{new['rule']}'")
+        logger.info(f"{len(diff['added'])} added, {len(diff['removed'])} removed, {len(diff['changed'])} changed; "
+                    f"planned size {'+' if diff['bytes_delta'] >= 0 else '-'}{format_bytes(abs(diff['bytes_delta']))}")
+        return
+
+    if args.plan:
+        min_age_hours = min(rule['age_hours'] for rule in CLEANUP_RULES)
+        matches, summary = evaluate_cleanup_rules(find_old_files(TARGET_DIR, min_age_hours), DB_PATH, CLEANUP_RULES)
+        if summary['total_candidates']:
+            log_rule_summary(summary, min_age_hours)
+        header = write_cleanup_plan(Path(args.plan), matches, ARCHIVE_DRIVE, CLEANUP_RULES)
+        logger.info(f"Wrote plan for {header['total_files']} files ({format_bytes(header['total_bytes'])}) to {args.plan}")
+        return
+
+    # Only one run at a time may touch the journal or move files; the lock is held until main returns
+    # --diff and --plan only read, so they never recover the journal or wait for the lock
+    def recover_interrupted_moves():
+        """Finishes whatever a killed run left in the cleanup journal; call it with the run lock held."""
+        if DRY_RUN:
+            return
+        resumed = recover_cleanup_journal(DB_PATH)
+        if resumed:
+            matches, _ = evaluate_cleanup_rules(resumed, DB_PATH, CLEANUP_RULES)
+            logger.info(f"Resuming {len(matches)} of {len(resumed)} interrupted archive moves...")
+            move_files_and_update_records([match.candidate for match in matches], DB_PATH, ARCHIVE_DRIVE, dry_run=DRY_RUN,
+                                          rate_profile=select_rate_profile(ARCHIVE_RATE_PROFILES))
+
+    if args.execute or args.daemon:
+        run_lock = acquire_run_lock(LOCK_PATH)
+        if run_lock is None:
+            logger.warning(f"Another cleanup run holds {LOCK_PATH}. Exiting.")
+            return
+        with run_lock:
+            # Finish the journal before moving anything new
+            recover_interrupted_moves()
+            if args.execute:
+                execute_cleanup_plan(Path(args.execute), DB_PATH, dry_run=DRY_RUN, rate_profile=select_rate_profile(ARCHIVE_RATE_PROFILES))
+                return
+
+        logger.info("--- Starting cleanup daemon ---")
+        try:
+            run_daemon(TARGET_DIR, DB_PATH, ARCHIVE_DRIVE, CLEANUP_RULES, DRY_RUN, ARCHIVE_RATE_PROFILES,
+                       maintain_archive, RUN_INTERVAL_HOURS * 60 * 60, lock_path=LOCK_PATH)
+        except KeyboardInterrupt:
+            logger.info("--- File Cleanup Daemon Stopped by user (Ctrl+C) ---")
+        return
+
     try:
         while True:
-            logger.info("--- Starting new cleanup cycle ---")
-            
-            # Check archive drive space first
-            if CHECK_ARCHIVE_SPACE:
-                logger.info("--- Checking archive drive space ---")
-                cleanup_stats = cleanup_archive_space(
-                    archive_drive=ARCHIVE_DRIVE,
-                    target_free_gb=ARCHIVE_TARGET_FREE_GB,
-                    max_cleanup_gb=ARCHIVE_MAX_CLEANUP_GB,
-                    dry_run=DRY_RUN
-                )
-                
-                if cleanup_stats.get('deleted_count', 0) > 0:
-                    logger.info(f"Archive cleanup freed {format_bytes(cleanup_stats['space_freed'])} by deleting {cleanup_stats['deleted_count']} old files")
-                elif cleanup_stats.get('would_delete', 0) > 0:
-                    logger.info(f"[DRY RUN] Archive cleanup would free {format_bytes(cleanup_stats['would_free'])} by deleting {cleanup_stats['would_delete']} old files")
-            
-            # Process cleanup rules for moving files to archive
-            for i, rule in enumerate(CLEANUP_RULES):
-                logger.info(f"Processing Rule {i+1}: {rule.get('description', 'No description')}")
+            # The lock is held for the cycle only, not the sleep, so an on-demand --once run
+            # (camera_capture's disk pressure cleanup) can get in between cycles
+            run_lock = acquire_run_lock(LOCK_PATH)
+            if run_lock is None:
+                if args.once:
+                    logger.warning(f"Another cleanup run holds {LOCK_PATH}. Exiting.")
+                    break
+                logger.warning(f"Another cleanup run holds {LOCK_PATH}. Skipping this cycle.")
+            else:
+                with run_lock:
+                    logger.info("--- Starting new cleanup cycle ---")
+                    recover_interrupted_moves()
+                    maintain_archive()
 
-                candidate_files = find_old_files(TARGET_DIR, rule['age_hours'])
+                    # Evaluate all cleanup rules in one filesystem pass and one database pass
+                    min_age_hours = min(rule['age_hours'] for rule in CLEANUP_RULES)
+                    logger.info(f"Evaluating {len(CLEANUP_RULES)} cleanup rule(s) against files older than {min_age_hours} hours")
 
-                if candidate_files:
-                    logger.info(f"Found {len(candidate_files)} files older than {rule['age_hours']} hours. Now checking against the current rule...")
+                    # Reloaded every cycle, since a --once run may have updated it in between
+                    scan_state = load_scan_state(SCAN_STATE_PATH)
+                    candidate_files = find_old_files(TARGET_DIR, min_age_hours, scan_state)
+                    matches, summary = evaluate_cleanup_rules(candidate_files, DB_PATH, CLEANUP_RULES)
 
-                    files_to_move, summary = filter_files_by_rule(
-                        file_paths=candidate_files,
-                        db_path=DB_PATH,
-                        rule=rule
-                    )
-                    logger.info(f"--- Analysis of {len(candidate_files)} candidate files ---")
-                    logger.info(f"  - Found {summary['total_in_db']} files with records in the database.")
-                    logger.info(f"  - {summary['with_multiple_views']} files have at least {rule['min_views']} view(s).")
-                    logger.info(f"  - {summary['with_crops']} files have saved crops.")
-                    logger.info("---------------------------------")
+                    if summary['total_candidates']:
+                        log_rule_summary(summary, min_age_hours)
+                        move_files_and_update_records([match.candidate for match in matches], DB_PATH, ARCHIVE_DRIVE, dry_run=DRY_RUN,
+                                                      rate_profile=select_rate_profile(ARCHIVE_RATE_PROFILES))
+                    else:
+                        logger.info(f"No files older than {min_age_hours} hours were found.")
 
-                    move_files_and_update_records(files_to_move, DB_PATH, ARCHIVE_DRIVE, dry_run=DRY_RUN)
+                    save_scan_state(SCAN_STATE_PATH, scan_state)
 
-                else:
-                    logger.info(f"No files older than {rule['age_hours']} hours were found for this rule.")
+            if args.once:
+                logger.info("--- Cleanup cycle finished (single run requested). ---")
+                break
 
             logger.info(f"--- Cleanup cycle finished. Waiting for {RUN_INTERVAL_HOURS} hours. ---")
             time.sleep(RUN_INTERVAL_HOURS * 60 * 60)
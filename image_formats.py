@@ -0,0 +1,17 @@
+"""
+Image file extensions shared by the Python tools.
+
+camera_capture.py can transcode saved frames from .jpg to .webp or .avif,
+so anything that walks the image trees (file_cleanup.py, database_cleaner.py)
+has to recognise every format a frame may end up in. server.js serves the
+same set; keep IMAGE_EXTENSIONS in constants.js in step with this one.
+"""
+
+import os
+
+# Lower-case, with the leading dot
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif'})
+
+def is_image_file(name: str) -> bool:
+    """Whether a file name has one of the image extensions (case-insensitive)."""
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
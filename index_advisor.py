@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Index Advisor for the Python query paths
+
+Runs EXPLAIN QUERY PLAN over every query file_cleanup.py and
+database_cleaner.py issue against traffic_cameras.db, flags full-table scans
+that aren't inherent to the query (integrity checks read whole tables on
+purpose), and times each query. With --apply it adds any missing index the
+lookups rely on, then re-plans and re-times everything and prints the
+before/after comparison.
+
+The migration is idempotent: an index is only created when no existing
+index (including the automatic ones behind UNIQUE and PRIMARY KEY
+constraints) already starts with the same columns.
+
+QUERY_CATALOG mirrors the SQL in those scripts; update it alongside them.
+
+Usage:
+    python index_advisor.py                    # Report plans, scans and timings
+    python index_advisor.py --apply            # Add missing indexes and compare
+    python index_advisor.py --db other.db --repeat 50
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import sqlite3
+import statistics
+
+import db_access
+from database_cleaner import CLEAN_TEMP_SCHEMA
+
+# Each entry: where the query lives, the SQL, which sample values to bind,
+# and which tables/aliases the query is expected to read in full.
+QUERY_CATALOG = [
+    # --- file_cleanup.py ---
+    {
+        'source': 'file_cleanup.iter_candidate_stats',
+        'setup': """
+            CREATE TEMP TABLE IF NOT EXISTS cleanup_candidates (
+                camera_name TEXT NOT NULL, filename TEXT NOT NULL, path TEXT NOT NULL,
+                size INTEGER NOT NULL, mtime REAL NOT NULL, capture_time REAL NOT NULL,
+                PRIMARY KEY (camera_name, filename)
+            )
+        """,
+        'sql': """
+            SELECT c.path, c.camera_name, c.size, c.mtime, c.capture_time,
+                   s.id IS NOT NULL AS in_db, COALESCE(s.total_views, 0) AS total_views,
+                   (SELECT COUNT(*) FROM saved_crops sc
+                    WHERE sc.original_camera = c.camera_name AND sc.original_filename = c.filename) AS crop_count
+            FROM temp.cleanup_candidates c
+            LEFT JOIN image_stats s ON s.camera_name = c.camera_name AND s.filename = c.filename
+        """,
+        'params': (),
+        'full_scans': {'c'}
+    },
+    {
+        'source': 'file_cleanup.locate_frame',
+        'sql': "SELECT archived_path FROM image_stats WHERE camera_name = ? AND filename = ?",
+        'params': ('camera', 'filename')
+    },
+    {
+        'source': 'file_cleanup.move_files_and_update_records (failed move cleanup)',
+        'sql': "DELETE FROM image_stats WHERE camera_name = ? AND filename = ?",
+        'params': ('camera', 'filename')
+    },
+    {
+        'source': 'file_cleanup.move_files_and_update_records (failed move cleanup)',
+        'sql': "DELETE FROM saved_crops WHERE original_camera = ? AND original_filename = ?",
+        'params': ('camera', 'filename')
+    },
+    {
+        'source': 'file_cleanup.forget_archived_files',
+        'sql': "UPDATE image_stats SET archived_path = NULL WHERE archived_path = ?",
+        'params': ('archived_path',)
+    },
+    {
+        'source': 'file_cleanup.forget_archived_files (containers)',
+        'sql': "UPDATE image_stats SET archived_path = NULL WHERE archived_path >= ? AND archived_path < ?",
+        'params': ('archived_path', 'archived_path')
+    },
+    {
+        'source': 'file_cleanup.forget_archived_files',
+        'sql': "DELETE FROM archive_files WHERE path = ?",
+        'params': ('archived_path',)
+    },
+    {
+        'source': 'file_cleanup.iter_archive_index',
+        'sql': "SELECT path, camera_name, size, mtime FROM archive_files ORDER BY mtime",
+        'params': (),
+        'full_scans': {'archive_files'}
+    },
+    {
+        'source': 'file_cleanup.thin_archive / pack_archive_days',
+        'sql': "SELECT DISTINCT camera_name FROM archive_files",
+        'params': (),
+        'full_scans': {'archive_files'}
+    },
+    {
+        'source': 'file_cleanup.thin_archive / pack_archive_days',
+        'sql': "SELECT MIN(mtime) FROM archive_files WHERE camera_name = ? AND mtime >= ?",
+        'params': ('camera', 'now')
+    },
+    {
+        'source': 'file_cleanup.thin_archive / pack_archive_days',
+        'sql': "SELECT path, filename, size, mtime FROM archive_files WHERE camera_name = ? AND mtime >= ? AND mtime < ?",
+        'params': ('camera', 'now', 'now')
+    },
+    {
+        'source': 'file_cleanup.thin_archive',
+        'sql': "SELECT day, interval_minutes FROM archive_thinning WHERE camera_name = ?",
+        'params': ('camera',)
+    },
+    {
+        'source': 'file_cleanup.protected_frames',
+        'sql': "SELECT original_filename FROM saved_crops WHERE original_camera = ? AND original_filename BETWEEN ? AND ?",
+        'params': ('camera', 'filename', 'filename')
+    },
+    {
+        'source': 'file_cleanup.protected_frames',
+        'sql': "SELECT filename FROM image_stats WHERE camera_name = ? AND filename BETWEEN ? AND ? AND total_views > 0",
+        'params': ('camera', 'filename', 'filename')
+    },
+    {
+        'source': 'file_cleanup.recover_cleanup_journal',
+        'sql': "SELECT source, camera_name, filename, destination, size, mtime FROM cleanup_journal ORDER BY planned_at",
+        'params': (),
+        'full_scans': {'cleanup_journal'}
+    },
+    {
+        'source': 'file_cleanup.clear_journal_entries',
+        'sql': "DELETE FROM cleanup_journal WHERE source = ?",
+        'params': ('archived_path',)
+    },
+    # --- database_cleaner.py ---
+    {
+        'source': 'database_cleaner._check_saved_crops',
+        'sql': "SELECT * FROM saved_crops",
+        'params': (),
+        'full_scans': {'saved_crops'}
+    },
+    {
+        'source': 'database_cleaner._check_saved_crops (incremental)',
+        'sql': """
+            SELECT * FROM saved_crops
+            WHERE id > ?
+               OR crop_folder IN (SELECT value FROM json_each('[]'))
+               OR rtrim(original_path, replace(original_path, '/', '')) IN (SELECT value FROM json_each('[]'))
+        """,
+        'params': ('id',),
+        'full_scans': {'saved_crops', 'json_each'}
+    },
+    {
+        'source': 'database_cleaner._check_crop_reviews',
+        'sql': """
+            SELECT cr.*, sc.id as crop_exists
+            FROM crop_reviews cr
+            LEFT JOIN saved_crops sc ON cr.crop_id = sc.id
+        """,
+        'params': (),
+        'full_scans': {'cr'}
+    },
+    {
+        'source': 'database_cleaner._check_crop_reviews (incremental)',
+        'sql': """
+            SELECT cr.*, sc.id as crop_exists
+            FROM crop_reviews cr
+            LEFT JOIN saved_crops sc ON cr.crop_id = sc.id
+            WHERE cr.id > ?
+        """,
+        'params': ('id',)
+    },
+    {
+        'source': 'database_cleaner._check_incomplete_reviews',
+        'sql': """
+            SELECT cr.id, cr.crop_id
+            FROM crop_reviews cr
+            WHERE (cr.notes IS NULL OR TRIM(cr.notes) = '')
+              AND cr.is_jonathan IS NULL
+              AND (cr.activities IS NULL OR TRIM(cr.activities) = '')
+              AND (cr.top_clothing IS NULL OR TRIM(cr.top_clothing) = '')
+              AND NOT EXISTS (SELECT 1 FROM crop_review_positive_factors pf WHERE pf.crop_review_id = cr.id)
+              AND NOT EXISTS (SELECT 1 FROM crop_review_negative_factors nf WHERE nf.crop_review_id = cr.id)
+        """,
+        'params': (),
+        'full_scans': {'cr'}
+    },
+    {
+        'source': 'database_cleaner._check_incomplete_reviews (incremental)',
+        'sql': """
+            SELECT cr.id, cr.crop_id
+            FROM crop_reviews cr
+            WHERE (cr.id > ? OR cr.updated_at >= datetime(?, '-1 minute'))
+              AND (cr.notes IS NULL OR TRIM(cr.notes) = '')
+              AND cr.is_jonathan IS NULL
+              AND NOT EXISTS (SELECT 1 FROM crop_review_positive_factors pf WHERE pf.crop_review_id = cr.id)
+              AND NOT EXISTS (SELECT 1 FROM crop_review_negative_factors nf WHERE nf.crop_review_id = cr.id)
+        """,
+        'params': ('id', 'day')
+    },
+    {
+        'source': 'database_cleaner._check_factors_relationships (incremental)',
+        'sql': """
+            SELECT link.crop_review_id, link.factor_id
+            FROM crop_review_positive_factors link
+            WHERE (link.rowid > ? OR link.crop_review_id IN (
+                      SELECT id FROM crop_reviews WHERE updated_at >= datetime(?, '-1 minute')))
+              AND (NOT EXISTS (SELECT 1 FROM crop_reviews cr WHERE cr.id = link.crop_review_id)
+                   OR NOT EXISTS (SELECT 1 FROM factors f WHERE f.id = link.factor_id))
+        """,
+        'params': ('id', 'day')
+    },
+    {
+        'source': 'database_cleaner._check_factors_relationships',
+        'sql': """
+            SELECT link.crop_review_id, link.factor_id
+            FROM crop_review_positive_factors link
+            WHERE NOT EXISTS (SELECT 1 FROM crop_reviews cr WHERE cr.id = link.crop_review_id)
+               OR NOT EXISTS (SELECT 1 FROM factors f WHERE f.id = link.factor_id)
+        """,
+        'params': (),
+        'full_scans': {'link'}
+    },
+    {
+        'source': 'database_cleaner._check_factors_relationships',
+        'sql': """
+            SELECT link.crop_review_id, link.factor_id
+            FROM crop_review_negative_factors link
+            WHERE NOT EXISTS (SELECT 1 FROM crop_reviews cr WHERE cr.id = link.crop_review_id)
+               OR NOT EXISTS (SELECT 1 FROM factors f WHERE f.id = link.factor_id)
+        """,
+        'params': (),
+        'full_scans': {'link'}
+    },
+    {
+        'source': 'database_cleaner._check_image_views',
+        'sql': """
+            SELECT camera_name, filename, COUNT(*) AS views, MAX(viewed_at) AS last_viewed
+            FROM image_views WHERE viewed_at >= ?
+            GROUP BY camera_name, filename
+        """,
+        'params': ('day',),
+        'full_scans': {'image_views'}
+    },
+    {
+        'source': 'database_cleaner._check_image_views (incremental)',
+        'sql': """
+            SELECT camera_name, filename, COUNT(*) AS views, MAX(viewed_at) AS last_viewed
+            FROM image_views
+            WHERE camera_name IN (SELECT value FROM json_each('[]'))
+               OR (camera_name, filename) IN (SELECT camera_name, filename FROM image_views WHERE rowid > ?)
+            GROUP BY camera_name, filename
+        """,
+        'params': ('id',),
+        'full_scans': {'json_each'}
+    },
+    {
+        'source': 'database_cleaner._check_image_views (rollups)',
+        'sql': "SELECT camera_name, filename, SUM(views), MAX(last_viewed_at) FROM image_view_daily GROUP BY camera_name, filename",
+        'params': (),
+        'full_scans': {'image_view_daily'}
+    },
+    {
+        'source': 'database_cleaner._check_orphaned_files',
+        'sql': "SELECT DISTINCT camera_name, filename FROM image_views WHERE camera_name IS NOT NULL AND filename IS NOT NULL",
+        'params': (),
+        'full_scans': {'image_views'}
+    },
+    {
+        'source': 'database_cleaner.compact_image_views',
+        'sql': """
+            DELETE FROM image_views
+            WHERE viewed_at >= ? AND viewed_at < ?
+              AND EXISTS (
+                  SELECT 1 FROM image_views newer
+                  WHERE newer.camera_name = image_views.camera_name
+                    AND newer.filename = image_views.filename
+                    AND newer.viewer_ip = image_views.viewer_ip
+                    AND newer.id > image_views.id
+              )
+        """,
+        'params': ('day', 'day')
+    },
+    {
+        'source': 'database_cleaner._delete_marked_records (cascade)',
+        'setup': CLEAN_TEMP_SCHEMA,
+        'sql': """
+            INSERT OR IGNORE INTO temp.clean_reviews
+            SELECT id FROM crop_reviews WHERE crop_id IN (SELECT id FROM temp.clean_crops)
+        """,
+        'params': (),
+        'full_scans': {'clean_crops'}
+    },
+    {
+        'source': 'database_cleaner._delete_marked_records',
+        'setup': CLEAN_TEMP_SCHEMA,
+        'sql': """
+            DELETE FROM crop_review_positive_factors
+            WHERE (crop_review_id, factor_id) IN (SELECT crop_review_id, factor_id FROM temp.clean_positive_links)
+        """,
+        'params': (),
+        'full_scans': {'clean_positive_links'}
+    },
+    {
+        'source': 'database_cleaner._delete_marked_records (cascade)',
+        'setup': CLEAN_TEMP_SCHEMA,
+        'sql': "DELETE FROM crop_review_negative_factors WHERE crop_review_id IN (SELECT id FROM temp.clean_reviews)",
+        'params': (),
+        'full_scans': {'clean_reviews'}
+    },
+    {
+        'source': 'database_cleaner._delete_marked_records',
+        'setup': CLEAN_TEMP_SCHEMA,
+        'sql': "DELETE FROM crop_reviews WHERE id IN (SELECT id FROM temp.clean_reviews)",
+        'params': (),
+        'full_scans': {'clean_reviews'}
+    },
+    {
+        'source': 'database_cleaner._delete_marked_records',
+        'setup': CLEAN_TEMP_SCHEMA,
+        'sql': "DELETE FROM saved_crops WHERE id IN (SELECT id FROM temp.clean_crops)",
+        'params': (),
+        'full_scans': {'clean_crops'}
+    },
+    {
+        'source': 'database_cleaner._delete_marked_records',
+        'setup': CLEAN_TEMP_SCHEMA,
+        'sql': """
+            DELETE FROM image_views
+            WHERE (camera_name, filename) IN (SELECT camera_name, filename FROM temp.clean_images)
+        """,
+        'params': (),
+        'full_scans': {'clean_images'}
+    },
+]
+
+# Indexes the lookups above depend on, as (name, table, columns, partial-index
+# WHERE clause). Databases created by older versions of the server (or
+# restored from old backups) can be missing some of them.
+REQUIRED_INDEXES = [
+    ('idx_image_stats_camera_file', 'image_stats', ('camera_name', 'filename'), None),
+    ('idx_image_stats_archived_path', 'image_stats', ('archived_path',), 'archived_path IS NOT NULL'),
+    ('idx_saved_crops_original', 'saved_crops', ('original_camera', 'original_filename'), None),
+    ('idx_image_views_camera_file', 'image_views', ('camera_name', 'filename'), None),
+    ('idx_image_views_date', 'image_views', ('viewed_at',), None),
+    ('idx_crop_reviews_crop_id', 'crop_reviews', ('crop_id',), None),
+    ('idx_crop_reviews_updated_at', 'crop_reviews', ('updated_at',), None),
+    ('idx_positive_factors_review', 'crop_review_positive_factors', ('crop_review_id',), None),
+    ('idx_negative_factors_review', 'crop_review_negative_factors', ('crop_review_id',), None),
+    ('idx_archive_files_camera', 'archive_files', ('camera_name', 'mtime'), None),
+    ('idx_archive_files_mtime', 'archive_files', ('mtime',), None),
+]
+
+SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?')
+
+def load_samples(conn: sqlite3.Connection) -> dict:
+    """Picks real values to bind, so timings reflect lookups that find rows."""
+    samples = {'camera': 'Camera', 'filename': '20250101_000000.jpg', 'archived_path': '', 'id': 1,
+               'now': time.time(), 'day': time.strftime('%Y-%m-%d', time.gmtime(time.time() - 30 * 86400))}
+    for table in ('image_stats', 'image_views'):
+        try:
+            row = conn.execute(f"SELECT camera_name, filename FROM {table} LIMIT 1").fetchone()
+        except sqlite3.Error:
+            continue
+        if row:
+            samples['camera'], samples['filename'] = row
+            break
+    try:
+        row = conn.execute("SELECT archived_path FROM image_stats WHERE archived_path IS NOT NULL LIMIT 1").fetchone()
+        if row:
+            samples['archived_path'] = row[0]
+    except sqlite3.Error:
+        pass
+    return samples
+
+def explain(conn: sqlite3.Connection, entry: dict, params: tuple) -> tuple[list[str], list[str]]:
+    """
+    Returns the query plan lines and the unexpected full scans in them.
+    Scans of tables the query is meant to read in full are not flagged.
+    """
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {entry['sql']}", params)]
+    expected = entry.get('full_scans', set())
+    flagged = []
+    for detail in plan:
+        match = SCAN_PATTERN.match(detail)
+        if not match:
+            continue
+        names = {name for name in match.groups() if name}
+        # A covering-index scan of a table we read in full is still the full read we expect
+        if not names & expected:
+            flagged.append(detail)
+    return plan, flagged
+
+def time_query(conn: sqlite3.Connection, entry: dict, params: tuple, repeat: int) -> float:
+    """Median milliseconds per execution. Writes run inside a savepoint that is rolled back."""
+    timings = []
+    is_write = not entry['sql'].lstrip().upper().startswith('SELECT')
+    for _ in range(repeat):
+        if is_write:
+            conn.execute("SAVEPOINT index_advisor")
+        started = time.perf_counter()
+        conn.execute(entry['sql'], params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+        if is_write:
+            conn.execute("ROLLBACK TO index_advisor")
+            conn.execute("RELEASE index_advisor")
+    return statistics.median(timings)
+
+def analyze_queries(conn: sqlite3.Connection, repeat: int) -> list[dict]:
+    """Plans and times every catalog query; queries on tables this database doesn't have are skipped."""
+    samples = load_samples(conn)
+    results = []
+    for entry in QUERY_CATALOG:
+        params = tuple(samples[key] for key in entry['params'])
+        result = {'source': entry['source'], 'sql': ' '.join(entry['sql'].split())}
+        try:
+            if entry.get('setup'):
+                conn.executescript(entry['setup'])
+            result['plan'], result['flagged'] = explain(conn, entry, params)
+            result['ms'] = time_query(conn, entry, params, repeat)
+        except sqlite3.OperationalError as e:
+            result['skipped'] = str(e)
+        results.append(result)
+    return results
+
+def has_index_prefix(conn: sqlite3.Connection, table: str, columns: tuple) -> bool:
+    """Whether any index on the table (including UNIQUE/PRIMARY KEY autoindexes) starts with these columns."""
+    for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        index_columns = tuple(row[2] for row in conn.execute(f"PRAGMA index_info({index[1]})"))
+        if index_columns[:len(columns)] == columns:
+            return True
+    # A single-column INTEGER PRIMARY KEY is the rowid and has no separate index
+    primary_key = tuple(row[1] for row in sorted(conn.execute(f"PRAGMA table_info({table})"), key=lambda row: row[5]) if row[5])
+    return primary_key[:len(columns)] == columns
+
+def missing_indexes(conn: sqlite3.Connection) -> list[tuple[str, str, tuple, str | None]]:
+    """REQUIRED_INDEXES entries whose table and columns exist but have no index covering them."""
+    missing = []
+    for name, table, columns, where in REQUIRED_INDEXES:
+        table_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if set(columns) <= table_columns and not has_index_prefix(conn, table, columns):
+            missing.append((name, table, columns, where))
+    return missing
+
+def apply_migration(conn: sqlite3.Connection, indexes: list[tuple[str, str, tuple, str | None]]):
+    """Creates the missing indexes in one transaction and refreshes the planner statistics."""
+    def migrate():
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for name, table, columns, where in indexes:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)})"
+                             + (f" WHERE {where}" if where else ""))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    db_access.retry_on_busy(migrate, description="Index migration")
+    conn.execute("PRAGMA optimize")
+
+def print_results(results: list[dict]):
+    """Prints each query's plan, flagged scans and timing."""
+    for result in results:
+        if 'skipped' in result:
+            print(f"\n⏭️  {result['source']}: skipped ({result['skipped']})")
+            continue
+        icon = "⚠️ " if result['flagged'] else "✅"
+        print(f"\n{icon} {result['source']}  ({result['ms']:.3f} ms)")
+        print(f"    {result['sql'][:110]}{'...' if len(result['sql']) > 110 else ''}")
+        for detail in result['plan']:
+            marker = "  <-- full scan" if detail in result['flagged'] else ""
+            print(f"      {detail}{marker}")
+
+def print_comparison(before: list[dict], after: list[dict]):
+    """Prints the before/after timings for queries that ran both times."""
+    print("\n📊 Before/after migration:")
+    for old, new in zip(before, after):
+        if 'ms' not in old or 'ms' not in new:
+            continue
+        ratio = new['ms'] / old['ms'] if old['ms'] else 1.0
+        scans = f"  scans {len(old['flagged'])} -> {len(new['flagged'])}" if old['flagged'] or new['flagged'] else ""
+        print(f"  {old['source'][:60]:<60} {old['ms']:9.3f} ms -> {new['ms']:9.3f} ms  x{ratio:5.2f}{scans}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the Python tools' queries for full-table scans and add missing indexes")
+    parser.add_argument('--db', default='traffic_cameras.db', help='Path to database file')
+    parser.add_argument('--apply', action='store_true', help='Create missing indexes, then re-plan and re-time the queries')
+    parser.add_argument('--repeat', type=int, default=20, help='Executions per query when timing')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database file not found: {args.db}")
+        return 1
+
+    conn = db_access.connect(args.db)
+    conn.isolation_level = None  # Savepoints and the migration transaction are managed explicitly
+    try:
+        print(f"🔍 Planning {len(QUERY_CATALOG)} queries against {args.db}...")
+        before = analyze_queries(conn, args.repeat)
+        print_results(before)
+
+        flagged = [result for result in before if result.get('flagged')]
+        missing = missing_indexes(conn)
+        print(f"\n📈 {len(flagged)} queries with unexpected full scans; {len(missing)} required indexes missing")
+        for name, table, columns, where in missing:
+            print(f"  • {name} ON {table}({', '.join(columns)})" + (f" WHERE {where}" if where else ""))
+
+        if not args.apply:
+            if missing:
+                print("\nRun with --apply to create them.")
+            return 0
+
+        if not missing:
+            print("\n✅ All required indexes already exist; nothing to migrate.")
+            return 0
+
+        print(f"\n🛠️ Creating {len(missing)} indexes...")
+        started = time.perf_counter()
+        apply_migration(conn, missing)
+        print(f"  Done in {time.perf_counter() - started:.2f}s")
+
+        after = analyze_queries(conn, args.repeat)
+        print_comparison(before, after)
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -43,7 +43,7 @@ async function loadDashboardData() {
         // Load detailed stats for each camera
         const cameraStatsPromises = cameras.map(async (camera) => {
             try {
-                const response = await fetch(`/api/cameras/${encodeURIComponent(camera.name)}/stats`);
+                const response = await fetch(`/api/cameras/${encodeURIComponent(camera.name)}/stats?summary=1`);
                 const cameraStats = await response.json();
                 return { ...camera, stats: cameraStats };
             } catch (error) {
@@ -4,6 +4,7 @@ const path = require('path');
 const https = require('https');
 const sharp = require('sharp');
 const TrafficCameraDB = require('./database');
+const { IMAGE_FILE_PATTERN } = require('./constants');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
@@ -157,7 +158,7 @@ app.get('/api/cameras/:cameraName/images', (req, res) => {
         }
 
         let images = fs.readdirSync(cameraDir)
-            .filter(file => file.match(/\.(jpg|jpeg|png|gif)$/i))
+            .filter(file => IMAGE_FILE_PATTERN.test(file))
             .map(filename => {
                 const filepath = path.join(cameraDir, filename);
                 const stats = fs.statSync(filepath);
@@ -194,6 +195,27 @@ app.get('/api/cameras/:cameraName/images', (req, res) => {
     }
 });
 
+// Read the latest-frame index maintained by camera_capture.py (empty if it isn't there yet)
+function readLatestIndex() {
+    try {
+        const indexPath = path.join(CAPTURED_IMAGES_DIR, 'latest_index.json');
+        if (!fs.existsSync(indexPath)) {
+            return {};
+        }
+        return JSON.parse(fs.readFileSync(indexPath, 'utf8')).cameras || {};
+    } catch (error) {
+        console.error('Error reading latest-frame index:', error);
+        return {};
+    }
+}
+
+// Whether an index entry can stand in for listing the camera folder (entries written
+// before the frame count was published, or pointing at a frame that's gone, can't)
+function isIndexCurrent(cameraDir, indexed) {
+    return Boolean(indexed) && Number.isInteger(indexed.image_count) && Boolean(indexed.oldest_filename)
+        && fs.existsSync(path.join(cameraDir, indexed.filename));
+}
+
 // Get latest image for each camera
 app.get('/api/latest', (req, res) => {
     try {
@@ -205,11 +227,28 @@ app.get('/api/latest', (req, res) => {
         
         const cameras = fs.readdirSync(capturedImagesDir, { withFileTypes: true })
             .filter(dirent => dirent.isDirectory());
+        const latestIndex = readLatestIndex();
         
         const latestImages = cameras.map(camera => {
             const cameraDir = path.join(capturedImagesDir, camera.name);
+            const indexed = latestIndex[camera.name];
+            
+            // Fast path: the index already knows the newest frame and the frame count
+            if (isIndexCurrent(cameraDir, indexed)) {
+                return {
+                    camera: camera.name,
+                    displayName: camera.name.replace(/_/g, ' '),
+                    latestImage: {
+                        filename: indexed.filename,
+                        path: indexed.path,
+                        timestamp: new Date(indexed.timestamp)
+                    },
+                    imageCount: indexed.image_count
+                };
+            }
+            
             const images = fs.readdirSync(cameraDir)
-                .filter(file => file.match(/\.(jpg|jpeg|png|gif)$/i))
+                .filter(file => IMAGE_FILE_PATTERN.test(file))
                 .map(filename => {
                     const filepath = path.join(cameraDir, filename);
                     const stats = fs.statSync(filepath);
@@ -261,7 +300,7 @@ app.get('/api/stats', (req, res) => {
         cameras.forEach(camera => {
             const cameraDir = path.join(capturedImagesDir, camera.name);
             const images = fs.readdirSync(cameraDir)
-                .filter(file => file.match(/\.(jpg|jpeg|png|gif)$/i));
+                .filter(file => IMAGE_FILE_PATTERN.test(file));
             
             totalImages += images.length;
             
@@ -335,7 +374,7 @@ app.get('/api/cameras/:cameraName/least-viewed', (req, res) => {
         }
         
         const allImages = fs.readdirSync(cameraDir)
-            .filter(file => /\.(jpg|jpeg|png|gif)$/i.test(file))
+            .filter(file => IMAGE_FILE_PATTERN.test(file))
             .map(filename => {
                 const filepath = path.join(cameraDir, filename);
                 const stats = fs.statSync(filepath);
@@ -564,6 +603,29 @@ app.get('/api/cameras/:cameraName/stats', async (req, res) => {
         // Decode the camera name from URL encoding
         const decodedCameraName = decodeURIComponent(cameraName);
         
+        // ?summary=1: summary from the latest-frame index plus one aggregate query,
+        // without the per-image `images` list (which needs the folder listed)
+        const indexed = req.query.summary === '1' ? readLatestIndex()[decodedCameraName] : undefined;
+        if (isIndexCurrent(path.join(CAPTURED_IMAGES_DIR, decodedCameraName), indexed)) {
+            const totals = db.getCameraViewTotals(decodedCameraName, indexed.oldest_filename);
+            const lastStats = db.getImageViewStats(decodedCameraName, indexed.filename);
+            return res.json({
+                totalImages: indexed.image_count,
+                unviewedImages: Math.max(indexed.image_count - totals.viewed_images, 0),
+                lastImage: {
+                    filename: indexed.filename,
+                    path: indexed.path,
+                    timestamp: new Date(indexed.timestamp),
+                    views: lastStats.total_views || 0,
+                    uniqueViewers: lastStats.unique_viewers || 0
+                },
+                viewStats: {
+                    totalViews: totals.total_views,
+                    uniqueViewers: totals.unique_viewers
+                }
+            });
+        }
+
         // Get all images for this camera
         const cameraImages = await getCameraImages(decodedCameraName);
         
@@ -639,7 +701,7 @@ async function getCameraImages(cameraName) {
         
         const files = await fs.promises.readdir(cameraDir);
         const imageFiles = files
-            .filter(file => /\.(jpg|jpeg|png)$/i.test(file))
+            .filter(file => IMAGE_FILE_PATTERN.test(file))
             .map(file => {
                 const filePath = path.join(cameraDir, file);
                 const stats = fs.statSync(filePath);
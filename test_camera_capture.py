@@ -0,0 +1,86 @@
+"""
+Tests for camera_capture.py's disk-pressure settings and latest-frame index.
+
+Run with: python -m pytest test_camera_capture.py
+"""
+
+import io
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from PIL import Image
+
+from camera_capture import CameraCapture, DISK_PRESSURE_DEFAULTS, LATEST_INDEX_DEFAULTS, load_pressure_settings
+
+GB = 1024**3
+
+class PressureSettingsTests(unittest.TestCase):
+    def test_partial_stage_override_keeps_other_thresholds(self):
+        settings = load_pressure_settings({'critical': {'free_gb': 8}})
+        self.assertEqual(settings['critical'], {'free_gb': 8.0, 'hours_to_full': 2.0})
+        self.assertEqual(settings['high'], DISK_PRESSURE_DEFAULTS['high'])
+        # The defaults themselves are untouched
+        self.assertEqual(DISK_PRESSURE_DEFAULTS['critical']['free_gb'], 5.0)
+
+        capture = SimpleNamespace(pressure_stage='normal', pressure_settings=settings)
+        self.assertEqual(CameraCapture.classify_pressure(capture, 7 * GB, None), 'critical')
+        self.assertEqual(CameraCapture.classify_pressure(capture, 100 * GB, 1.0), 'critical')
+
+    def test_invalid_settings_fall_back_to_defaults(self):
+        with self.assertLogs('camera_capture', 'WARNING') as logs:
+            settings = load_pressure_settings({
+                'critical': {'free_gb': '8', 'hours': 1},
+                'high': 3,
+                'min_samples': 'five',
+                'enabled': 1,
+                'typo': True,
+            })
+        self.assertEqual(len(logs.output), 6)
+        self.assertEqual(settings['critical'], DISK_PRESSURE_DEFAULTS['critical'])
+        self.assertEqual(settings['high'], DISK_PRESSURE_DEFAULTS['high'])
+        self.assertEqual(settings['min_samples'], DISK_PRESSURE_DEFAULTS['min_samples'])
+        self.assertIs(settings['enabled'], True)
+        self.assertNotIn('typo', settings)
+
+class LatestIndexTests(unittest.TestCase):
+    def test_frame_count_is_kept_in_memory_between_recounts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output_dir = Path(tmp)
+            camera_dir = output_dir / 'CamA'
+            camera_dir.mkdir()
+            buffer = io.BytesIO()
+            Image.new('RGB', (8, 6)).save(buffer, 'JPEG')
+            frame = buffer.getvalue()
+            for name in ['20240101_000000.webp', '20240101_000100.jpg', '.20240101_000100.webp.tmp']:
+                (camera_dir / name).write_bytes(frame)
+            capture = SimpleNamespace(latest_settings=dict(LATEST_INDEX_DEFAULTS), latest_index={}, frame_counts={},
+                                      latest_index_path=output_dir / 'latest_index.json')
+
+            def save(name, minute):
+                (camera_dir / name).write_bytes(frame)
+                CameraCapture.update_latest_index(capture, 'CamA', camera_dir / name, datetime(2024, 1, 1, 0, minute), frame)
+                return json.loads(capture.latest_index_path.read_text())['cameras']['CamA']
+
+            # The first save after startup counts the folder
+            entry = save('20240101_000100.jpg', 1)
+            self.assertEqual((entry['image_count'], entry['oldest_filename']), (2, '20240101_000000.webp'))
+
+            # Later saves don't list it again; a frame archived meanwhile shows up at the next recount
+            (camera_dir / '20240101_000000.webp').unlink()
+            with mock.patch('camera_capture.count_frames') as count_frames:
+                entry = save('20240101_000200.jpg', 2)
+            count_frames.assert_not_called()
+            self.assertEqual(entry['image_count'], 3)
+
+            capture.frame_counts['CamA']['counted_at'] -= LATEST_INDEX_DEFAULTS['recount_minutes'] * 60
+            entry = save('20240101_000300.jpg', 3)
+            self.assertEqual((entry['image_count'], entry['oldest_filename']), (3, '20240101_000100.jpg'))
+            self.assertEqual((entry['width'], entry['height']), (8, 6))
+
+if __name__ == '__main__':
+    unittest.main()
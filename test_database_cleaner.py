@@ -0,0 +1,188 @@
+"""
+Tests for database_cleaner.py's filesystem and review checks.
+
+Run with: python -m pytest test_database_cleaner.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from benchmark_database_cleaner import generate_database, run_checks
+from camera_capture import transcode_image
+from database_cleaner import DatabaseCleaner
+
+SCHEMA = """
+    CREATE TABLE saved_crops (id INTEGER PRIMARY KEY AUTOINCREMENT, original_camera TEXT NOT NULL,
+        original_filename TEXT NOT NULL, original_path TEXT, crop_filename TEXT NOT NULL,
+        crop_folder TEXT NOT NULL, saved_at DATETIME DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE crop_reviews (id INTEGER PRIMARY KEY AUTOINCREMENT, crop_id INTEGER NOT NULL, notes TEXT,
+        is_jonathan TEXT, activities TEXT, top_clothing TEXT, reviewed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP, UNIQUE(crop_id));
+    CREATE TABLE factors (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, type TEXT NOT NULL);
+    CREATE TABLE crop_review_positive_factors (crop_review_id INTEGER NOT NULL, factor_id INTEGER NOT NULL,
+        PRIMARY KEY (crop_review_id, factor_id));
+    CREATE TABLE crop_review_negative_factors (crop_review_id INTEGER NOT NULL, factor_id INTEGER NOT NULL,
+        PRIMARY KEY (crop_review_id, factor_id));
+    CREATE TABLE image_views (id INTEGER PRIMARY KEY AUTOINCREMENT, camera_name TEXT NOT NULL,
+        filename TEXT NOT NULL, viewer_ip TEXT NOT NULL, viewed_at DATETIME DEFAULT CURRENT_TIMESTAMP);
+"""
+
+def save_frame(path: Path, age_hours: float):
+    """Writes a noisy high-quality JPEG frame (so transcoding shrinks it) with an old mtime"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.effect_noise((64, 64), 64).convert('RGB').save(path, 'JPEG', quality=100)
+    mtime = time.time() - age_hours * 3600
+    os.utime(path, (mtime, mtime))
+
+class TranscodedFrameTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.captured = root / 'captured_images'
+        self.saved = root / 'saved_images'
+        self.saved.mkdir()
+        self.db_path = root / 'traffic_cameras.db'
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self.conn = conn
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def transcode(self, camera: str, filename: str, image_format: str) -> Path:
+        source = self.captured / camera / filename
+        save_frame(source, age_hours=48)
+        result = transcode_image(str(source), image_format, 30)
+        self.assertTrue(result['replaced'], result)
+        return Path(result['path'])
+
+    def scan(self) -> DatabaseCleaner:
+        cleaner = DatabaseCleaner(str(self.db_path), str(self.captured), str(self.saved))
+        with contextlib.redirect_stdout(io.StringIO()):
+            cleaner.scan_database_integrity()
+        return cleaner
+
+    def orphaned_captured(self, cleaner: DatabaseCleaner) -> set:
+        return {issue['file_path'] for issue in cleaner.issue_samples['orphaned_captured_images']}
+
+    def test_unreferenced_transcoded_frame_is_orphaned(self):
+        webp = self.transcode('CamA', '20240101_000000.jpg', 'webp')
+        self.assertEqual(webp.suffix, '.webp')
+
+        cleaner = self.scan()
+        self.assertEqual(self.orphaned_captured(cleaner), {str(webp)})
+
+    def test_viewed_transcoded_frame_is_not_orphaned(self):
+        webp = self.transcode('CamA', '20240101_000000.jpg', 'webp')
+        avif = self.transcode('CamA', '20240101_000100.jpg', 'avif')
+        self.conn.execute("INSERT INTO image_views (camera_name, filename, viewer_ip) VALUES ('CamA', ?, '127.0.0.1')",
+                          (avif.name,))
+        self.conn.commit()
+        # An in-progress transcode's temp file isn't a frame
+        (webp.parent / f".{webp.stem}.webp.tmp").write_bytes(b'partial')
+
+        cleaner = self.scan()
+        self.assertEqual(self.orphaned_captured(cleaner), {str(webp)})
+        self.assertEqual(cleaner.issue_counts['orphaned_image_views'], 0)
+        self.assertEqual(cleaner.stats['total_files_checked'], 2)
+
+class IncrementalScanTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        (root / 'captured_images').mkdir()
+        (root / 'saved_images').mkdir()
+        self.db_path = root / 'traffic_cameras.db'
+        self.state_path = root / 'scan_state.json'
+        self.cleaner = DatabaseCleaner(str(self.db_path), str(root / 'captured_images'), str(root / 'saved_images'))
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(SCHEMA)
+        self.conn.executescript("""
+            INSERT INTO factors (name, type) VALUES ('hat', 'positive'), ('bag', 'positive');
+            INSERT INTO crop_reviews (crop_id, notes) VALUES (1, 'seen');
+            INSERT INTO crop_review_positive_factors (crop_review_id, factor_id) VALUES (1, 1), (1, 2);
+        """)
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def scan(self) -> dict:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return dict(self.cleaner.scan_database_integrity(state_path=self.state_path))
+
+    def test_reused_link_rowid_is_rechecked(self):
+        self.assertEqual(self.scan().get('orphaned_positive_factors', 0), 0)
+
+        # Replace the last link row without touching the review, as addFactorToReview does;
+        # without AUTOINCREMENT the new row takes the same rowid
+        self.conn.execute("UPDATE crop_reviews SET updated_at = datetime('now', '-1 day')")
+        self.conn.execute("DELETE FROM crop_review_positive_factors WHERE rowid = 2")
+        self.conn.execute("INSERT INTO crop_review_positive_factors (crop_review_id, factor_id) VALUES (1, 99)")
+        self.conn.commit()
+        self.assertEqual(self.conn.execute("SELECT MAX(rowid) FROM crop_review_positive_factors").fetchone()[0], 2)
+
+        self.assertEqual(self.scan().get('orphaned_positive_factors', 0), 1)
+        self.assertEqual(self.cleaner.scan_mode, 'incremental')
+
+class ReviewCheckEquivalenceTests(unittest.TestCase):
+    """The set-based review and factor checks must report exactly what the join-and-group versions did."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / 'traffic_cameras.db'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_same_issues(self) -> dict:
+        _, issues = run_checks(self.db_path)
+        key = lambda issue: json.dumps(issue, sort_keys=True)
+        legacy, current = issues['legacy'], issues['current']
+        for issue_type in set(legacy) | set(current):
+            self.assertEqual(sorted(map(key, current.get(issue_type, []))), sorted(map(key, legacy.get(issue_type, []))),
+                             issue_type)
+        return current
+
+    def test_edge_cases_match(self):
+        generate_database(self.db_path, reviews=0, empty_ratio=0, orphan_ratio=0, seed=0)
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            INSERT INTO crop_reviews (id, crop_id, notes, is_jonathan, activities, top_clothing) VALUES
+                (1, 1, NULL, NULL, NULL, NULL),           -- empty
+                (2, 2, ' ', NULL, char(9, 10), ''),       -- blank text only
+                (3, 3, NULL, 'no', NULL, NULL),           -- an answer, even 'no', counts
+                (4, 4, NULL, NULL, NULL, NULL),           -- empty text but a factor
+                (5, 5, NULL, NULL, NULL, NULL),           -- empty text but several factors of both kinds
+                (6, 6, char(160), NULL, NULL, NULL);      -- non-breaking space only
+            INSERT INTO crop_review_positive_factors VALUES (4, 1), (5, 1), (5, 3), (99, 1), (5, 999);
+            INSERT INTO crop_review_negative_factors VALUES (5, 2), (5, 4), (98, 999);
+        """)
+        conn.commit()
+        conn.close()
+
+        current = self.assert_same_issues()
+        self.assertEqual(sorted(issue['review_id'] for issue in current['incomplete_reviews']), [1, 2, 6])
+        self.assertEqual(len(current['orphaned_positive_factors']), 2)
+        self.assertEqual(len(current['orphaned_negative_factors']), 2)  # Both the review and the factor are missing
+
+    def test_generated_database_matches(self):
+        generate_database(self.db_path, reviews=2000, empty_ratio=0.2, orphan_ratio=0.05, seed=7)
+        current = self.assert_same_issues()
+        self.assertTrue(current['incomplete_reviews'])
+        self.assertTrue(current['orphaned_positive_factors'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,285 @@
+"""
+Tests for file_cleanup.py.
+
+Run with: python -m pytest test_file_cleanup.py
+"""
+
+import errno
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+
+from camera_capture import transcode_image
+import file_cleanup
+
+def save_frame(path: Path, age_hours: float):
+    """Writes a noisy high-quality JPEG frame (so transcoding shrinks it) with an old mtime"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.effect_noise((64, 64), 64).convert('RGB').save(path, 'JPEG', quality=100)
+    mtime = time.time() - age_hours * 3600
+    os.utime(path, (mtime, mtime))
+
+class FindOldFilesTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_transcoded_frames_are_candidates(self):
+        source = self.root / 'CamA' / '20240101_000000.jpg'
+        save_frame(source, age_hours=48)
+        result = transcode_image(str(source), 'webp', 30)
+        self.assertTrue(result['replaced'], result)
+        # An in-progress transcode's temp file isn't a frame
+        (self.root / 'CamA' / '.20240101_000100.webp.tmp').write_bytes(b'partial')
+
+        candidates = list(file_cleanup.find_old_files(self.root, 24))
+        self.assertEqual([candidate.path for candidate in candidates], [Path(result['path'])])
+        self.assertEqual(candidates[0].camera, 'CamA')
+
+class MoveFilesTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.db_path = self.root / 'traffic_cameras.db'
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE image_stats (id INTEGER PRIMARY KEY AUTOINCREMENT, camera_name TEXT NOT NULL,
+                filename TEXT NOT NULL, total_views INTEGER DEFAULT 0, UNIQUE(camera_name, filename));
+            CREATE TABLE saved_crops (id INTEGER PRIMARY KEY AUTOINCREMENT, original_camera TEXT NOT NULL,
+                original_filename TEXT NOT NULL);
+            INSERT INTO image_stats (camera_name, filename, total_views) VALUES ('CamA', '20240101_000000.jpg', 3);
+            INSERT INTO saved_crops (original_camera, original_filename) VALUES ('CamA', '20240101_000000.jpg');
+        """)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_copy_error_keeps_source_and_records(self):
+        source = self.root / 'captured_images' / 'CamA' / '20240101_000000.jpg'
+        save_frame(source, age_hours=48)
+        candidates = list(file_cleanup.find_old_files(self.root / 'captured_images', 24))
+        archive_drive = self.root / 'archive'
+        archive_drive.mkdir()
+
+        # A full disk, and an unexpected error that isn't an OSError
+        for error in (OSError(errno.ENOSPC, 'No space left on device'), RuntimeError('unexpected')):
+            with mock.patch.object(file_cleanup, 'transfer_file', side_effect=error):
+                result = file_cleanup.move_files_and_update_records(candidates, self.db_path, str(archive_drive), dry_run=False)
+
+            self.assertEqual(result['moved'], 0)
+            self.assertEqual(result['kept'], [source])
+            self.assertTrue(source.is_file())
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM image_stats").fetchone()[0], 1)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM saved_crops").fetchone()[0], 1)
+            # Nothing was moved, so nothing is left in the journal to recover
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM cleanup_journal").fetchone()[0], 0)
+        finally:
+            conn.close()
+
+    def test_rule_evaluation_reuses_a_connection(self):
+        save_frame(self.root / 'captured_images' / 'CamA' / '20240101_000000.jpg', age_hours=48)
+        save_frame(self.root / 'captured_images' / 'CamA' / '20240101_000100.jpg', age_hours=48)
+        candidates = list(file_cleanup.find_old_files(self.root / 'captured_images', 24))
+        rules = [{'age_hours': 24, 'min_views': 0, 'max_crops': 0}]
+        expected, _ = file_cleanup.evaluate_cleanup_rules(candidates, self.db_path, rules)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for _ in range(2):
+                matches, _ = file_cleanup.evaluate_cleanup_rules(candidates, self.db_path, rules, conn=conn)
+                self.assertEqual(matches, expected)
+                # Left open for the next call, without a read transaction pinning the WAL
+                self.assertFalse(conn.in_transaction)
+            conn.execute("SELECT 1")
+        finally:
+            conn.close()
+
+class ArchiveSpaceTests(unittest.TestCase):
+    def test_oversized_oldest_entry_is_still_evicted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive_drive = Path(tmp)
+            camera_dir = archive_drive / 'archived_camera_images' / 'CamA'
+            camera_dir.mkdir(parents=True)
+            # A packed day much bigger than the space needed, followed by newer single frames
+            oldest = camera_dir / '20240101.zip'
+            oldest.write_bytes(b'x' * 5000)
+            os.utime(oldest, (1_000, 1_000))
+            for minute in range(3):
+                frame = camera_dir / f'20240102_00{minute:02d}00.jpg'
+                frame.write_bytes(b'x' * 10)
+                os.utime(frame, (2_000 + minute, 2_000 + minute))
+
+            full_disk = {'total': 10_000, 'used': 10_000, 'free': 0, 'percent_used': 100.0}
+            with mock.patch.object(file_cleanup, 'get_disk_usage', return_value=full_disk):
+                result = file_cleanup.cleanup_archive_space(str(archive_drive), target_free_gb=100 / 1024**3,
+                                                            dry_run=False)
+
+            self.assertEqual(result['deleted_count'], 1)
+            self.assertFalse(oldest.exists())
+            self.assertEqual(len(list(camera_dir.glob('*.jpg'))), 3)
+
+class DaemonTests(unittest.TestCase):
+    def test_kept_frame_is_requeued(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            target_dir = Path(tmp) / 'captured_images'
+            source = target_dir / 'CamA' / '20240101_000000.jpg'
+            save_frame(source, age_hours=48)
+            rules = [{'name': 'old', 'age_hours': 24}]
+
+            def evaluate(candidates, db_path, rules, conn=None):
+                return [file_cleanup.RuleMatch(candidate, 'old') for candidate in candidates], {}
+
+            # The first attempt keeps the frame (say a full archive drive); the second stops the loop
+            mover = mock.Mock(side_effect=[{'moved': 0, 'bytes_moved': 0, 'kept': [source]}, KeyboardInterrupt])
+
+            def poll(timeout):
+                if watcher.poll.call_count > 100:
+                    raise AssertionError("kept frame was not retried")
+                time.sleep(timeout)
+                return [], False
+            watcher = mock.Mock()
+            watcher.poll.side_effect = poll
+            with mock.patch.object(file_cleanup, 'evaluate_cleanup_rules', side_effect=evaluate), \
+                    mock.patch.object(file_cleanup, 'move_files_and_update_records', mover), \
+                    mock.patch.object(file_cleanup, 'create_watcher', return_value=watcher):
+                with self.assertRaises(KeyboardInterrupt):
+                    file_cleanup.run_daemon(target_dir, Path(tmp) / 'traffic_cameras.db', 'G:', rules, False, [],
+                                            lambda: None, 3600, batch_interval=0.01)
+
+            self.assertEqual(mover.call_count, 2)
+            self.assertEqual([candidate.path for candidate in mover.call_args.args[0]], [source])
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "inotify is Linux only")
+    def test_watcher_survives_a_folder_it_cannot_watch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            watcher = file_cleanup.InotifyWatcher(Path(tmp))
+            try:
+                # As if the new camera folder vanished before the watch was added
+                with mock.patch.object(watcher, 'add_watch', side_effect=OSError(errno.ENOENT, 'gone')):
+                    (Path(tmp) / 'CamB').mkdir()
+                    _, rescan = watcher.poll(1)
+                self.assertTrue(rescan)
+            finally:
+                watcher.close()
+
+class RunLockTests(unittest.TestCase):
+    def test_second_run_is_refused_until_the_first_releases(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            lock_path = Path(tmp) / 'file_cleanup.lock'
+            first = file_cleanup.acquire_run_lock(lock_path)
+            self.assertIsNotNone(first)
+            self.assertIsNone(file_cleanup.acquire_run_lock(lock_path))
+
+            first.close()
+            second = file_cleanup.acquire_run_lock(lock_path)
+            self.assertIsNotNone(second)
+            second.close()
+
+class MainModeTests(unittest.TestCase):
+    def test_diff_does_not_recover_the_journal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            old_plan, new_plan = Path(tmp) / 'old.jsonl', Path(tmp) / 'new.jsonl'
+            for plan in (old_plan, new_plan):
+                file_cleanup.write_cleanup_plan(plan, [], 'G:', [])
+
+            with mock.patch('sys.argv', ['file_cleanup.py', '--diff', str(old_plan), str(new_plan)]), \
+                    mock.patch.object(file_cleanup, 'recover_cleanup_journal') as recover, \
+                    mock.patch.object(file_cleanup, 'acquire_run_lock') as acquire:
+                file_cleanup.main()
+
+            recover.assert_not_called()
+            acquire.assert_not_called()
+
+    def test_once_run_gets_in_while_the_service_sleeps(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            lock_path = Path(tmp) / 'file_cleanup.lock'
+            acquire_run_lock = file_cleanup.acquire_run_lock
+
+            def sleep(seconds):
+                # camera_capture's pressure cleanup, started between two service cycles
+                with mock.patch('sys.argv', ['file_cleanup.py', '--once']):
+                    file_cleanup.main()
+                raise KeyboardInterrupt
+
+            with mock.patch('sys.argv', ['file_cleanup.py']), \
+                    mock.patch.object(file_cleanup, 'acquire_run_lock', side_effect=lambda path: acquire_run_lock(lock_path)), \
+                    mock.patch.object(file_cleanup, 'recover_cleanup_journal', return_value=[]), \
+                    mock.patch.object(file_cleanup, 'cleanup_archive_space', return_value={}), \
+                    mock.patch.object(file_cleanup, 'load_scan_state', return_value={}), \
+                    mock.patch.object(file_cleanup, 'save_scan_state'), \
+                    mock.patch.object(file_cleanup, 'find_old_files', return_value=[]) as find_old_files, \
+                    mock.patch.object(file_cleanup, 'evaluate_cleanup_rules', return_value=([], {'total_candidates': 0})), \
+                    mock.patch.object(file_cleanup.time, 'sleep', side_effect=sleep):
+                file_cleanup.main()
+
+            # Both the service's cycle and the --once cycle ran
+            self.assertEqual(find_old_files.call_count, 2)
+
+class PackArchiveTests(unittest.TestCase):
+    TIERS = [{"after_days": 7, "keep_every_minutes": 5}, {"after_days": 30, "keep_every_minutes": 60}]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive_drive = Path(self.tmp.name)
+        self.db_path = self.archive_drive / 'traffic_cameras.db'
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE image_stats (id INTEGER PRIMARY KEY AUTOINCREMENT, camera_name TEXT NOT NULL,
+                filename TEXT NOT NULL, total_views INTEGER DEFAULT 0, updated_at DATETIME,
+                UNIQUE(camera_name, filename));
+            CREATE TABLE saved_crops (id INTEGER PRIMARY KEY AUTOINCREMENT, original_camera TEXT NOT NULL,
+                original_filename TEXT NOT NULL);
+        """)
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def archive_day(self, days_ago: int) -> Path:
+        """Archives one frame a minute for an hour, starting at midnight days_ago days back"""
+        camera_dir = self.archive_drive / 'archived_camera_images' / 'CamA'
+        camera_dir.mkdir(parents=True, exist_ok=True)
+        midnight = datetime.combine(datetime.now().date() - timedelta(days=days_ago), datetime.min.time())
+        for minute in range(60):
+            taken = midnight + timedelta(minutes=minute)
+            frame = camera_dir / f"{taken.strftime('%Y%m%d_%H%M%S')}.jpg"
+            frame.write_bytes(b'frame')
+            os.utime(frame, (taken.timestamp(), taken.timestamp()))
+        return camera_dir / f"{midnight.strftime('%Y%m%d')}{file_cleanup.CONTAINER_SUFFIX}"
+
+    def thin_and_pack(self, pack_after_days: int) -> dict:
+        file_cleanup.thin_archive(self.db_path, str(self.archive_drive), self.TIERS, dry_run=False)
+        return file_cleanup.pack_archive_days(self.db_path, str(self.archive_drive), pack_after_days, self.TIERS,
+                                              dry_run=False)
+
+    def test_day_between_tiers_waits_for_the_final_tier(self):
+        # Past the 5-minute tier and pack_after_days, but not yet at the 60-minute tier
+        container = self.archive_day(days_ago=10)
+        stats = self.thin_and_pack(pack_after_days=8)
+        self.assertEqual(stats['days_packed'], 0)
+        self.assertFalse(container.exists())
+        self.assertEqual(len(list(container.parent.glob('*.jpg'))), 12)
+
+    def test_day_past_the_final_tier_is_packed(self):
+        container = self.archive_day(days_ago=40)
+        stats = self.thin_and_pack(pack_after_days=8)
+        self.assertEqual((stats['days_packed'], stats['frames_packed']), (1, 1))
+        self.assertTrue(container.exists())
+
+if __name__ == '__main__':
+    unittest.main()